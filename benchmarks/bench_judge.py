@@ -0,0 +1,254 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import io
+import json
+import time
+import argparse
+import platform
+import tempfile
+import statistics
+
+from openjudge import TC_Judge, Checker_Judge
+from openjudge.code_judge import run_checker
+from openjudge.compare import StreamComparator
+from openjudge.batch_checker import BatchChecker
+from openjudge.sandbox import execute
+from openjudge.testcase import TC_File, open_input
+from openjudge.zygote import Zygote
+
+# Judge overhead benchmarks on synthetic problems built in a temp directory.
+#   python benchmarks/bench_judge.py -o bench.json [--quick]
+# Child CPU time (from rusage) is subtracted where a program runs, so the
+# "overhead" figures are what the judge itself adds on top of the solution.
+
+SRC_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+MB = 1024 * 1024
+
+PROGRAMS = {
+    "noop.py": "pass\n",
+    "drain.py": "import sys\nwhile sys.stdin.buffer.read(1 << 20):\n    pass\n",
+    "echo.py": "print(input())\n",
+    "checker.py": "a = input()\nb = input()\nprint(1 if a == b else 0)\n",
+    "checker_batch.py": (
+        "from openjudge.batch_checker import serve_batch\n"
+        "serve_batch(lambda input_data, output_data: input_data == output_data)\n"
+    ),
+}
+
+
+def write_file(path: str, data):
+    with open(path, 'wb' if isinstance(data, bytes) else 'w') as file:
+        file.write(data)
+
+
+def make_problem(root: str, count: int) -> str:
+    tc_path = os.path.join(root, f"echo_{count}")
+    if not os.path.isdir(tc_path):
+        os.makedirs(tc_path)
+        for i in range(1, count + 1):
+            write_file(os.path.join(tc_path, f"test{i:04}.in"), f"{i}\n")
+            write_file(os.path.join(tc_path, f"test{i:04}.out"), f"{i}\n")
+    return tc_path
+
+
+def summarize(samples: list) -> dict:
+    return {
+        "n": len(samples),
+        "mean_ms": statistics.mean(samples) * 1000,
+        "median_ms": statistics.median(samples) * 1000,
+        "min_ms": min(samples) * 1000,
+        "max_ms": max(samples) * 1000,
+    }
+
+
+def child_cpu(execution: dict) -> float:
+    rusage = execution["rusage"]
+    if rusage is None:
+        return 0.0
+    return rusage["cpu_time_user"] + rusage["cpu_time_sys"]
+
+
+def bench_spawn(root: str, repeat: int) -> dict:
+    code_path = os.path.join(root, "noop.py")
+    results = {}
+    for mode in ("popen", "zygote"):
+        if mode == "zygote" and os.name != "posix":
+            continue
+        zygote = Zygote().start() if mode == "zygote" else None
+        try:
+            walls, overheads = [], []
+            for _ in range(repeat):
+                execution = execute(code_path, b"", 10, 256, zygote)
+                walls.append(execution["elapsed_time"])
+                overheads.append(max(0.0, execution["elapsed_time"] - child_cpu(execution)))
+        finally:
+            if zygote is not None:
+                zygote.stop()
+        results[mode] = {"wall": summarize(walls), "overhead": summarize(overheads)}
+    return results
+
+
+def bench_piping(root: str, sizes: list) -> dict:
+    code_path = os.path.join(root, "drain.py")
+    results = {}
+    line = b"0123456789abcdef" * 4 + b"\n"
+    for size in sizes:
+        input_path = os.path.join(root, f"input_{size}.in")
+        write_file(input_path, line * (size * MB // len(line)))
+        input_file = TC_File(input_path)
+        with open_input(input_file) as stdin_data:
+            execution = execute(code_path, stdin_data, 60, 1024)
+        elapsed = execution["elapsed_time"]
+        results[f"{size}MB"] = {
+            "bytes": input_file.size,
+            "wall_ms": elapsed * 1000,
+            "child_cpu_ms": child_cpu(execution) * 1000,
+            "throughput_mb_s": input_file.size / MB / elapsed,
+        }
+    return results
+
+
+def bench_compare(sizes: list) -> dict:
+    results = {}
+    line = b"1 2 3 4 5 6 7 8 9 10 11 12 13 14 15\n"
+    for size in sizes:
+        data = line * (size * MB // len(line))
+        # Same content, but with CRLF on one side to exercise normalization.
+        expected = data.replace(b"\n", b"\r\n")
+        samples = []
+        for _ in range(3):
+            comparator = StreamComparator(io.BytesIO(expected))
+            start = time.perf_counter()
+            for offset in range(0, len(data), 32768):
+                comparator.feed(data[offset:offset + 32768])
+            assert comparator.finish()
+            samples.append(time.perf_counter() - start)
+        best = min(samples)
+        results[f"{size}MB"] = {"bytes": len(data), "best_ms": best * 1000, "throughput_mb_s": len(data) / MB / best}
+    return results
+
+
+def bench_checker(root: str, repeat: int) -> dict:
+    results = {}
+
+    samples = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        assert run_checker(os.path.join(root, "checker.py"), str(i), str(i))
+        samples.append(time.perf_counter() - start)
+    results["subprocess"] = summarize(samples)
+
+    samples = []
+    with BatchChecker(os.path.join(root, "checker_batch.py")) as checker:
+        checker.check("0", "0", 10)  # startup is paid once per run
+        for i in range(repeat):
+            start = time.perf_counter()
+            assert checker.check(str(i), str(i), 10).strip() == "1"
+            samples.append(time.perf_counter() - start)
+    results["batch"] = summarize(samples)
+
+    samples = []
+    check = lambda input_data, output_data: input_data == output_data
+    for i in range(repeat):
+        start = time.perf_counter()
+        check(str(i), str(i))
+        samples.append(time.perf_counter() - start)
+    results["callable"] = summarize(samples)
+    return results
+
+
+def run_judge(judge, workers: int) -> dict:
+    start = time.perf_counter()
+    judge.run(workers)
+    elapsed = time.perf_counter() - start
+    statuses = [result["status"] for result in judge.results]
+    assert statuses.count("AC") == len(statuses), statuses
+    busy_cpus = min(workers, os.cpu_count() or 1)
+    child_time = sum((result["cpu_time_user"] or 0) + (result["cpu_time_sys"] or 0) for result in judge.results)
+    return {
+        "tests": len(statuses),
+        "workers": workers,
+        "wall_ms": elapsed * 1000,
+        "tests_per_sec": len(statuses) / elapsed,
+        "child_cpu_ms": child_time * 1000,
+        "overhead_per_test_ms": max(0.0, elapsed * busy_cpus - child_time) / len(statuses) * 1000,
+    }
+
+
+def bench_scaling(root: str, counts: list, workers_list: list) -> dict:
+    code_path = os.path.join(root, "echo.py")
+    results = {"tc_judge": [], "checker_judge": []}
+    for count in counts:
+        tc_path = make_problem(root, count)
+        for workers in workers_list:
+            for use_zygote in (False, True):
+                if use_zygote and os.name != "posix":
+                    continue
+                judge = TC_Judge()
+                judge.load_TC(tc_path)
+                judge.load_code(code_path)
+                judge.set_zygote(use_zygote)
+                row = run_judge(judge, workers)
+                row["zygote"] = use_zygote
+                results["tc_judge"].append(row)
+
+            judge = Checker_Judge()
+            judge.load_TC(tc_path)
+            judge.load_code(code_path)
+            judge.load_checker(lambda input_data, output_data: input_data == output_data)
+            row = run_judge(judge, workers)
+            row["checker"] = "callable"
+            results["checker_judge"].append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="openjudge judge overhead benchmarks")
+    parser.add_argument("-o", "--output", default="bench.json", help="JSON file to write")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes, for CI")
+    args = parser.parse_args()
+
+    cpu_count = os.cpu_count() or 1
+    if args.quick:
+        repeat, pipe_sizes, compare_sizes, counts = 10, [4], [4], [10, 50]
+    else:
+        repeat, pipe_sizes, compare_sizes, counts = 50, [16, 64], [16, 64], [10, 100, 500]
+    workers_list = sorted({1, 2, 4, cpu_count})
+
+    # Batch checker scripts import openjudge from this checkout.
+    os.environ["PYTHONPATH"] = os.pathsep.join(filter(None, [SRC_PATH, os.environ.get("PYTHONPATH")]))
+
+    with tempfile.TemporaryDirectory() as root:
+        for name, source in PROGRAMS.items():
+            write_file(os.path.join(root, name), source)
+
+        report = {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": cpu_count,
+                "quick": args.quick,
+            },
+        }
+        for name, bench in (
+            ("spawn", lambda: bench_spawn(root, repeat)),
+            ("piping", lambda: bench_piping(root, pipe_sizes)),
+            ("compare", lambda: bench_compare(compare_sizes)),
+            ("checker", lambda: bench_checker(root, repeat)),
+            ("scaling", lambda: bench_scaling(root, counts, workers_list)),
+        ):
+            print(f"[bench] {name}...", file=sys.stderr, flush=True)
+            start = time.perf_counter()
+            report[name] = bench()
+            print(f"[bench] {name} done in {time.perf_counter() - start:.1f}s", file=sys.stderr, flush=True)
+
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"[bench] wrote {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+from openjudge.batch_checker import serve_batch
+
+def check(input_data, output_data):
+    a = input_data
+    b, c = output_data.split("\n")
+    return a == b and c == "hello world!"
+
+serve_batch(check)
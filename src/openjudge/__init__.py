@@ -1,4 +1,7 @@
-from .code_judge import TC_Judge, Checker_Judge
+from .code_judge import TC_Judge, Checker_Judge, TimeMode
 from .tc_generator import TC_Generator
+from .stress import Stress_Judge
+from .trace import TraceLevel
+from .results import Verdict
 
-__all__ = ["TC_Judge", "Checker_Judge", "TC_Generator"]
\ No newline at end of file
+__all__ = ["TC_Judge", "Checker_Judge", "TimeMode", "TC_Generator", "Stress_Judge", "TraceLevel", "Verdict"]
\ No newline at end of file
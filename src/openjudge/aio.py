@@ -0,0 +1,252 @@
+import os
+import time
+import asyncio
+import functools
+import subprocess
+
+from .sandbox import (
+    _CHUNK_SIZE, OutputLimitExceeded, _input_chunks, _next_view, execute, execution_result,
+    kill, make_limits, reap, returncode_from_status, spawn, usage_from_rusage,
+)
+from .testcase import normalize_str
+
+# asyncio counterparts of sandbox.execute and run_checker. One event loop
+# drives every child: pipes are registered with loop.add_reader/add_writer and
+# exits are watched through a pidfd, so no thread is used per test (only the
+# spawn itself goes through the default executor). Children
+# are still reaped with wait4 to keep their rusage (asyncio's own subprocess
+# support reaps them itself and loses it).
+
+
+class _Pump:
+    # Moves stdin/stdout/stderr between the child and the judge from event
+    # loop callbacks; `done` resolves once all three pipes are closed.
+    def __init__(self, loop, proc, input, stdout_sink, output_limit: int, timings: dict):
+        self.loop = loop
+        self.proc = proc
+        self.stdout_sink = stdout_sink
+        self.output_limit = output_limit
+        self.timings = timings
+        self.stdout_chunks = []
+        self.stderr_chunks = []
+        self.chunks = _input_chunks(input)
+        self.view = _next_view(self.chunks)
+        self.offset = 0
+        self.readers = {}
+        self.writer = None
+        self.done = loop.create_future()
+
+    def start(self):
+        for pipe, sink in ((self.proc.stdout, self.stdout_sink or self.stdout_chunks.append), (self.proc.stderr, self.stderr_chunks.append)):
+            fd = pipe.fileno()
+            os.set_blocking(fd, False)
+            self.readers[fd] = [pipe, sink, 0]
+            self.loop.add_reader(fd, self._read, fd)
+        if self.view is not None:
+            self.writer = self.proc.stdin.fileno()
+            os.set_blocking(self.writer, False)
+            self.loop.add_writer(self.writer, self._write)
+        else:
+            self.proc.stdin.close()
+
+    def _fail(self, exc: BaseException):
+        if not self.done.done():
+            self.done.set_exception(exc)
+        self.close()
+
+    def _finish_if_idle(self):
+        if not self.readers and self.writer is None and not self.done.done():
+            self.done.set_result((b"".join(self.stdout_chunks), b"".join(self.stderr_chunks)))
+
+    def _read(self, fd: int):
+        io_start = time.perf_counter()
+        try:
+            data = os.read(fd, _CHUNK_SIZE)
+        except BlockingIOError:
+            return
+        io_end = time.perf_counter()
+        self.timings["io"] += io_end - io_start
+        entry = self.readers[fd]
+        if not data:
+            self.loop.remove_reader(fd)
+            entry[0].close()
+            del self.readers[fd]
+            self._finish_if_idle()
+            return
+        entry[2] += len(data)
+        if self.output_limit is not None and entry[2] > self.output_limit:
+            self._fail(OutputLimitExceeded())
+            return
+        try:
+            entry[1](data)
+        except Exception as e:
+            self._fail(e)
+            return
+        if entry[1] is self.stdout_sink:
+            self.timings["sink"] += time.perf_counter() - io_end
+
+    def _write(self):
+        io_start = time.perf_counter()
+        try:
+            self.offset += os.write(self.writer, self.view[self.offset:self.offset + _CHUNK_SIZE])
+        except BlockingIOError:
+            return
+        except BrokenPipeError:
+            self.view.release()
+            self.view = None
+        if self.view is not None and self.offset >= len(self.view):
+            self.view.release()
+            self.view = _next_view(self.chunks)
+            self.offset = 0
+        if self.view is None:
+            self.loop.remove_writer(self.writer)
+            self.proc.stdin.close()
+            self.writer = None
+            self._finish_if_idle()
+        self.timings["io"] += time.perf_counter() - io_start
+
+    def close(self):
+        for fd in self.readers:
+            self.loop.remove_reader(fd)
+        self.readers = {}
+        if self.writer is not None:
+            self.loop.remove_writer(self.writer)
+            self.writer = None
+        # Views may point into an mmap the caller closes afterwards.
+        if self.view is not None:
+            self.view.release()
+            self.view = None
+
+
+async def communicate_async(proc, input, stdout_sink=None, output_limit: int = None, timings: dict = None):
+    if timings is None:
+        timings = {}
+    timings.setdefault("io", 0.0)
+    timings.setdefault("sink", 0.0)
+    pump = _Pump(asyncio.get_running_loop(), proc, input, stdout_sink, output_limit, timings)
+    try:
+        pump.start()
+        return await pump.done
+    finally:
+        pump.close()
+
+
+async def reap_async(proc):
+    loop = asyncio.get_running_loop()
+    if hasattr(proc, "rusage"):
+        # Forked by the launcher or a zygote, which reaps it and sends the
+        # status over the connection.
+        if not proc.status_buffered():
+            ready = loop.create_future()
+            loop.add_reader(proc.fileno(), lambda: ready.done() or ready.set_result(None))
+            try:
+                await ready
+            finally:
+                loop.remove_reader(proc.fileno())
+        proc.wait()
+        return proc.returncode, proc.rusage
+    pidfd = None
+    if hasattr(os, "pidfd_open"):
+        try:
+            pidfd = os.pidfd_open(proc.pid)
+        except OSError:  # kernels before 5.3
+            pidfd = None
+    try:
+        if pidfd is not None:
+            exited = loop.create_future()
+            loop.add_reader(pidfd, lambda: exited.done() or exited.set_result(None))
+            try:
+                await exited
+            finally:
+                loop.remove_reader(pidfd)
+            pid, status, ru = os.wait4(proc.pid, 0)
+        else:
+            delay = 0.0005
+            while True:
+                pid, status, ru = os.wait4(proc.pid, os.WNOHANG)
+                if pid:
+                    break
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 0.01)
+    finally:
+        if pidfd is not None:
+            os.close(pidfd)
+    proc.returncode = returncode_from_status(status)
+    return proc.returncode, usage_from_rusage(ru)
+
+
+def _discard(spawning):
+    # Done callback for a spawn whose caller was cancelled meanwhile.
+    if spawning.cancelled() or spawning.exception() is not None:
+        return
+    proc = spawning.result()
+    kill(proc)
+    reap(proc)
+    for f in (proc.stdin, proc.stdout, proc.stderr):
+        if f is not None:
+            f.close()
+
+
+async def execute_async(code_path: str, input_data, time_limit: float, memory_limit: int, wall_time_limit: float = None, stdout_sink=None, output_limit: int = None, args=()) -> dict:
+    # Same result as sandbox.execute. Cancelling the awaiting task kills the child.
+    loop = asyncio.get_running_loop()
+    if os.name != "posix":
+        # Pipes can't be added to the Windows event loops; fall back to a thread.
+        return await loop.run_in_executor(None, functools.partial(
+            execute, code_path, input_data, time_limit, memory_limit, None, wall_time_limit, stdout_sink, None, output_limit, args
+        ))
+
+    limits = make_limits(time_limit, memory_limit, output_limit)
+    if wall_time_limit is None:
+        wall_time_limit = time_limit
+    start_time = time.perf_counter()
+    # fork/exec, or the round trip to the launcher, blocks; do it in the
+    # executor so the loop keeps pumping the other children meanwhile.
+    spawning = loop.run_in_executor(None, spawn, code_path, limits, None, args)
+    try:
+        proc = await asyncio.shield(spawning)
+    except asyncio.CancelledError:
+        spawning.add_done_callback(_discard)
+        raise
+    spawned_time = time.perf_counter()
+    timings = {}
+
+    timed_out = False
+    output_exceeded = False
+    stdout, stderr = b"", b""
+    try:
+        try:
+            stdout, stderr = await asyncio.wait_for(communicate_async(proc, input_data, stdout_sink, output_limit, timings), wall_time_limit)
+            remaining = None
+            if wall_time_limit is not None:
+                remaining = max(0, wall_time_limit - (time.perf_counter() - start_time))
+            returncode, rusage = await asyncio.wait_for(reap_async(proc), remaining)
+        except asyncio.TimeoutError:
+            timed_out = True
+            kill(proc)
+            returncode, rusage = reap(proc)
+        except OutputLimitExceeded:
+            output_exceeded = True
+            kill(proc)
+            returncode, rusage = reap(proc)
+    except BaseException:
+        # Cancelled, or the stdout sink raised: don't leave the child behind.
+        if proc.returncode is None:
+            kill(proc)
+            reap(proc)
+        raise
+    finally:
+        for f in (proc.stdin, proc.stdout, proc.stderr):
+            if f is not None and not f.closed:
+                f.close()
+
+    elapsed_time = time.perf_counter() - start_time
+    return execution_result(stdout, stderr, returncode, rusage, timed_out, output_exceeded, elapsed_time, spawned_time - start_time, timings)
+
+
+async def run_checker_async(checker_path: str, input_data: str, output_data: str, timeout: float) -> bool:
+    checker_input = normalize_str(input_data.strip() + '\n' + output_data.strip()).encode("utf-8")
+    execution = await execute_async(checker_path, checker_input, None, None, timeout)
+    if execution["timed_out"]:
+        raise subprocess.TimeoutExpired(["python", checker_path], timeout)
+    return normalize_str(execution["stdout"].decode("utf-8")) == '1'
@@ -0,0 +1,142 @@
+import os
+import sys
+import time
+import select
+import threading
+import subprocess
+
+# Batch checker protocol, one record per test case:
+#   judge -> checker: b"<input length> <output length>\n" + input + output
+#   checker -> judge: b"1\n" (accepted), b"0\n" (wrong answer)
+#                     or b"error: <message>\n" (checker failure)
+
+# Bytes of the checker's stderr kept for the error when it dies or hangs.
+STDERR_TAIL = 2048
+
+
+def serve_batch(check):
+    stdin = sys.stdin.buffer
+    stdout = sys.stdout.buffer
+    while True:
+        header = stdin.readline()
+        if not header:
+            break
+        input_len, output_len = map(int, header.split())
+        input_data = stdin.read(input_len).decode("utf-8")
+        output_data = stdin.read(output_len).decode("utf-8")
+        try:
+            reply = b"1\n" if check(input_data, output_data) else b"0\n"
+        except Exception as e:
+            reply = f"error: {type(e).__name__}: {e}\n".encode("utf-8")
+        stdout.write(reply)
+        stdout.flush()
+
+
+class BatchChecker:
+    def __init__(self, checker_path: str):
+        self.checker_path = checker_path
+        self.proc = None
+        self._buffer = b""
+        self._lock = threading.Lock()
+        self._stderr_tail = b""
+        self._stderr_thread = None
+
+    def start(self):
+        self.proc = subprocess.Popen(
+            ["python", self.checker_path],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+        self._buffer = b""
+        self._stderr_tail = b""
+        # Drained continuously so a chatty checker can't fill the pipe and stall.
+        self._stderr_thread = threading.Thread(target=self._drain_stderr, args=(self.proc.stderr,), name="openjudge-checker-stderr", daemon=True)
+        self._stderr_thread.start()
+        return self
+
+    def _drain_stderr(self, pipe):
+        for data in iter(lambda: pipe.read1(4096), b""):
+            self._stderr_tail = (self._stderr_tail + data)[-STDERR_TAIL:]
+
+    def _error(self, exc_type, message: str, exited: bool = False) -> Exception:
+        if exited:
+            # Its stderr is complete once the drain thread hits EOF.
+            self._stderr_thread.join(1.0)
+        tail = self._stderr_tail.decode("utf-8", "replace").strip()
+        if tail:
+            message = f"{message}; stderr: {tail}"
+        return exc_type(message)
+
+    def check(self, input_data: str, output_data: str, timeout: float) -> str:
+        input_bytes = input_data.encode("utf-8")
+        output_bytes = output_data.encode("utf-8")
+        record = f"{len(input_bytes)} {len(output_bytes)}\n".encode("utf-8") + input_bytes + output_bytes
+
+        with self._lock:
+            if self.proc is None or self.proc.poll() is not None:
+                self.stop()
+                self.start()
+            deadline = time.monotonic() + timeout
+            try:
+                self._write(record, deadline)
+                reply = self._read_line(deadline).decode("utf-8").strip()
+            except Exception:
+                # A hung or dead checker is replaced for the next record.
+                self.stop()
+                raise
+
+        if reply.startswith("error:"):
+            raise RuntimeError(reply[len("error:"):].strip())
+        return reply
+
+    def _write(self, data: bytes, deadline: float):
+        fd = self.proc.stdin.fileno()
+        view = memoryview(data)
+        offset = 0
+        while offset < len(view):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise self._error(TimeoutError, "checker did not accept the record in time")
+            _, writable, _ = select.select([], [fd], [], remaining)
+            if writable:
+                offset += os.write(fd, view[offset:offset + select.PIPE_BUF])
+
+    def _read_line(self, deadline: float) -> bytes:
+        fd = self.proc.stdout.fileno()
+        while b"\n" not in self._buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise self._error(TimeoutError, "checker did not reply in time")
+            readable, _, _ = select.select([fd], [], [], remaining)
+            if readable:
+                data = os.read(fd, 4096)
+                if not data:
+                    raise self._error(RuntimeError, "checker exited before replying", exited=True)
+                self._buffer += data
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return line
+
+    def stop(self):
+        if self.proc is None:
+            return
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.proc.wait(timeout=0.1)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+        self.proc.stdout.close()
+        self._stderr_thread.join(1.0)
+        self.proc.stderr.close()
+        self._stderr_thread = None
+        self.proc = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
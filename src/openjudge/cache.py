@@ -0,0 +1,201 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+
+from .testcase import TC_File
+
+# Bump when the meaning of a cached verdict changes.
+CACHE_VERSION = 1
+
+_CHUNK_SIZE = 1 << 20
+
+_digests = {}
+_digests_lock = threading.Lock()
+
+
+def file_digest(path: str) -> str:
+    # Memoized per (path, size, mtime) so rejudges don't re-read test data.
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _digests_lock:
+        digest = _digests.get(memo_key)
+    if digest is not None:
+        return digest
+
+    h = hashlib.sha256()
+    with open(path, 'rb') as file:
+        while True:
+            chunk = file.read(_CHUNK_SIZE)
+            if not chunk:
+                break
+            h.update(chunk)
+    digest = h.hexdigest()
+    with _digests_lock:
+        _digests[memo_key] = digest
+    return digest
+
+
+def data_digest(data) -> str:
+    if isinstance(data, TC_File):
+        return data.sha256 or file_digest(data.path)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def expected_digest(data) -> str:
+    # Expected outputs the judge compares the same (\r\n vs \n, surrounding
+    # whitespace) share a digest, and so a cached verdict, when the manifest
+    # has one; otherwise the raw digest. The prefix keeps the two apart.
+    if isinstance(data, TC_File) and data.normalized_sha256 is not None:
+        return "n" + data.normalized_sha256
+    return data_digest(data)
+
+
+def _update_code(h, code, namespace: dict, seen: set):
+    h.update(code.co_code)
+    h.update(repr(code.co_names).encode('utf-8'))
+    for const in code.co_consts:
+        if hasattr(const, "co_code"):
+            _update_code(h, const, namespace, seen)  # nested functions and lambdas
+        else:
+            _update_value(h, const, seen)
+    # Globals the code reads (attribute names that aren't globals are skipped).
+    for name in code.co_names:
+        if name in namespace:
+            h.update(name.encode('utf-8'))
+            _update_value(h, namespace[name], seen)
+
+
+def _update_value(h, value, seen: set):
+    if id(value) in seen:
+        h.update(b"<cycle>")
+        return
+    if isinstance(value, (tuple, list, frozenset, set)):
+        seen.add(id(value))
+        h.update(type(value).__name__.encode('utf-8'))
+        items = sorted(value, key=repr) if isinstance(value, (set, frozenset)) else value
+        for item in items:
+            _update_value(h, item, seen)
+    elif isinstance(value, dict):
+        seen.add(id(value))
+        for key in sorted(value, key=repr):
+            h.update(repr(key).encode('utf-8'))
+            _update_value(h, value[key], seen)
+    elif hasattr(value, "__code__"):
+        seen.add(id(value))
+        _update_callable(h, value, seen)
+    elif isinstance(value, type(os)):
+        h.update(f"module:{value.__name__}".encode('utf-8'))
+    elif isinstance(value, type):
+        h.update(f"type:{value.__module__}.{value.__qualname__}".encode('utf-8'))
+    else:
+        h.update(repr(value).encode('utf-8'))
+    h.update(b"\0")
+
+
+def _update_callable(h, func, seen: set):
+    if hasattr(func, "__func__"):  # bound method
+        _update_value(h, func.__self__, seen)
+        func = func.__func__
+    h.update(f"{getattr(func, '__module__', '')}:{getattr(func, '__qualname__', repr(func))}".encode('utf-8'))
+    code = getattr(func, "__code__", None)
+    if code is None:
+        return
+    _update_code(h, code, getattr(func, "__globals__", {}), seen)
+    # A closure or default argument can change what the same code does:
+    # make('hi') and make('nope') must not share cached verdicts.
+    for cell in func.__closure__ or ():
+        try:
+            _update_value(h, cell.cell_contents, seen)
+        except ValueError:  # empty cell
+            h.update(b"<empty>")
+    _update_value(h, func.__defaults__, seen)
+    _update_value(h, func.__kwdefaults__, seen)
+
+
+def callable_digest(func) -> str:
+    h = hashlib.sha256()
+    _update_callable(h, func, set())
+    return h.hexdigest()
+
+
+class VerdictCache:
+    def __init__(self, cache_dir: str, max_size: int):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.total_size = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        for path, size, _ in self._entries():
+            self.total_size += size
+        if self.total_size > self.max_size:
+            self._evict()
+
+    def make_key(self, *parts) -> str:
+        payload = json.dumps([CACHE_VERSION, *parts], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + ".json")
+
+    def _entries(self):
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    yield entry.path, stat.st_size, stat.st_mtime_ns
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, 'r') as file:
+                result = json.load(file)
+            os.utime(path)  # LRU: mtime is the last access time
+        except (OSError, ValueError):
+            return None
+        result["cached"] = True
+        return result
+
+    def put(self, key: str, result: dict):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps(result).encode('utf-8')
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+        with self._lock:
+            try:
+                self.total_size -= os.path.getsize(path)
+            except OSError:
+                pass
+            os.replace(tmp_path, path)
+            self.total_size += len(data)
+            if self.total_size > self.max_size:
+                self._evict()
+
+    def _evict(self):
+        # Drop least recently used entries down to 90% of the budget.
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        target = self.max_size * 0.9
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self.total_size = total
+
+    def clear(self):
+        with self._lock:
+            for path, _, _ in list(self._entries()):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self.total_size = 0
@@ -0,0 +1,634 @@
+import os
+import hmac
+import json
+import time
+import queue
+import socket
+import struct
+import hashlib
+import argparse
+import tempfile
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor
+
+from .cache import data_digest, file_digest
+from .code_judge import TC_Judge, Checker_Judge, TimeMode, next_run_id, skipped_result, wall_time_limit
+from .results import ResultRecord, Summary
+from .testcase import TC_File
+from .zygote import Zygote
+
+# Coordinator/worker mode: a Coordinator shards a judge's test cases over
+# workers connected by TCP. Test data, solutions and checkers are sent as
+# blobs named by their sha256; each worker keeps them in an on-disk cache and
+# lists what it has when it connects, so nothing is sent twice. Workers run
+# tasks with the ordinary judge engine (run_cycle) and stream results back.
+# Tasks held by a worker whose connection drops, that stops sending
+# heartbeats, or that sits on a task well past its time limit go back to the
+# queue.
+#
+# Framing: struct "<IQ" (header length, payload length), a JSON header, then
+# the payload bytes (blobs only).
+#
+# Handshake: the coordinator sends a challenge nonce, the worker answers with
+# its hello and a nonce of its own, and the coordinator replies with a
+# welcome. With a shared secret each side proves it holds it by returning an
+# HMAC of the other's nonce; without one, anyone who can reach the port can
+# join as a worker (and workers run whatever the coordinator sends).
+
+_FRAME = struct.Struct("<IQ")
+_CHUNK_SIZE = 1 << 20
+
+HEARTBEAT_INTERVAL = 2.0
+# A worker silent for this long is dropped, even if its connection is open.
+HEARTBEAT_TIMEOUT = 10.0
+# A task still running this long after its wall time limit (build, checker
+# and transfer included) marks its worker as stuck.
+TASK_GRACE = 60.0
+# A task that got workers stuck this many times fails instead of moving on.
+TASK_STALLS = 2
+
+
+def send_message(sock: socket.socket, message: dict, payload_size: int = 0):
+    header = json.dumps(message).encode("utf-8")
+    sock.sendall(_FRAME.pack(len(header), payload_size) + header)
+
+
+def recv_message(reader) -> tuple:
+    # Returns (message, payload size), or (None, 0) at end of stream. The
+    # caller must consume the payload before reading the next message.
+    frame = reader.read(_FRAME.size)
+    if len(frame) < _FRAME.size:
+        return None, 0
+    header_size, payload_size = _FRAME.unpack(frame)
+    header = reader.read(header_size)
+    if len(header) < header_size:
+        return None, 0
+    return json.loads(header), payload_size
+
+
+def _secret_bytes(secret) -> bytes:
+    if secret is None or isinstance(secret, bytes):
+        return secret
+    return secret.encode("utf-8")
+
+
+def _sign(secret: bytes, role: str, nonce: str) -> str:
+    # The role keeps a worker's proof from being replayed as a coordinator's.
+    return hmac.new(secret, f"{role}:{nonce}".encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def _verify(secret: bytes, role: str, nonce: str, auth) -> bool:
+    return isinstance(auth, str) and hmac.compare_digest(auth, _sign(secret, role, nonce))
+
+
+def send_blob(sock: socket.socket, digest: str, data):
+    if not isinstance(data, TC_File):
+        payload = data.encode("utf-8")
+        send_message(sock, {"type": "blob", "digest": digest}, len(payload))
+        sock.sendall(payload)
+        return
+    send_message(sock, {"type": "blob", "digest": digest}, data.size)
+    with data.open() as file:
+        if type(data) is TC_File:
+            sock.sendfile(file)
+            return
+        while True:
+            chunk = file.read(_CHUNK_SIZE)
+            if not chunk:
+                break
+            sock.sendall(chunk)
+
+
+class _Task:
+    __slots__ = ("id", "job", "index", "blobs", "message", "timeout", "deadline", "stalls")
+
+    def __init__(self, task_id: int, job, index: int, blobs: list, message: dict, timeout: float = None):
+        self.id = task_id
+        self.job = job
+        self.index = index
+        self.blobs = blobs
+        self.message = message
+        self.timeout = timeout
+        self.deadline = None
+        self.stalls = 0
+
+
+# Progress markers queued next to results, for the test_start/test_finish
+# events judge() emits on its own thread.
+_DISPATCHED = "dispatched"
+_REQUEUED = "requeued"
+
+
+class _Job:
+    def __init__(self):
+        self.results = queue.Queue()
+        self.cancelled = False
+
+    def deliver(self, index: int, result):
+        self.results.put((index, result))
+
+
+class _WorkerConnection:
+    def __init__(self, sock: socket.socket, reader, name: str, slots: int, have: set):
+        self.sock = sock
+        self.reader = reader
+        self.name = name
+        self.slots = slots
+        self.have = have
+        self.in_flight = {}
+        self.alive = True
+        self.last_seen = time.monotonic()
+
+
+class Coordinator:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, worker_timeout: float = 30.0, task_grace: float = TASK_GRACE, secret=None):
+        self.host = host
+        self.port = port
+        # Workers must prove they hold this (str or bytes) to connect.
+        self.secret = _secret_bytes(secret)
+        # How long judge() waits with no worker connected before failing the
+        # remaining tests; None waits forever.
+        self.worker_timeout = worker_timeout
+        # None never treats a worker as stuck.
+        self.task_grace = task_grace
+        self._listener = None
+        self._workers = []
+        self._tasks = collections.deque()
+        self._task_ids = 0
+        self._cond = threading.Condition()
+        self._closing = False
+
+    def start(self) -> int:
+        # Listens for workers; returns the bound port.
+        self._listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._listener.bind((self.host, self.port))
+        self._listener.listen()
+        self.port = self._listener.getsockname()[1]
+        threading.Thread(target=self._accept_loop, name="openjudge-coordinator", daemon=True).start()
+        threading.Thread(target=self._watch_loop, name="openjudge-heartbeats", daemon=True).start()
+        return self.port
+
+    @property
+    def workers(self) -> int:
+        with self._cond:
+            return len(self._workers)
+
+    @property
+    def slots(self) -> int:
+        with self._cond:
+            return sum(worker.slots for worker in self._workers)
+
+    def wait_for_workers(self, count: int, timeout: float = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while len(self._workers) < count:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _accept_loop(self):
+        while True:
+            try:
+                sock, _ = self._listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._register, args=(sock,), daemon=True).start()
+
+    def _watch_loop(self):
+        while True:
+            time.sleep(HEARTBEAT_INTERVAL)
+            with self._cond:
+                if self._closing:
+                    return
+                now = time.monotonic()
+                # Heartbeats only show the process is alive; a worker can
+                # still hang on one task (a stuck checker, a wedged slot).
+                lost = [
+                    worker for worker in self._workers
+                    if now - worker.last_seen > HEARTBEAT_TIMEOUT
+                    or any(task.deadline is not None and now > task.deadline for task in worker.in_flight.values())
+                ]
+            for worker in lost:
+                self._worker_lost(worker)
+
+    def _register(self, sock: socket.socket):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        reader = sock.makefile('rb')
+        try:
+            sock.settimeout(10)
+            nonce = os.urandom(16).hex()
+            send_message(sock, {"type": "challenge", "nonce": nonce})
+            hello, _ = recv_message(reader)
+            if hello is None or hello.get("type") != "hello":
+                raise ValueError("expected a hello message")
+            if self.secret is not None and not _verify(self.secret, "worker", nonce, hello.get("auth")):
+                raise ValueError("worker failed to authenticate")
+            auth = _sign(self.secret, "coordinator", str(hello["nonce"])) if self.secret is not None else None
+            send_message(sock, {"type": "welcome", "auth": auth})
+            sock.settimeout(None)
+            worker = _WorkerConnection(sock, reader, hello["name"], max(1, int(hello["slots"])), set(hello["have"]))
+        except (OSError, ValueError, KeyError):
+            reader.close()
+            sock.close()
+            return
+        with self._cond:
+            if self._closing:
+                sock.close()
+                return
+            self._workers.append(worker)
+            self._cond.notify_all()
+        threading.Thread(target=self._send_loop, args=(worker,), name=f"openjudge-send-{worker.name}", daemon=True).start()
+        self._recv_loop(worker)
+
+    def _send_loop(self, worker: _WorkerConnection):
+        while True:
+            with self._cond:
+                while worker.alive and not self._closing and (len(worker.in_flight) >= worker.slots or not self._tasks):
+                    self._cond.wait()
+                if not worker.alive or self._closing:
+                    return
+                task = self._tasks.popleft()
+                worker.in_flight[task.id] = task
+                # Queued under the lock, so before any result or requeue.
+                task.job.deliver(task.index, _DISPATCHED)
+            try:
+                for digest, data in task.blobs:
+                    if digest not in worker.have:
+                        send_blob(worker.sock, digest, data)
+                        worker.have.add(digest)
+                send_message(worker.sock, task.message)
+                if task.timeout is not None:
+                    task.deadline = time.monotonic() + task.timeout
+            except OSError:
+                self._worker_lost(worker)
+                return
+
+    def _recv_loop(self, worker: _WorkerConnection):
+        try:
+            while True:
+                message, _ = recv_message(worker.reader)
+                if message is None:
+                    break
+                worker.last_seen = time.monotonic()
+                if message.get("type") != "result":
+                    continue
+                with self._cond:
+                    task = worker.in_flight.pop(message["task"], None)
+                    self._cond.notify_all()
+                if task is not None:
+                    task.job.deliver(task.index, ResultRecord.from_dict(message["result"]))
+        except (OSError, ValueError):
+            pass
+        self._worker_lost(worker)
+
+    def _worker_lost(self, worker: _WorkerConnection):
+        with self._cond:
+            if not worker.alive:
+                return
+            worker.alive = False
+            self._workers.remove(worker)
+            # Whatever the worker still held is run again elsewhere, unless
+            # its job was cancelled or it keeps getting workers stuck; judge()
+            # still waits on those, so they get a result here.
+            now = time.monotonic()
+            lost, finished = [], []
+            for task in worker.in_flight.values():
+                if task.deadline is not None and now > task.deadline:
+                    task.stalls += 1
+                task.deadline = None
+                if task.job.cancelled:
+                    finished.append((task, skipped_result()))
+                elif task.stalls >= TASK_STALLS:
+                    finished.append((task, _stuck_result()))
+                else:
+                    lost.append(task)
+            self._tasks.extendleft(reversed(lost))
+            for task in lost:
+                task.job.deliver(task.index, _REQUEUED)
+            worker.in_flight.clear()
+            self._cond.notify_all()
+        for task, result in finished:
+            task.job.deliver(task.index, result)
+        try:
+            worker.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        worker.sock.close()
+
+    def _cancel(self, job: _Job, result=skipped_result):
+        # Drops the job's queued tasks; each gets result().
+        with self._cond:
+            job.cancelled = True
+            dropped = [task for task in self._tasks if task.job is job]
+            self._tasks = collections.deque(task for task in self._tasks if task.job is not job)
+        for task in dropped:
+            job.deliver(task.index, result())
+
+    def _judge_spec(self, judge) -> tuple:
+        blobs = [(file_digest(judge.code_path), TC_File(judge.code_path))]
+        spec = {
+            "kind": "tc" if isinstance(judge, TC_Judge) else "checker",
+            "code": blobs[0][0],
+            "language": judge.language.name,
+            "checker": None,
+            "time_limit": judge.time_limit,
+            "time_mode": judge.time_mode.name,
+            "memory_limit": judge.memory_limit,
+            "output_limit": judge.output_limit,
+        }
+        if isinstance(judge, Checker_Judge):
+            if judge.checker_path is None:
+                raise ValueError("only checker scripts can be sent to workers, not callables")
+            blobs.append((file_digest(judge.checker_path), TC_File(judge.checker_path)))
+            spec["checker"] = blobs[1][0]
+        return spec, blobs
+
+    def judge(self, judge):
+        # Runs judge's tests on the workers instead of locally. results,
+        # summary, hooks and max_failures behave as in judge.run(); hooks are
+        # called on this thread.
+        if judge.code_path is None:
+            raise ValueError("code_path cannot be None")
+        spec, judge_blobs = self._judge_spec(judge)
+        cases = judge._cases()
+        timeout = wall_time_limit(judge.time_limit, judge.time_mode)
+        if timeout is not None and self.task_grace is not None:
+            timeout += self.task_grace
+        else:
+            timeout = None
+
+        judge.results = []
+        judge.summary = Summary()
+        job = _Job()
+        tasks = []
+        with self._cond:
+            first_id = self._task_ids
+            self._task_ids += len(cases)
+        for i, (input_data, output_data) in enumerate(cases):
+            blobs = judge_blobs + [(data_digest(input_data), input_data)]
+            message = {"type": "task", "task": first_id + i, "judge": spec, "input": blobs[-1][0], "output": None}
+            if output_data is not None:
+                blobs.append((data_digest(output_data), output_data))
+                message["output"] = blobs[-1][0]
+            tasks.append(_Task(first_id + i, job, i, blobs, message, timeout))
+
+        start_time = time.perf_counter()
+        judge._run_id = next_run_id()
+        judge._emit({"event": "run_start", "run": judge._run_id, "tests": len(cases), "workers": self.slots})
+        if judge.tracer is not None:
+            judge._trace_run_start(len(cases), self.slots)
+        with self._cond:
+            self._tasks.extend(tasks)
+            self._cond.notify_all()
+
+        results = [None] * len(cases) if judge.keep_results else []
+        failures = 0
+        received = 0
+        idle_since = None
+        running = set()
+        try:
+            while received < len(cases):
+                try:
+                    i, result = job.results.get(timeout=HEARTBEAT_INTERVAL)
+                except queue.Empty:
+                    with self._cond:
+                        idle = not self._workers
+                    if not idle or self.worker_timeout is None:
+                        idle_since = None
+                    elif idle_since is None:
+                        idle_since = time.monotonic()
+                    elif time.monotonic() - idle_since >= self.worker_timeout:
+                        self._cancel(job, _no_workers_result)
+                    continue
+                if result is _DISPATCHED:
+                    if i not in running:
+                        running.add(i)
+                        judge._test_started()
+                    continue
+                if i in running:
+                    running.discard(i)
+                    judge._test_finished()
+                if result is _REQUEUED:
+                    continue
+                received += 1
+                if judge.keep_results:
+                    results[i] = result
+                judge._on_result(i, result)
+                if judge.max_failures is None or result["status"] in ("AC", "SKIPPED"):
+                    continue
+                failures += 1
+                if failures >= judge.max_failures and not job.cancelled:
+                    self._cancel(job)
+        except BaseException as e:
+            judge._run_failed(e)
+            raise
+        finally:
+            if not job.cancelled:
+                self._cancel(job)
+            for _ in running:
+                judge._test_finished()
+        judge.results = results
+        judge._emit({"event": "run_end", "run": judge._run_id, "tests": len(cases), "duration": time.perf_counter() - start_time})
+        if judge.tracer is not None:
+            judge.tracer.info("finished %d tests in %.3fms", len(cases), (time.perf_counter() - start_time) * 1000)
+
+    def stop(self):
+        with self._cond:
+            self._closing = True
+            workers = list(self._workers)
+            self._cond.notify_all()
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+        for worker in workers:
+            self._worker_lost(worker)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def _no_workers_result() -> ResultRecord:
+    # A judge-side error, like the RE results with no return code elsewhere.
+    return ResultRecord("RE", "Runtime Error: no workers connected", 0, None)
+
+
+def _stuck_result() -> ResultRecord:
+    return ResultRecord("RE", "Runtime Error: workers got stuck on this test", 0, None)
+
+
+class Worker:
+    def __init__(self, host: str, port: int, slots: int = None, cache_dir: str = None, use_zygote: bool = False, name: str = None, secret=None):
+        if slots is None:
+            slots = os.cpu_count() or 1
+        if slots <= 0:
+            raise ValueError("slots must be over 0")
+        self.host = host
+        self.port = port
+        self.slots = slots
+        self.cache_dir = cache_dir if cache_dir is not None else os.path.join(tempfile.gettempdir(), "openjudge-worker")
+        self.use_zygote = use_zygote
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        # The coordinator must prove it holds this before any task is run.
+        self.secret = _secret_bytes(secret)
+        self._judges = {}
+        self._judges_lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._zygote = None
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, digest)
+
+    def _receive_blob(self, reader, digest: str, size: int):
+        # Stored under its digest only after the content has been verified.
+        h = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                remaining = size
+                while remaining:
+                    chunk = reader.read(min(remaining, _CHUNK_SIZE))
+                    if not chunk:
+                        raise ConnectionError("connection closed in the middle of a blob")
+                    h.update(chunk)
+                    file.write(chunk)
+                    remaining -= len(chunk)
+            if h.hexdigest() != digest:
+                raise ValueError(f"blob {digest} arrived corrupted")
+            os.replace(tmp_path, self._blob_path(digest))
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def _judge_for(self, spec: dict):
+        key = json.dumps(spec, sort_keys=True)
+        with self._judges_lock:
+            judge = self._judges.get(key)
+            if judge is None:
+                if len(self._judges) >= 256:
+                    self._judges.clear()
+                judge = TC_Judge() if spec["kind"] == "tc" else Checker_Judge()
+                judge.load_code(self._blob_path(spec["code"]), spec["language"])
+                if spec["checker"] is not None:
+                    judge.load_checker(self._blob_path(spec["checker"]))
+                if spec["time_limit"] is not None:
+                    judge.set_time_limit(spec["time_limit"])
+                else:
+                    judge.time_limit = None
+                judge.set_time_mode(TimeMode[spec["time_mode"]])
+                judge.set_memory_limit(spec["memory_limit"])
+                judge.set_output_limit(spec["output_limit"])
+                judge._zygote = self._zygote
+                # Compiled once per worker; later tasks reuse the build.
+                judge.compile()
+                self._judges[key] = judge
+            return judge
+
+    def _run_task(self, sock: socket.socket, message: dict):
+        try:
+            judge = self._judge_for(message["judge"])
+            input_data = TC_File(self._blob_path(message["input"]))
+            if message["output"] is not None:
+                result = judge.run_cycle(input_data, TC_File(self._blob_path(message["output"])))
+            else:
+                result = judge.run_cycle(input_data)
+        except Exception as e:
+            result = ResultRecord("RE", f"Runtime Error: {type(e).__name__}: {e}", 0, None)
+        try:
+            with self._send_lock:
+                send_message(sock, {"type": "result", "task": message["task"], "result": result.to_dict()})
+        except OSError:
+            pass
+
+    def _heartbeat_loop(self, sock: socket.socket, stopped: threading.Event):
+        while not stopped.wait(HEARTBEAT_INTERVAL):
+            try:
+                with self._send_lock:
+                    send_message(sock, {"type": "heartbeat"})
+            except OSError:
+                return
+
+    def run(self):
+        # Serves one coordinator connection until it closes.
+        sock = socket.create_connection((self.host, self.port))
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        reader = sock.makefile('rb')
+        have = [name for name in os.listdir(self.cache_dir) if len(name) == 64]
+        self._zygote = None
+        self._judges = {}
+        stopped = threading.Event()
+        try:
+            sock.settimeout(10)
+            challenge, _ = recv_message(reader)
+            if challenge is None or challenge.get("type") != "challenge":
+                raise ConnectionError("expected a challenge message")
+            nonce = os.urandom(16).hex()
+            auth = _sign(self.secret, "worker", str(challenge["nonce"])) if self.secret is not None else None
+            send_message(sock, {"type": "hello", "name": self.name, "slots": self.slots, "have": have, "nonce": nonce, "auth": auth})
+            welcome, _ = recv_message(reader)
+            if welcome is None or welcome.get("type") != "welcome":
+                raise ConnectionError("the coordinator refused the connection")
+            if self.secret is not None and not _verify(self.secret, "coordinator", nonce, welcome.get("auth")):
+                raise ValueError("coordinator failed to authenticate")
+            sock.settimeout(None)
+            self._zygote = Zygote().start() if self.use_zygote else None
+            threading.Thread(target=self._heartbeat_loop, args=(sock, stopped), name="openjudge-heartbeat", daemon=True).start()
+            with ThreadPoolExecutor(max_workers=self.slots) as executor:
+                while True:
+                    message, payload_size = recv_message(reader)
+                    if message is None:
+                        break
+                    if message["type"] == "blob":
+                        self._receive_blob(reader, message["digest"], payload_size)
+                    elif message["type"] == "task":
+                        executor.submit(self._run_task, sock, message)
+        finally:
+            stopped.set()
+            reader.close()
+            sock.close()
+            if self._zygote is not None:
+                self._zygote.stop()
+                self._zygote = None
+
+    def serve_forever(self, retry: float = 1.0):
+        # Reconnects whenever the coordinator goes away or isn't up yet.
+        while True:
+            try:
+                self.run()
+            except (OSError, ValueError):
+                pass
+            time.sleep(retry)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="openjudge cluster worker")
+    parser.add_argument("command", choices=["worker"])
+    parser.add_argument("--connect", required=True, metavar="HOST:PORT", help="coordinator address")
+    parser.add_argument("--slots", type=int, default=None, help="tests run at once (default: CPU count)")
+    parser.add_argument("--cache-dir", default=None, help="where received blobs are kept")
+    parser.add_argument("--zygote", action="store_true", help="spawn solutions from a zygote")
+    parser.add_argument("--once", action="store_true", help="exit when the coordinator disconnects")
+    parser.add_argument(
+        "--secret", default=os.environ.get("OPENJUDGE_CLUSTER_SECRET"),
+        help="shared secret (default: $OPENJUDGE_CLUSTER_SECRET, which unlike arguments doesn't show up in ps)"
+    )
+    args = parser.parse_args()
+
+    host, port = args.connect.rsplit(":", 1)
+    worker = Worker(host, int(port), args.slots, args.cache_dir, args.zygote, secret=args.secret)
+    if args.once:
+        worker.run()
+    else:
+        worker.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
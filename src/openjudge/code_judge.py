@@ -1,48 +1,348 @@
+import io
 import os
+import re
 import time
-import subprocess
-import psutil
+import queue
+import asyncio
 import threading
+import importlib
+import itertools
+import subprocess
+from enum import Enum
+from concurrent.futures import Future, ThreadPoolExecutor
+from .aio import execute_async, run_checker_async
+from .batch_checker import BatchChecker
+from .cache import VerdictCache, callable_digest, data_digest, expected_digest, file_digest
+from .compare import StreamComparator
+from .languages import build, build_key, memory_rlimit, resolve_language, run_command
+from .sandbox import PYTHON_MEMORY_ERRORS, CancelScope, execute, memory_exceeded
+from .manifest import load_manifest
+from .pack import TestPack, is_pack
+from .testcase import TC_File, from_manifest, normalize_str, open_input, read_text
+from .trace import HeadCapture, TraceLevel, Tracer, describe
+from .results import ResultRecord, Summary
+from .zygote import Zygote
+
+# In CPU mode the wall clock only guards against sleeping or blocked programs.
+CPU_MODE_WALL_FACTOR = 3
+
+CHECKER_TIMEOUT = 1.0
+
+class TimeMode(Enum):
+    WALL = 0
+    CPU = 1
+
+def wall_time_limit(time_limit: float, time_mode: TimeMode) -> float:
+    # None means no time limit, as after reset().
+    if time_limit is not None and time_mode == TimeMode.CPU:
+        return time_limit * CPU_MODE_WALL_FACTOR
+    return time_limit
+
+def judged_time(execution: dict, time_mode: TimeMode) -> float:
+    rusage = execution["rusage"]
+    if time_mode == TimeMode.CPU and rusage is not None:
+        return rusage["cpu_time_user"] + rusage["cpu_time_sys"]
+    return execution["elapsed_time"]
+
+def make_result(status: str, message: str, elapsed_time: float, return_code: int, execution: dict = None) -> ResultRecord:
+    rusage = execution["rusage"] if execution is not None else None
+    return ResultRecord(
+        status,
+        message,
+        elapsed_time,
+        return_code,
+        wall_time=execution["elapsed_time"] if execution is not None else None,
+        cpu_time_user=rusage["cpu_time_user"] if rusage is not None else None,
+        cpu_time_sys=rusage["cpu_time_sys"] if rusage is not None else None,
+        peak_rss_kb=rusage["peak_rss_kb"] if rusage is not None else None
+    )
+
+def is_cacheable(result: dict) -> bool:
+    # Skips, checker failures and judge-side errors may not repeat on a rerun.
+    if result["status"] in ("SKIPPED", "CKE"):
+        return False
+    return not (result["status"] == "RE" and result["return_code"] is None)
+
+_run_ids = itertools.count(1)
+
+def next_run_id() -> int:
+    # Tags the events of one run, so hooks can tell concurrent runs apart.
+    return next(_run_ids)
+
+def skipped_result() -> ResultRecord:
+    return make_result("SKIPPED", "Skipped", 0, None)
+
+def run_cases(run_cycle, cases, workers: int, max_failures: int = None, scope: CancelScope = None, on_result=None, keep_results: bool = True) -> list:
+    # Runs run_cycle(*case) on a bounded pool and returns results in case
+    # order. Once max_failures non-AC results have come back, queued cases
+    # are dropped and the scope kills the children still running.
+    # on_result(i, result) is called from this thread as results come in;
+    # with keep_results=False nothing else holds on to them.
+    # run_cycle may also return a Future for a later pipeline stage (e.g. a
+    # checker pool); the case's result is then that Future's result.
+    results = [None] * len(cases) if keep_results else []
+    done = bytearray(len(cases))
+    failures = 0
+    # Futures report themselves here when done, cancelled ones included.
+    finished = queue.SimpleQueue()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for i, case in enumerate(cases):
+            future = executor.submit(run_cycle, *case)
+            futures[future] = i
+            future.add_done_callback(finished.put)
+        while futures:
+            future = finished.get()
+            i = futures.pop(future)
+            if future.cancelled():
+                continue
+            result = future.result()
+            if isinstance(result, Future):
+                futures[result] = i
+                result.add_done_callback(finished.put)
+                if scope is not None and scope.cancelled:
+                    result.cancel()
+                continue
+            done[i] = 1
+            if keep_results:
+                results[i] = result
+            if on_result is not None:
+                on_result(i, result)
+            if max_failures is None or result["status"] in ("AC", "SKIPPED"):
+                continue
+            failures += 1
+            if failures >= max_failures and not (scope is not None and scope.cancelled):
+                for pending in futures:
+                    pending.cancel()
+                if scope is not None:
+                    scope.cancel()
+    for i in range(len(cases)):
+        if not done[i]:
+            result = skipped_result()
+            if keep_results:
+                results[i] = result
+            if on_result is not None:
+                on_result(i, result)
+    return results
+
+async def iter_cases_async(run_cycle, cases, workers: int, max_failures: int = None):
+    # Async counterpart of run_cases: awaits run_cycle(*case) with at most
+    # `workers` running and yields (i, result) as they finish. Once
+    # max_failures non-AC results are in, running cases are cancelled (which
+    # kills their children) and the rest are yielded as skipped.
+    pending = {}
+    done = bytearray(len(cases))
+    next_case = 0
+    failures = 0
+    stopped = False
+    try:
+        while True:
+            while not stopped and next_case < len(cases) and len(pending) < workers:
+                pending[asyncio.ensure_future(run_cycle(*cases[next_case]))] = next_case
+                next_case += 1
+            if not pending:
+                break
+            finished, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in finished:
+                i = pending.pop(future)
+                result = future.result()
+                done[i] = 1
+                yield i, result
+                if max_failures is None or result["status"] in ("AC", "SKIPPED"):
+                    continue
+                failures += 1
+                stopped = stopped or failures >= max_failures
+            if stopped:
+                break
+    finally:
+        for future in pending:
+            future.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+    for i in range(len(cases)):
+        if not done[i]:
+            yield i, skipped_result()
+
+def compile_error_result(build_result) -> ResultRecord:
+    return make_result("CE", f"Compile Error: {build_result.error}", 0, None)
+
+def resolve_checker(checker_ref: str):
+    module_name, func_name = checker_ref.split(":", 1)
+    checker = importlib.import_module(module_name)
+    for attr in func_name.split("."):
+        checker = getattr(checker, attr)
+    if not callable(checker):
+        raise ValueError(f"{checker_ref} is not callable")
+    return checker
+
+def parse_checker_verdict(verdict):
+    # A callable checker returns a bool, or a tuple of the bool followed by
+    # an optional score and/or message: (ok, score), (ok, message), (ok, score, message)
+    score, message = None, None
+    if isinstance(verdict, tuple):
+        if not verdict:
+            raise ValueError("checker returned an empty tuple")
+        verdict, extras = verdict[0], verdict[1:]
+        for extra in extras:
+            if isinstance(extra, str):
+                message = extra
+            elif isinstance(extra, (int, float)) and not isinstance(extra, bool):
+                score = extra
+            elif extra is not None:
+                raise ValueError(f"unexpected checker result field: {extra!r}")
+    if not isinstance(verdict, bool):
+        raise ValueError(f"checker verdict must be a bool, got {verdict!r}")
+    return verdict, score, message
+
+def run_checker(checker_path: str, input_data: str, output_data: str, timeout: float = CHECKER_TIMEOUT) -> bool:
+    checker_input = input_data.strip() + '\n' + output_data.strip()
+
+    checker_result = subprocess.run(
+        ["python", checker_path],
+        input = normalize_str(checker_input).encode("utf-8"),
+        capture_output=True,
+        timeout=timeout
+    )
+
+    checker_output = checker_result.stdout.decode("utf-8")
+    return normalize_str(checker_output) == '1'
+
+def record_phases(phases: dict, execution: dict):
+    timings = execution["timings"]
+    phases["spawn"] = timings["spawn"]
+    phases["run"] = timings["run"]
+    phases["io_drain"] = timings["io"]
+    if timings["sink"]:
+        phases["compare"] = phases.get("compare", 0.0) + timings["sink"]
 
-def normalize_str(s: str) -> str:
-    return s.replace('\r\n', '\n').rstrip('\n').rstrip('\r')
+def classify_execution(execution: dict, time_limit: float, time_mode: TimeMode, memory_limit: int, memory_errors: tuple = PYTHON_MEMORY_ERRORS) -> ResultRecord:
+    # OLE/TLE/MLE/RE verdicts shared by both judges; None if the run was clean.
+    stderr = execution["stderr"]
+    return_code = execution["returncode"]
+    elapsed_time = judged_time(execution, time_mode)
 
-class TC_Judge:
+    if execution["output_exceeded"]:
+        return make_result("OLE", "Output Limit Exceeded", elapsed_time, -1, execution)
+
+    if execution["timed_out"] or (time_limit is not None and elapsed_time > time_limit):
+        return make_result("TLE", "Time Limit Exceeded", elapsed_time if time_limit is None else time_limit, -1, execution)
+
+    if memory_exceeded(execution, memory_limit, memory_errors):
+        return make_result("MLE", "Memory Limit Exceeded", elapsed_time, -1, execution)
+
+    if return_code != 0 or stderr:
+        return make_result("RE", f"Runtime Error: {stderr.decode('utf-8', errors='replace')}", elapsed_time, return_code, execution)
+    return None
+
+def format_usage(result: dict) -> str:
+    usage = f"elapsed_time: {result['elapsed_time'] * 1000:.3f}ms"
+    if result.get("cpu_time_user") is not None:
+        cpu_time = (result["cpu_time_user"] + result["cpu_time_sys"]) * 1000
+        usage += f", cpu_time: {cpu_time:.3f}ms, memory: {result['peak_rss_kb']}KB"
+    return usage
+
+
+class _BaseJudge:
+    # The engine shared by TC_Judge and Checker_Judge: test loading, limits,
+    # build, cache, hooks, tracing and the run loops. Subclasses judge one
+    # test once the solution is built and the cache missed (_judge_cycle and
+    # _judge_cycle_async), plus any per-run resources of their own.
+    _cache_kind = None
+    _expects_output = False
     def __init__(self):
         self.TC_in = []
-        self.TC_out = []
         self.code_path = None
+        self.language = None
+        self.build_dir = None
+        self._build = None
         self.time_limit = 2
+        self.time_mode = TimeMode.WALL
         self.memory_limit = 256
+        self.output_limit = None
+        self.workers = os.cpu_count() or 1
+        self.use_zygote = False
+        self._zygote = None
+        self.max_failures = None
+        self._scope = None
+        self._cache = None
+        self._cache_digests = None
+        self.hooks = []
+        self._run_id = None
+        self.tracer = None
+        self.keep_results = True
         self.results = []
+        self.summary = Summary()
+
+    def load_TC(self, tc_path: str, tc_count: int = None, format: int = None):
+        start_time = time.perf_counter()
+        loaded = len(self.TC_in)
+        self._load_TC(tc_path, tc_count, format)
+        self._emit({"event": "load", "path": tc_path, "tests": len(self.TC_in) - loaded, "duration": time.perf_counter() - start_time})
+        if self.tracer is not None:
+            self.tracer.info("loaded %d tests from %s in %.3fms", len(self.TC_in) - loaded, tc_path, (time.perf_counter() - start_time) * 1000)
 
-    def load_TC(self, tc_path: str, tc_count: int, format: int):
+    def _load_TC(self, tc_path: str, tc_count: int = None, format: int = None):
         if tc_path is None:
             raise ValueError("tc_path cannot be None")
-        if tc_count is None:
-            raise ValueError("tc_count cannot be None")
-        if format is None:
-            format = len(str(tc_count))
-        if tc_count <= 0:
-            raise ValueError("tc_count must be over 0")
-        
-        for i in range(1, tc_count + 1):
-            fname = str(i).zfill(format)
-            in_dir = os.path.join(tc_path, "test" + fname + ".in")
-            out_dir = os.path.join(tc_path, "test" + fname + ".out")
-
-            with open(in_dir, 'r') as file:
-                input_read = file.read()
-                self.TC_in.append(input_read)
-            
-            with open(out_dir, 'r') as file:
-                output_read = file.read()
-                self.TC_out.append(output_read)
-
-    def load_code(self, code_path: str):
+        if is_pack(tc_path):
+            cases = TestPack(tc_path).cases[:tc_count]
+        elif tc_count is None:
+            # No count given: use the test directory's manifest instead.
+            cases = []
+            for case in load_manifest(tc_path)["cases"]:
+                output_data = from_manifest(tc_path, case["out"]) if case["out"] is not None else None
+                cases.append((case["name"], from_manifest(tc_path, case["in"]), output_data))
+        else:
+            if format is None:
+                format = len(str(tc_count))
+            if tc_count <= 0:
+                raise ValueError("tc_count must be over 0")
+
+            cases = []
+            for i in range(1, tc_count + 1):
+                name = "test" + str(i).zfill(format)
+                in_dir = os.path.join(tc_path, name + ".in")
+                out_dir = os.path.join(tc_path, name + ".out")
+                cases.append((name, TC_File(in_dir), TC_File(out_dir) if self._expects_output else None))
+        for name, input_data, output_data in cases:
+            self._add_case(tc_path, name, input_data, output_data)
+
+    def _add_case(self, tc_path: str, name: str, input_data, output_data):
+        self.TC_in.append(input_data)
+
+    def load_code(self, code_path: str, language=None):
+        # language: a registered name ("cpp", "java", ...) or Language;
+        # detected from the file extension when omitted.
         if code_path is None:
             raise ValueError("code_path cannot be None")
+        self.language = resolve_language(code_path, language)
         self.code_path = code_path
+        self._build = None
+
+    def set_build_dir(self, build_dir: str):
+        # Where compiled solutions are cached (default: a temp directory).
+        self.build_dir = build_dir
+        self._build = None
+
+    def compile(self):
+        # Builds the solution once; run() calls this, and compiled languages
+        # are only rebuilt when the source, compiler or flags change.
+        if self.code_path is None:
+            raise ValueError("code_path cannot be None")
+        return self._compiled(build(self.code_path, self.language, self.build_dir))
+
+    def _compiled(self, build_result):
+        self._build = build_result
+        self._emit({"event": "compile", "language": self.language.name, "cached": build_result.cached, "duration": build_result.duration, "error": build_result.error})
+        if self.tracer is not None:
+            self.tracer.info("compiled %s as %s in %.3fms (cached %s)%s", self.code_path, self.language.name, build_result.duration * 1000, build_result.cached, ": compile error" if build_result.error is not None else "")
+        return build_result
+
+    def _program(self):
+        # Python solutions go through the zygote when one is running.
+        if self._zygote is not None and self._build.language.zygote:
+            return self._build.source
+        return run_command(self._build.command, self.memory_limit)
 
     def set_time_limit(self, time_limit: int):
         if time_limit is None:
@@ -51,6 +351,11 @@ class TC_Judge:
             raise ValueError("time_limit must be over 0")
         self.time_limit = time_limit
 
+    def set_time_mode(self, time_mode: TimeMode):
+        if not isinstance(time_mode, TimeMode):
+            raise ValueError("time_mode must be a TimeMode")
+        self.time_mode = time_mode
+
     def set_memory_limit(self, memory_limit: int):
         if memory_limit is None:
             raise ValueError("memory_limit cannot be None")
@@ -58,337 +363,685 @@ class TC_Judge:
             raise ValueError("memory_limit must be over 0")
         self.memory_limit = memory_limit
 
-    def run(self):
-        self.results = []        
-        for i in range(len(self.TC_in)):
-            result = self.__run_cycle(self.TC_in[i], self.TC_out[i])
-            self.results.append(result)
+    def set_output_limit(self, output_limit: int):
+        # MB per stream; None (the default) leaves output unlimited.
+        if output_limit is not None and output_limit <= 0:
+            raise ValueError("output_limit must be over 0")
+        self.output_limit = output_limit
+
+    def _output_limit_bytes(self) -> int:
+        return None if self.output_limit is None else self.output_limit * 1024 * 1024
+
+    def set_workers(self, workers: int):
+        if workers is None:
+            raise ValueError("workers cannot be None")
+        if workers <= 0:
+            raise ValueError("workers must be over 0")
+        self.workers = workers
+
+    def set_zygote(self, use_zygote: bool):
+        self.use_zygote = bool(use_zygote)
+
+    def set_keep_results(self, keep_results: bool):
+        # False: results are only summarized and passed to hooks/sinks.
+        self.keep_results = bool(keep_results)
 
-    def __run_cycle(self, input_data: str, output_data: str):
+    def set_trace(self, level: TraceLevel = TraceLevel.DEBUG, stream=None, max_payload: int = 256, sample: int = 1):
+        # TraceLevel.OFF (or None) removes the tracer entirely.
+        if level is None or level == TraceLevel.OFF:
+            self.tracer = None
+            return
+        if not isinstance(level, TraceLevel):
+            raise ValueError("level must be a TraceLevel")
+        if max_payload is None or max_payload < 0:
+            raise ValueError("max_payload cannot be negative")
+        if sample is None or sample <= 0:
+            raise ValueError("sample must be over 0")
+        self.tracer = Tracer(level, stream, max_payload, sample)
+
+    def set_max_failures(self, max_failures: int):
+        if max_failures is not None and max_failures <= 0:
+            raise ValueError("max_failures must be over 0")
+        self.max_failures = max_failures
+
+    def set_stop_on_first_failure(self, stop_on_first_failure: bool):
+        self.max_failures = 1 if stop_on_first_failure else None
+
+    def set_cache(self, cache_dir: str, max_size: int = 256):
+        if cache_dir is None:
+            self._cache = None
+            return
+        if max_size <= 0:
+            raise ValueError("max_size must be over 0")
+        self._cache = VerdictCache(cache_dir, max_size * 1024 * 1024)
+
+    def add_hook(self, hook):
+        # hook(event: dict) receives "load", "compile", "run_start", "test" and
+        # "run_end" events, or "run_failed" when a run raises or is closed
+        # early, on the thread that called load_TC() or run(). "test_start"
+        # and "test_finish" bracket each test actually judged (not cached)
+        # and come from the thread judging it, so they may arrive at once.
+        if not callable(hook):
+            raise ValueError("hook must be callable")
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    def _emit(self, event: dict):
+        for hook in self.hooks:
+            hook(event)
+
+    def _trace_run_start(self, tests: int, workers: int):
+        self.tracer.info("running %s (%s) on %d tests, %d workers", self.code_path, self.language.name, tests, workers)
+        self.tracer.debug(
+            "limits: time %ss (%s), memory %sMB, output %sMB, zygote %s, cache %s, max_failures %s",
+            self.time_limit, self.time_mode.name, self.memory_limit, self.output_limit,
+            self.use_zygote, self._cache is not None, self.max_failures
+        )
+
+    def _trace_result(self, input_data, result: dict):
+        tracer = self.tracer
+        message = result["message"]
+        if len(message) > tracer.max_payload:
+            message = message[:tracer.max_payload] + "..."
+        tracer.info("%s: %s %r", describe(input_data), result["status"], message)
+        if tracer.enabled(TraceLevel.DEBUG):
+            phases = ", ".join(f"{name} {duration * 1000:.3f}ms" for name, duration in result.get("phases", {}).items())
+            tracer.debug("%s: cached %s, return code %s, %s", describe(input_data), result["cached"], result["return_code"], phases)
+
+    def _on_result(self, i: int, result: ResultRecord):
+        self.summary.add(result)
+        if self.hooks:
+            self._emit({"event": "test", "run": self._run_id, "index": i, "status": result["status"], "phases": result.get("phases", {}), "result": result})
+
+    def _test_started(self):
+        if self.hooks:
+            self._emit({"event": "test_start", "run": self._run_id})
+
+    def _test_finished(self):
+        if self.hooks:
+            self._emit({"event": "test_finish", "run": self._run_id})
+
+    def _run_failed(self, error: BaseException):
+        self._emit({"event": "run_failed", "run": self._run_id, "error": f"{type(error).__name__}: {error}"})
+
+    def _cases(self) -> list:
+        raise NotImplementedError
+
+    def _run_digests(self) -> tuple:
+        # What, besides the test data, a cached verdict depends on.
+        return (build_key(self.code_path, self.language),)
+
+    def _open_run(self, workers: int, threaded: bool = True):
+        # Per-run resources of a subclass; threaded is False for async runs.
+        pass
+
+    def _close_run(self):
+        pass
+
+    def run(self, workers: int = None):
+        self.results = []
+        self.summary = Summary()
+        if workers is None:
+            workers = self.workers
+        if workers <= 0:
+            raise ValueError("workers must be over 0")
+
+        self.compile()
+        self._zygote = Zygote().start() if self.use_zygote and self.language.zygote else None
+        self._scope = CancelScope()
+        self._open_run(workers)
+        if self._cache is not None:
+            self._cache_digests = self._run_digests()
+        start_time = time.perf_counter()
+        self._run_id = next_run_id()
         try:
-            start_time = time.perf_counter()
+            cases = self._cases()
+            self._emit({"event": "run_start", "run": self._run_id, "tests": len(cases), "workers": workers})
+            if self.tracer is not None:
+                self._trace_run_start(len(cases), workers)
+            self.results = run_cases(self.run_cycle, cases, workers, self.max_failures, self._scope, self._on_result, self.keep_results)
+            self._emit({"event": "run_end", "run": self._run_id, "tests": len(cases), "duration": time.perf_counter() - start_time})
+            if self.tracer is not None:
+                self.tracer.info("finished %d tests in %.3fms", len(cases), (time.perf_counter() - start_time) * 1000)
+        except BaseException as e:
+            self._run_failed(e)
+            raise
+        finally:
+            self._scope = None
+            self._cache_digests = None
+            if self._zygote is not None:
+                self._zygote.stop()
+                self._zygote = None
+            self._close_run()
 
-            proc = subprocess.Popen(
-                ["python", self.code_path],
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
-            )
+    async def iter_results_async(self, workers: int = None):
+        # Async counterpart of run(): yields (index, result) as tests finish,
+        # with at most `workers` children driven by the running event loop.
+        # Zygote mode is not used here. Blocking setup (build, hashing,
+        # starting a batch checker) goes through the loop's default executor.
+        self.results = []
+        self.summary = Summary()
+        if workers is None:
+            workers = self.workers
+        if workers <= 0:
+            raise ValueError("workers must be over 0")
 
-            p = psutil.Process(proc.pid)
-            mem_exceeded = False
-
-            def monitor():
-                nonlocal mem_exceeded
-                while proc.poll() is None:
-                    try:
-                        mem = p.memory_info().rss / (1024 * 1024)  # MB
-                        if self.memory_limit and mem > self.memory_limit:
-                            mem_exceeded = True
-                            proc.kill()
-                            break
-                        time.sleep(0.01)
-                    except psutil.NoSuchProcess:
-                        break
-                
-            monitor_thread = threading.Thread(target=monitor)
-            monitor_thread.start()
+        loop = asyncio.get_running_loop()
+        self._compiled(await loop.run_in_executor(None, build, self.code_path, self.language, self.build_dir))
+        await loop.run_in_executor(None, self._open_run, workers, False)
+        if self._cache is not None:
+            self._cache_digests = await loop.run_in_executor(None, self._run_digests)
+        start_time = time.perf_counter()
+        self._run_id = next_run_id()
+        cases = self._cases()
+        results = iter_cases_async(self.run_cycle_async, cases, workers, self.max_failures)
+        try:
+            if self.keep_results:
+                self.results = [None] * len(cases)
+            self._emit({"event": "run_start", "run": self._run_id, "tests": len(cases), "workers": workers})
+            if self.tracer is not None:
+                self._trace_run_start(len(cases), workers)
+            async for i, result in results:
+                if self.keep_results:
+                    self.results[i] = result
+                self._on_result(i, result)
+                yield i, result
+            self._emit({"event": "run_end", "run": self._run_id, "tests": len(cases), "duration": time.perf_counter() - start_time})
+            if self.tracer is not None:
+                self.tracer.info("finished %d tests in %.3fms", len(cases), (time.perf_counter() - start_time) * 1000)
+        except BaseException as e:
+            # Stop the tests still running first: their test_finish events
+            # belong before the run's last event.
+            await results.aclose()
+            self._run_failed(e)
+            raise
+        finally:
+            await results.aclose()
+            self._cache_digests = None
+            self._close_run()
+
+    async def run_async(self, workers: int = None):
+        async for _ in self.iter_results_async(workers):
+            pass
+
+    def run_cycle(self, input_data, output_data=None):
+        if self._scope is not None and self._scope.cancelled:
+            return skipped_result()
+        phases = {}
+        if self._build is None:
+            self.compile()
+        if self._build.error is not None:
+            return self._finish_cycle(input_data, compile_error_result(self._build), phases)
+        key, result = self._cache_lookup(input_data, output_data, phases)
+        if result is not None:
+            return self._finish_cycle(input_data, result, phases)
+        self._test_started()
+        try:
+            result = self._judge_cycle(key, input_data, output_data, phases)
+        except BaseException:
+            self._test_finished()
+            raise
+        if isinstance(result, Future):
+            # Completed on the checker pool.
+            result.add_done_callback(lambda _: self._test_finished())
+            return result
+        self._test_finished()
+        return self._complete_cycle(key, input_data, result, phases)
 
+    async def run_cycle_async(self, input_data, output_data=None):
+        phases = {}
+        if self._build is None:
+            self.compile()
+        if self._build.error is not None:
+            return self._finish_cycle(input_data, compile_error_result(self._build), phases)
+        # Hashing test data and reading the cache touch the disk; keep that
+        # off the event loop.
+        key, result = None, None
+        if self._cache_digests is not None:
+            loop = asyncio.get_running_loop()
+            key, result = await loop.run_in_executor(None, self._cache_lookup, input_data, output_data, phases)
+        if result is None:
+            self._test_started()
             try:
-                stdout, stderr = proc.communicate(input=normalize_str(input_data).encode('utf-8'), timeout=self.time_limit)
-            except subprocess.TimeoutExpired:
-                proc.kill()
-                return {
-                    "status": "TLE",
-                    "message": "Time Limit Exceeded",
-                    "elapsed_time": self.time_limit,
-                    "return_code": -1
-                }
-            
-            end_time = time.perf_counter()
-            elapsed_time = end_time - start_time
-
-            if mem_exceeded:
-                return {
-                    "status": "MLE",
-                    "message": "Memory Limit Exceeded",
-                    "elapsed_time": elapsed_time,
-                    "return_code": -1
-                }
-
-            if proc.returncode != 0 or stderr:
-                return {
-                    "status": "RE",
-                    "message": f"Runtime Error: {stderr.decode('utf-8')}",
-                    "elapsed_time": elapsed_time,
-                    "return_code": proc.returncode
-                }
-            
-            test_output = stdout.decode("utf-8")
-
-            if normalize_str(test_output.strip()) == normalize_str(output_data.strip()):
-                return {
-                    "status": "AC",
-                    "message": "Accepted",
-                    "elapsed_time": elapsed_time,
-                    "return_code": proc.returncode
-                }
-            else:
-                return {
-                    "status": "WA",
-                    "message": "Wrong Answer",
-                    "elapsed_time": elapsed_time,
-                    "return_code": proc.returncode
-                }
-        
-        except Exception as e:
-            return {
-                "status": "RE",
-                "message": f"Runtime Error: {type(e).__name__}: {e}",
-                "elapsed_time": 0,
-                "return_code": None
-            }
-        
+                result = await self._judge_cycle_async(input_data, output_data, phases)
+            finally:
+                self._test_finished()
+            if key is not None:
+                await loop.run_in_executor(None, self._cache_store, key, result)
+        return self._finish_cycle(input_data, result, phases)
+
+    def _judge_cycle(self, key, input_data, output_data, phases: dict):
+        # Returns the result, or a Future resolving to the finished result.
+        raise NotImplementedError
+
+    async def _judge_cycle_async(self, input_data, output_data, phases: dict):
+        raise NotImplementedError
+
+    def _case_digests(self, input_data, output_data) -> tuple:
+        # What, besides the run digests and limits, one test's verdict depends on.
+        return (data_digest(input_data),)
+
+    def _cache_lookup(self, input_data, output_data, phases: dict):
+        # Returns (key, cached result or None); key is None when caching is off.
+        if self._cache is None or self._cache_digests is None:
+            return None, None
+        cache_start = time.perf_counter()
+        key = self._cache.make_key(
+            self._cache_kind, *self._cache_digests, *self._case_digests(input_data, output_data),
+            self.time_limit, self.time_mode.name, self.memory_limit, self.output_limit
+        )
+        result = self._cache.get(key)
+        if result is None:
+            return key, None
+        result = ResultRecord.from_dict(result)
+        phases["cache"] = time.perf_counter() - cache_start
+        return key, result
+
+    def _complete_cycle(self, key, input_data, result: ResultRecord, phases: dict) -> ResultRecord:
+        self._cache_store(key, result)
+        return self._finish_cycle(input_data, result, phases)
+
+    def _cache_store(self, key, result: ResultRecord):
+        if key is not None and is_cacheable(result):
+            self._cache.put(key, result.to_dict())
+
+    def _finish_cycle(self, input_data, result: ResultRecord, phases: dict) -> ResultRecord:
+        result["phases"] = phases
+        if self.tracer is not None:
+            self._trace_result(input_data, result)
+        return result
+
     def print_results(self):
         TC_count = len(self.results)
         tc_idx_len = len(str(TC_count))
-        ac, wa, re, tle = 0, 0, 0, 0
+        summary = self.summary
         for i in range(TC_count):
             status = self.results[i]["status"]
-            elapsed_time = self.results[i]["elapsed_time"] * 1000 # ms
             if status == "AC":
-                print(f"[TC {str(i+1).zfill(tc_idx_len)}] ✅ AC (elapsed_time: {elapsed_time:.3f}ms)")
-                ac += 1
+                print(f"[TC {str(i+1).zfill(tc_idx_len)}] ✅ AC ({format_usage(self.results[i])})")
             elif status == "WA":
-                print(f"[TC {str(i+1).zfill(tc_idx_len)}] ❌ WA (elapsed_time: {elapsed_time:.3f}ms)")
-                wa += 1
+                print(f"[TC {str(i+1).zfill(tc_idx_len)}] ❌ WA ({format_usage(self.results[i])})")
             elif status == "RE":
                 print(f"[TC {str(i+1).zfill(tc_idx_len)}] 🛑 RE")
-                re += 1
             elif status == "TLE":
-                print(f"[TC {str(i+1).zfill(tc_idx_len)}] ⌛ TLE (elapsed_time: {elapsed_time:.3f}ms)")
-                tle += 1
+                print(f"[TC {str(i+1).zfill(tc_idx_len)}] ⌛ TLE ({format_usage(self.results[i])})")
+            elif status == "MLE":
+                print(f"[TC {str(i+1).zfill(tc_idx_len)}] 💾 MLE ({format_usage(self.results[i])})")
+            elif status == "OLE":
+                print(f"[TC {str(i+1).zfill(tc_idx_len)}] 📤 OLE ({format_usage(self.results[i])})")
+            elif status == "SKIPPED":
+                print(f"[TC {str(i+1).zfill(tc_idx_len)}] ⏭️ SKIPPED")
+            elif status == "CE":
+                print(f"[TC {str(i+1).zfill(tc_idx_len)}] 🔨 CE")
+            elif status == "CKE":
+                print(f"[TC {str(i+1).zfill(tc_idx_len)}] 🔎 CKE")
 
         print("\n===== Result =====")
-        print(f"- ✅ AC: {ac}/{TC_count}")
-        print(f"- ❌ WA: {wa}/{TC_count}")
-        print(f"- 🛑 RE: {re}/{TC_count}")
-        print(f"- ⌛ TLE: {tle}/{TC_count}")
+        print(f"- ✅ AC: {summary['AC']}/{summary.total}")
+        print(f"- ❌ WA: {summary['WA']}/{summary.total}")
+        print(f"- 🛑 RE: {summary['RE']}/{summary.total}")
+        print(f"- ⌛ TLE: {summary['TLE']}/{summary.total}")
+        print(f"- 💾 MLE: {summary['MLE']}/{summary.total}")
+        print(f"- 📤 OLE: {summary['OLE']}/{summary.total}")
+        if summary["SKIPPED"]:
+            print(f"- ⏭️ SKIPPED: {summary['SKIPPED']}/{summary.total}")
+        if summary["CE"]:
+            print(f"- 🔨 CE: {summary['CE']}/{summary.total}")
 
     def clear_results(self):
         self.results = []
+        self.summary = Summary()
 
     def reset(self):
         self.TC_in = []
-        self.TC_out = []
         self.code_path = None
+        self.language = None
+        self._build = None
         self.time_limit = None
         self.results = []
+        self.summary = Summary()
 
 
-class Checker_Judge:
+class TC_Judge(_BaseJudge):
+    _cache_kind = "TC_Judge"
+    _expects_output = True
+
     def __init__(self):
-        self.TC_in = []
-        self.checker_path = None
-        self.code_path = None
-        self.time_limit = 2
-        self.memory_limit = 256
-        self.results = []
+        super().__init__()
+        self.TC_out = []
 
-    def load_TC(self, tc_path: str, tc_count: int, format: int):
-        if tc_path is None:
-            raise ValueError("tc_path cannot be None")
-        if tc_count is None:
-            raise ValueError("tc_count cannot be None")
-        if format is None:
-            format = len(str(tc_count))
-        if tc_count <= 0:
-            raise ValueError("tc_count must be over 0")
-        
-        for i in range(1, tc_count + 1):
-            fname = str(i).zfill(format)
-            in_dir = os.path.join(tc_path, "test" + fname + ".in")
-
-            with open(in_dir, 'r') as file:
-                input_read = file.read()
-                self.TC_in.append(input_read)
-
-    def load_checker(self, checker_path: str):
-        if checker_path is None:
-            raise ValueError("checker_path cannot be None")
-        self.checker_path = checker_path
-
-    def load_code(self, code_path: str):
-        if code_path is None:
-            raise ValueError("code_path cannot be None")
-        self.code_path = code_path
+    def _add_case(self, tc_path: str, name: str, input_data, output_data):
+        if output_data is None:
+            raise ValueError(f"{name}.out is missing in {tc_path}")
+        self.TC_in.append(input_data)
+        self.TC_out.append(output_data)
 
-    def set_time_limit(self, time_limit: int):
-        if time_limit is None:
-            raise ValueError("time_limit cannot be None")
-        if time_limit <= 0:
-            raise ValueError("time_limit must be over 0")
-        self.time_limit = time_limit
+    def _cases(self) -> list:
+        return list(zip(self.TC_in, self.TC_out))
 
-    def set_memory_limit(self, memory_limit: int):
-        if memory_limit is None:
-            raise ValueError("memory_limit cannot be None")
-        if memory_limit <= 0:
-            raise ValueError("memory_limit must be over 0")
-        self.memory_limit = memory_limit
+    def __open_expected(self, output_data):
+        # Files are compared with universal newlines, as when they were read
+        # in text mode; str outputs (stress tests) as they are.
+        if isinstance(output_data, TC_File):
+            return output_data.open()
+        return io.BytesIO(output_data.encode('utf-8'))
 
-    def run(self):
-        self.results = []
-        time_limit = self.time_limit
-        if time_limit == None:
-            time_limit = 2.0
-        
-        for i in range(len(self.TC_in)):
-            result = self.run_cycle(self.TC_in[i], time_limit=time_limit)
-            self.results.append(result)
-
-    def run_cycle(self, input_data: str, time_limit: int = 2.0):
+    def _case_digests(self, input_data, output_data) -> tuple:
+        return (data_digest(input_data), expected_digest(output_data))
+
+    def _judge_cycle(self, key, input_data, output_data, phases: dict):
+        try:
+            # The expected output is streamed from disk and compared while the
+            # program runs, so neither side is held in memory in full.
+            load_start = time.perf_counter()
+            with self.__open_expected(output_data) as expected:
+                comparator = StreamComparator(expected, isinstance(output_data, TC_File))
+                stdout_sink = comparator.feed
+                dump = self.tracer is not None and self.tracer.sampled()
+                if dump:
+                    stdout_sink = HeadCapture(stdout_sink, self.tracer.max_payload)
+                execution = self.__execute(input_data, stdout_sink, phases, load_start)
+                compare_start = time.perf_counter()
+                matched = comparator.finish()
+                phases["compare"] = phases.get("compare", 0.0) + time.perf_counter() - compare_start
+            if dump:
+                self.__dump(input_data, output_data, stdout_sink, execution)
+            return self.__verdict(execution, matched, comparator)
+
+        except Exception as e:
+            return make_result("RE", f"Runtime Error: {type(e).__name__}: {e}", 0, None)
+
+    async def _judge_cycle_async(self, input_data, output_data, phases: dict):
         try:
-            start_time = time.perf_counter()
+            load_start = time.perf_counter()
+            with self.__open_expected(output_data) as expected:
+                comparator = StreamComparator(expected, isinstance(output_data, TC_File))
+                stdout_sink = comparator.feed
+                dump = self.tracer is not None and self.tracer.sampled()
+                if dump:
+                    stdout_sink = HeadCapture(stdout_sink, self.tracer.max_payload)
+                with open_input(input_data) as stdin_data:
+                    phases["load"] = time.perf_counter() - load_start
+                    execution = await execute_async(
+                        run_command(self._build.command, self.memory_limit),
+                        stdin_data,
+                        self.time_limit,
+                        memory_rlimit(self.language, self.memory_limit),
+                        wall_time_limit(self.time_limit, self.time_mode),
+                        stdout_sink,
+                        self._output_limit_bytes()
+                    )
+                record_phases(phases, execution)
+                compare_start = time.perf_counter()
+                matched = comparator.finish()
+                phases["compare"] = phases.get("compare", 0.0) + time.perf_counter() - compare_start
+            if dump:
+                self.__dump(input_data, output_data, stdout_sink, execution)
+            return self.__verdict(execution, matched, comparator)
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            return make_result("RE", f"Runtime Error: {type(e).__name__}: {e}", 0, None)
+
+    def __dump(self, input_data, output_data, capture: HeadCapture, execution: dict):
+        name = describe(input_data)
+        self.tracer.payload(f"{name} input", input_data)
+        self.tracer.payload(f"{name} expected", output_data)
+        self.tracer.payload(f"{name} output", capture.head, capture.size)
+        self.tracer.payload(f"{name} stderr", execution["stderr"])
+
+    def __verdict(self, execution: dict, matched: bool, comparator: StreamComparator):
+        if execution["cancelled"]:
+            return skipped_result()
+
+        result = classify_execution(execution, self.time_limit, self.time_mode, self.memory_limit, self.language.memory_errors)
+        if result is not None:
+            return result
+
+        elapsed_time = judged_time(execution, self.time_mode)
+        if matched:
+            return make_result("AC", "Accepted", elapsed_time, execution["returncode"], execution)
+        else:
+            message = f"Wrong Answer: first mismatch at line {comparator.line}, column {comparator.column}"
+            return make_result("WA", message, elapsed_time, execution["returncode"], execution)
 
-            proc = subprocess.Popen(
-                ["python", self.code_path],
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
+    def __execute(self, input_data, stdout_sink, phases: dict, load_start: float):
+        with open_input(input_data) as stdin_data:
+            phases["load"] = time.perf_counter() - load_start
+            execution = execute(
+                self._program(),
+                stdin_data,
+                self.time_limit,
+                memory_rlimit(self.language, self.memory_limit),
+                self._zygote,
+                wall_time_limit(self.time_limit, self.time_mode),
+                stdout_sink,
+                self._scope,
+                self._output_limit_bytes()
             )
+        record_phases(phases, execution)
+        return execution
 
-            p = psutil.Process(proc.pid)
-            mem_exceeded = False
-
-            def monitor():
-                nonlocal mem_exceeded
-                while proc.poll() is None:
-                    try:
-                        mem = p.memory_info().rss / (1024 * 1024)  # MB
-                        if self.memory_limit and mem > self.memory_limit:
-                            mem_exceeded = True
-                            proc.kill()
-                            break
-                        time.sleep(0.01)
-                    except psutil.NoSuchProcess:
-                        break
-                
-            monitor_thread = threading.Thread(target=monitor)
-            monitor_thread.start()
+    def reset(self):
+        super().reset()
+        self.TC_out = []
 
-            try:
-                stdout, stderr = proc.communicate(input=normalize_str(input_data).encode('utf-8'), timeout=self.time_limit)
-            except subprocess.TimeoutExpired:
-                proc.kill()
-                return {
-                    "status": "TLE",
-                    "message": "Time Limit Exceeded",
-                    "elapsed_time": self.time_limit,
-                    "return_code": -1
-                }
-            
-            end_time = time.perf_counter()
-            elapsed_time = end_time - start_time
-
-            if mem_exceeded:
-                return {
-                    "status": "MLE",
-                    "message": "Memory Limit Exceeded",
-                    "elapsed_time": elapsed_time,
-                    "return_code": -1
-                }
-
-            if proc.returncode != 0 or stderr:
-                return {
-                    "status": "RE",
-                    "message": f"Runtime Error: {stderr.decode("utf-8")}",
-                    "elapsed_time": elapsed_time,
-                    "return_code": proc.returncode
-                }
-            
-            test_output = stdout.decode("utf-8")
 
+class Checker_Judge(_BaseJudge):
+    _cache_kind = "Checker_Judge"
+
+    def __init__(self):
+        super().__init__()
+        self.checker_path = None
+        self.checker_func = None
+        self.checker_binary = False
+        self.use_batch_checker = False
+        self._batch_checker = None
+        self.checker_workers = 2
+        self._checker_pool = None
+        self._checker_slots = None
+
+    def load_checker(self, checker=None, binary: bool = False, checker_path: str = None):
+        # checker_path: the keyword this argument had when only scripts were
+        # accepted; still works.
+        if checker is None:
+            checker = checker_path
+        elif checker_path is not None:
+            raise ValueError("pass either checker or checker_path, not both")
+        if checker is None:
+            raise ValueError("checker cannot be None")
+        self.checker_path = None
+        self.checker_func = None
+        self.checker_binary = binary
+        if callable(checker):
+            self.checker_func = checker
+        elif not os.path.exists(checker) and re.fullmatch(r"[A-Za-z_][\w.]*:[A-Za-z_][\w.]*", checker):
+            self.checker_func = resolve_checker(checker)
+        else:
+            self.checker_path = checker
+
+    def set_batch_checker(self, use_batch_checker: bool):
+        self.use_batch_checker = bool(use_batch_checker)
+
+    def set_checker_workers(self, checker_workers: int):
+        # Checkers run on their own pool, overlapping with the next solution
+        # runs; 0 checks on the solution's worker thread instead.
+        if checker_workers < 0:
+            raise ValueError("checker_workers cannot be negative")
+        self.checker_workers = checker_workers
+
+    def _cases(self) -> list:
+        return [(input_data, None) for input_data in self.TC_in]
+
+    def _case_digests(self, input_data, output_data) -> tuple:
+        return (data_digest(input_data), self.checker_binary)
+
+    def _run_digests(self) -> tuple:
+        checker_digest = callable_digest(self.checker_func) if self.checker_func is not None else file_digest(self.checker_path)
+        return (build_key(self.code_path, self.language), checker_digest)
+
+    def _open_run(self, workers: int, threaded: bool = True):
+        # Async runs call callable and batch checkers in the loop's default
+        # executor and checker scripts as async children, so no pool there.
+        if self.use_batch_checker and self.checker_func is None:
+            self._batch_checker = BatchChecker(self.checker_path).start()
+        if threaded and self.checker_workers > 0:
+            self._checker_pool = ThreadPoolExecutor(max_workers=self.checker_workers)
+            # Bounds the outputs waiting for a checker when checkers fall behind.
+            self._checker_slots = threading.BoundedSemaphore(workers + self.checker_workers)
+
+    def _close_run(self):
+        if self._checker_pool is not None:
+            self._checker_pool.shutdown()
+            self._checker_pool = None
+            self._checker_slots = None
+        if self._batch_checker is not None:
+            self._batch_checker.stop()
+            self._batch_checker = None
+
+    def _judge_cycle(self, key, input_data, output_data, phases: dict):
+        result, execution = self.__run_solution(input_data, phases)
+        if result is not None:
+            return result
+        if self._checker_pool is None:
+            return self.__check_cycle(input_data, execution, phases)
+        # Hand the output to the checker pool and free this worker for the
+        # next solution run; run_cases waits on the returned Future.
+        self._checker_slots.acquire()
+        future = self._checker_pool.submit(self.__pooled_check_cycle, key, input_data, execution, phases)
+        future.add_done_callback(lambda _: self._checker_slots.release())
+        return future
+
+    def __run_solution(self, input_data, phases: dict):
+        # Returns (result, None) when the verdict is known without the
+        # checker, else (None, execution) for __check_cycle.
+        try:
+            load_start = time.perf_counter()
+            with open_input(input_data) as stdin_data:
+                phases["load"] = time.perf_counter() - load_start
+                execution = execute(
+                    self._program(),
+                    stdin_data,
+                    self.time_limit,
+                    memory_rlimit(self.language, self.memory_limit),
+                    self._zygote,
+                    wall_time_limit(self.time_limit, self.time_mode),
+                    scope=self._scope,
+                    output_limit=self._output_limit_bytes()
+                )
+            record_phases(phases, execution)
+            if execution["cancelled"]:
+                return skipped_result(), None
+            return classify_execution(execution, self.time_limit, self.time_mode, self.memory_limit, self.language.memory_errors), execution
+
+        except Exception as e:
+            return make_result("RE", f"Runtime Error: {type(e).__name__}: {e}", 0, None), None
+
+    def __pooled_check_cycle(self, key, input_data, execution: dict, phases: dict) -> ResultRecord:
+        return self._complete_cycle(key, input_data, self.__check_cycle(input_data, execution, phases), phases)
+
+    def __check_cycle(self, input_data, execution: dict, phases: dict) -> ResultRecord:
+        try:
+            test_output = self.__test_output(input_data, execution)
+            checker_start = time.perf_counter()
             try:
-                checker_input = input_data.strip() + '\n' + test_output.strip()
+                result = self.__checked_result(execution, self.__check(input_data, test_output))
+            except Exception as e:
+                result = make_result("CKE", f"Checker Error: {type(e).__name__}: {e}", 0, None, execution)
+            finally:
+                phases["checker"] = time.perf_counter() - checker_start
+        except Exception as e:
+            result = make_result("RE", f"Runtime Error: {type(e).__name__}: {e}", 0, None)
+        return result
 
-                checker_result = subprocess.run(
-                    ["python", self.checker_path],
-                    input = normalize_str(checker_input).encode("utf-8"),
-                    capture_output=True,
-                    timeout=1.0
+    async def _judge_cycle_async(self, input_data, output_data, phases: dict):
+        try:
+            load_start = time.perf_counter()
+            with open_input(input_data) as stdin_data:
+                phases["load"] = time.perf_counter() - load_start
+                execution = await execute_async(
+                    run_command(self._build.command, self.memory_limit),
+                    stdin_data,
+                    self.time_limit,
+                    memory_rlimit(self.language, self.memory_limit),
+                    wall_time_limit(self.time_limit, self.time_mode),
+                    output_limit=self._output_limit_bytes()
                 )
+            record_phases(phases, execution)
 
-                checker_output = checker_result.stdout.decode("utf-8")
+            result = classify_execution(execution, self.time_limit, self.time_mode, self.memory_limit, self.language.memory_errors)
+            if result is not None:
+                return result
 
-                if normalize_str(checker_output) == '1':
-                    return {
-                        "status": "AC",
-                        "message": "Accepted",
-                        "elapsed_time": elapsed_time,
-                        "return_code": proc.returncode
-                    }
+            test_output = self.__test_output(input_data, execution)
+            checker_start = time.perf_counter()
+            try:
+                if self.checker_func is None and self._batch_checker is None:
+                    accepted = await run_checker_async(self.checker_path, read_text(input_data), test_output, CHECKER_TIMEOUT)
+                    verdict = (accepted, None, None)
                 else:
-                    return {
-                        "status": "WA",
-                        "message": "Wrong Answer",
-                        "elapsed_time": elapsed_time,
-                        "return_code": proc.returncode
-                    }
-            
+                    verdict = await asyncio.get_running_loop().run_in_executor(None, self.__check, input_data, test_output)
+                return self.__checked_result(execution, verdict)
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                return {
-                    "status": "CKE",
-                    "message": f"Checker Error: {type(e).__name__}: {e}",
-                    "elapsed_time": 0,
-                    "return_code": None
-                }
-        
+                return make_result("CKE", f"Checker Error: {type(e).__name__}: {e}", 0, None, execution)
+            finally:
+                phases["checker"] = time.perf_counter() - checker_start
+
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            return {
-                "status": "RE",
-                "message": f"Runtime Error: {type(e).__name__}: {e}",
-                "elapsed_time": 0,
-                "return_code": None
-            }
-        
-    def print_results(self):
-        TC_count = len(self.results)
-        tc_idx_len = len(str(TC_count))
-        ac, wa, re, tle, cke = 0, 0, 0, 0, 0
-        for i in range(TC_count):
-            status = self.results[i]["status"]
-            elapsed_time = self.results[i]["elapsed_time"] * 1000 # ms
-            if status == "AC":
-                print(f"[TC {str(i+1).zfill(tc_idx_len)}] ✅ AC (elapsed_time: {elapsed_time:.3f}ms)")
-                ac += 1
-            elif status == "WA":
-                print(f"[TC {str(i+1).zfill(tc_idx_len)}] ❌ WA (elapsed_time: {elapsed_time:.3f}ms)")
-                wa += 1
-            elif status == "RE":
-                print(f"[TC {str(i+1).zfill(tc_idx_len)}] 🛑 RE")
-                re += 1
-            elif status == "TLE":
-                print(f"[TC {str(i+1).zfill(tc_idx_len)}] ⌛ TLE (elapsed_time: {elapsed_time:.3f}ms)")
-                tle += 1
-            elif status == "CKE":
-                print(f"[TC {str(i+1).zfill(tc_idx_len)}] 🔎 CKE")
-                cke += 1
+            return make_result("RE", f"Runtime Error: {type(e).__name__}: {e}", 0, None)
 
-        print("\n===== Result =====")
-        print(f"- ✅ AC: {ac}/{TC_count}")
-        print(f"- ❌ WA: {wa}/{TC_count}")
-        print(f"- 🛑 RE: {re}/{TC_count}")
-        print(f"- ⌛ TLE: {tle}/{TC_count}")
-        print(f"- 🔎 CKE: {cke}/{TC_count}")
+    def __test_output(self, input_data, execution: dict) -> str:
+        stdout = execution["stdout"]
+        if self.tracer is not None and self.tracer.sampled():
+            name = describe(input_data)
+            self.tracer.payload(f"{name} input", input_data)
+            self.tracer.payload(f"{name} output", stdout)
+            self.tracer.payload(f"{name} stderr", execution["stderr"])
+        return stdout.decode("utf-8")
 
-    def clear_results(self):
-        self.results = []
+    def __check(self, input_data, test_output: str) -> tuple:
+        # Runs the checker; returns (accepted, score, message).
+        input_data = read_text(input_data)
+        if self.checker_func is not None:
+            checker_in = normalize_str(input_data.strip())
+            checker_out = normalize_str(test_output.strip())
+            if self.checker_binary:
+                checker_in, checker_out = checker_in.encode("utf-8"), checker_out.encode("utf-8")
+            return parse_checker_verdict(self.checker_func(checker_in, checker_out))
+        if self._batch_checker is not None:
+            checker_output = self._batch_checker.check(
+                normalize_str(input_data.strip()),
+                normalize_str(test_output.strip()),
+                CHECKER_TIMEOUT
+            )
+            return normalize_str(checker_output) == '1', None, None
+        return run_checker(self.checker_path, input_data, test_output), None, None
+
+    def __checked_result(self, execution: dict, verdict: tuple) -> ResultRecord:
+        accepted, score, checker_message = verdict
+        elapsed_time = judged_time(execution, self.time_mode)
+        if accepted:
+            result = make_result("AC", "Accepted", elapsed_time, execution["returncode"], execution)
+        else:
+            result = make_result("WA", "Wrong Answer", elapsed_time, execution["returncode"], execution)
+        if checker_message:
+            result["message"] += f": {checker_message}"
+        if score is not None:
+            result["score"] = score
+        return result
+
+    def print_results(self):
+        super().print_results()
+        print(f"- 🔎 CKE: {self.summary['CKE']}/{self.summary.total}")
 
     def reset(self):
-        self.TC_in = []
+        super().reset()
         self.checker_path = None
-        self.code_path = None
-        self.time_limit = None
-        self.results = []
-    
\ No newline at end of file
+        self.checker_func = None
@@ -0,0 +1,139 @@
+from typing import BinaryIO
+
+# Matches what str.strip() removes for ASCII output.
+WHITESPACE = b" \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f"
+
+CHUNK_SIZE = 65536
+
+
+def is_space(data: bytes) -> bool:
+    return not data.translate(None, WHITESPACE)
+
+
+class _Normalizer:
+    # Incremental form of normalize_str(s.strip()) minus the trailing strip:
+    # drops leading whitespace and turns \r\n into \n across chunk borders.
+    # universal_newlines also turns a lone \r into \n, as reading a file in
+    # text mode does; expected outputs on disk have always been read that way.
+    def __init__(self, universal_newlines: bool = False):
+        self.universal_newlines = universal_newlines
+        self.started = False
+        self.skipped_newlines = 0
+        self._pending_cr = False
+
+    def feed(self, chunk: bytes) -> bytes:
+        if self._pending_cr:
+            chunk = b"\r" + chunk
+            self._pending_cr = False
+        if chunk.endswith(b"\r"):
+            chunk = chunk[:-1]
+            self._pending_cr = True
+        return self._normalize(chunk)
+
+    def flush(self) -> bytes:
+        if not self._pending_cr:
+            return b""
+        self._pending_cr = False
+        return self._normalize(b"\r")
+
+    def _normalize(self, chunk: bytes) -> bytes:
+        chunk = chunk.replace(b"\r\n", b"\n")
+        if self.universal_newlines:
+            chunk = chunk.replace(b"\r", b"\n")
+        if not self.started:
+            stripped = chunk.lstrip(WHITESPACE)
+            self.skipped_newlines += chunk.count(b"\n", 0, len(chunk) - len(stripped))
+            chunk = stripped
+            self.started = bool(chunk)
+        return chunk
+
+
+class _NormalizedReader:
+    def __init__(self, file: BinaryIO, universal_newlines: bool = False):
+        self.file = file
+        self.normalizer = _Normalizer(universal_newlines)
+        self.buffer = b""
+        self.eof = False
+
+    def read(self, size: int) -> bytes:
+        while len(self.buffer) < size and not self.eof:
+            chunk = self.file.read(CHUNK_SIZE)
+            if chunk:
+                self.buffer += self.normalizer.feed(chunk)
+            else:
+                self.buffer += self.normalizer.flush()
+                self.eof = True
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+class StreamComparator:
+    def __init__(self, expected: BinaryIO, universal_newlines: bool = False):
+        # universal_newlines applies to the expected side only; the program's
+        # output never had lone \r translated.
+        self.expected = _NormalizedReader(expected, universal_newlines)
+        self.actual = _Normalizer()
+        self.line = None
+        self.column = None
+        self.matched = None
+        self._newlines = 0
+        self._column = 0
+        self._diverged = False
+        self._mismatch = False
+
+    def _advance(self, data: bytes):
+        newlines = data.count(b"\n")
+        if newlines:
+            self._newlines += newlines
+            self._column = len(data) - data.rfind(b"\n") - 1
+        else:
+            self._column += len(data)
+
+    def _diverge(self):
+        # Past the first difference, both remainders may still be trailing
+        # whitespace that strip() would have removed.
+        self._diverged = True
+        self.line = self.expected.normalizer.skipped_newlines + self._newlines + 1
+        self.column = self._column + 1
+
+    def _compare(self, actual: bytes):
+        if self._mismatch or not actual:
+            return
+        if self._diverged:
+            self._mismatch = not is_space(actual)
+            return
+
+        expected = self.expected.read(len(actual))
+        if expected == actual:
+            self._advance(actual)
+            return
+
+        k = 0
+        limit = min(len(actual), len(expected))
+        while k < limit and actual[k] == expected[k]:
+            k += 1
+        self._advance(actual[:k])
+        self._diverge()
+        self._mismatch = not (is_space(actual[k:]) and is_space(expected[k:]))
+
+    def feed(self, chunk: bytes):
+        self._compare(self.actual.feed(chunk))
+
+    def finish(self) -> bool:
+        self._compare(self.actual.flush())
+        if not self._mismatch:
+            if not self._diverged:
+                rest = self.expected.read(CHUNK_SIZE)
+                if rest:
+                    self._diverge()
+                    self._mismatch = not is_space(rest)
+            while not self._mismatch:
+                rest = self.expected.read(CHUNK_SIZE)
+                if not rest:
+                    break
+                self._mismatch = not is_space(rest)
+        self.matched = not self._mismatch
+        if self.matched:
+            self.line = None
+            self.column = None
+        return self.matched
@@ -0,0 +1,199 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import subprocess
+
+from .cache import file_digest
+
+# Language registry. Commands are templates with {source} (the submission, or
+# its copy in the build directory), {artifact} and {dir} (the build directory)
+# placeholders; run commands may also use {memory}, the memory limit in MB,
+# which is filled in when the program is run. Compiled languages are built once per source into an on-disk
+# cache keyed by the source hash, the compile command (compiler and flags) and
+# the compiler binary itself.
+
+COMPILE_TIMEOUT = 30.0
+# Compiler output kept in a CE message.
+COMPILE_OUTPUT_LIMIT = 64 * 1024
+
+
+class Language:
+    def __init__(self, name: str, extensions: tuple, run: list, compile: list = None,
+                 source_name: str = None, artifact: str = "solution", zygote: bool = False,
+                 memory_errors: tuple = (), address_space: bool = True):
+        self.name = name
+        self.extensions = tuple(extensions)
+        self.run = list(run)
+        self.compile = list(compile) if compile is not None else None
+        # File name the source is copied to before compiling (javac wants Main.java).
+        self.source_name = source_name or ("solution" + (self.extensions[0] if self.extensions else ""))
+        self.artifact = artifact
+        # Whether solutions can be started from the Python zygote.
+        self.zygote = zygote
+        # stderr markers of a failed allocation, read as MLE after a crash.
+        self.memory_errors = tuple(memory_errors)
+        # False for runtimes that reserve far more address space than they
+        # use (the JVM): no RLIMIT_AS, the run command limits memory itself.
+        self.address_space = address_space
+
+    @property
+    def compiled(self) -> bool:
+        return self.compile is not None
+
+    def format(self, template: list, source: str, artifact: str = None, directory: str = None) -> list:
+        values = {"source": source, "artifact": artifact or "", "dir": directory or "", "memory": "{memory}"}
+        return [part.format(**values) for part in template]
+
+    def __repr__(self):
+        return f"Language({self.name!r})"
+
+
+LANGUAGES = {}
+
+
+def register_language(language: Language):
+    # Later registrations replace earlier ones, including the built-ins.
+    if not isinstance(language, Language):
+        raise ValueError("language must be a Language")
+    LANGUAGES[language.name] = language
+
+
+def get_language(name: str) -> Language:
+    if name not in LANGUAGES:
+        raise ValueError(f"unknown language: {name}")
+    return LANGUAGES[name]
+
+
+def detect_language(path: str) -> Language:
+    # By extension; anything unknown is treated as Python, as before.
+    extension = os.path.splitext(path)[1].lower()
+    for language in LANGUAGES.values():
+        if extension in language.extensions:
+            return language
+    return LANGUAGES["python"]
+
+
+register_language(Language("python", (".py",), ["python", "{source}"], zygote=True, memory_errors=(b"MemoryError",)))
+register_language(Language(
+    "c", (".c",), ["{artifact}"],
+    ["gcc", "-O2", "-std=c11", "-pipe", "-o", "{artifact}", "{source}", "-lm"],
+))
+register_language(Language(
+    "cpp", (".cpp", ".cc", ".cxx"), ["{artifact}"],
+    ["g++", "-O2", "-std=c++17", "-pipe", "-o", "{artifact}", "{source}"],
+    memory_errors=(b"std::bad_alloc",),
+))
+register_language(Language(
+    "rust", (".rs",), ["{artifact}"],
+    ["rustc", "-O", "--edition", "2021", "-o", "{artifact}", "{source}"],
+    memory_errors=(b"memory allocation of",),
+))
+register_language(Language(
+    "java", (".java",), ["java", "-Xmx{memory}m", "-Xss64m", "-XX:+UseSerialGC", "-cp", "{dir}", "Main"],
+    ["javac", "-encoding", "UTF-8", "-d", "{dir}", "{source}"],
+    source_name="Main.java", memory_errors=(b"java.lang.OutOfMemoryError",), address_space=False,
+))
+
+
+class Build:
+    def __init__(self, language: Language, source: str, command: list = None, cached: bool = False,
+                 error: str = None, duration: float = 0.0):
+        self.language = language
+        self.source = source
+        self.command = command
+        self.cached = cached
+        # Compiler output when the build failed (a CE verdict), else None.
+        self.error = error
+        self.duration = duration
+
+    def __repr__(self):
+        return f"Build({self.language.name}, {self.source!r}, cached={self.cached}, error={self.error is not None})"
+
+
+def build_key(source_path: str, language: Language) -> str:
+    h = hashlib.sha256()
+    h.update(file_digest(source_path).encode("utf-8"))
+    h.update(language.name.encode("utf-8"))
+    h.update(json.dumps([language.compile, language.run, language.source_name, language.artifact]).encode("utf-8"))
+    # A compiler (or interpreter) upgrade changes the binary, and with it
+    # the key. Also used in verdict cache keys.
+    tool = shutil.which((language.compile or language.run)[0])
+    if tool is not None:
+        stat = os.stat(tool)
+        h.update(f"{os.path.realpath(tool)}:{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def default_build_dir() -> str:
+    return os.path.join(tempfile.gettempdir(), "openjudge-build")
+
+
+def build(source_path: str, language: Language, build_dir: str = None, timeout: float = COMPILE_TIMEOUT) -> Build:
+    start_time = time.perf_counter()
+    if not language.compiled:
+        return Build(language, source_path, language.format(language.run, source_path, directory=os.path.dirname(source_path)))
+
+    if build_dir is None:
+        build_dir = default_build_dir()
+    os.makedirs(build_dir, exist_ok=True)
+    target_dir = os.path.join(build_dir, build_key(source_path, language))
+    if os.path.isdir(target_dir):
+        return _finished(language, target_dir, True, start_time)
+
+    # Built in a scratch directory and renamed into place, so a half-written
+    # artifact is never picked up by a concurrent run.
+    work_dir = tempfile.mkdtemp(dir=build_dir, prefix=".build-")
+    try:
+        source = os.path.join(work_dir, language.source_name)
+        shutil.copyfile(source_path, source)
+        # Relative paths (the compiler runs in work_dir) keep scratch paths
+        # out of CE messages.
+        command = language.format(language.compile, language.source_name, language.artifact, ".")
+        try:
+            process = subprocess.run(command, cwd=work_dir, capture_output=True, timeout=timeout)
+        except FileNotFoundError:
+            return Build(language, source_path, error=f"compiler not found: {command[0]}", duration=time.perf_counter() - start_time)
+        except subprocess.TimeoutExpired:
+            return Build(language, source_path, error=f"compilation timed out after {timeout} seconds", duration=time.perf_counter() - start_time)
+        if process.returncode != 0:
+            output = (process.stderr + process.stdout).decode("utf-8", errors="replace")
+            if len(output) > COMPILE_OUTPUT_LIMIT:
+                output = output[:COMPILE_OUTPUT_LIMIT] + "..."
+            return Build(language, source_path, error=output.strip() or f"compiler exited with {process.returncode}", duration=time.perf_counter() - start_time)
+        try:
+            os.rename(work_dir, target_dir)
+        except OSError:
+            # Another run built the same key first; use that one.
+            if not os.path.isdir(target_dir):
+                raise
+        return _finished(language, target_dir, False, start_time)
+    finally:
+        if os.path.isdir(work_dir):
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _finished(language: Language, target_dir: str, cached: bool, start_time: float) -> Build:
+    source = os.path.join(target_dir, language.source_name)
+    command = language.format(language.run, source, os.path.join(target_dir, language.artifact), target_dir)
+    return Build(language, source, command, cached=cached, duration=time.perf_counter() - start_time)
+
+
+def run_command(command: list, memory_limit: int) -> list:
+    return [part.replace("{memory}", str(memory_limit)) for part in command]
+
+
+def memory_rlimit(language: Language, memory_limit: int):
+    # The memory limit to enforce with RLIMIT_AS, or None.
+    return memory_limit if language.address_space else None
+
+
+def resolve_language(code_path: str, language=None) -> Language:
+    # language may be a Language, a registered name, or None to detect it.
+    if language is None:
+        return detect_language(code_path)
+    if isinstance(language, Language):
+        return language
+    return get_language(language)
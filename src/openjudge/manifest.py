@@ -0,0 +1,141 @@
+import os
+import re
+import json
+import hashlib
+import tempfile
+
+from .compare import WHITESPACE, _Normalizer
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 3
+
+_CHUNK_SIZE = 1 << 20
+_TEST_NAME = re.compile(r"test(\d+)\.in")
+
+
+def _file_info(entry: os.DirEntry) -> dict:
+    stat = entry.stat()
+    return {"file": entry.name, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as file:
+        while True:
+            chunk = file.read(_CHUNK_SIZE)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def normalized_digest(path: str) -> str:
+    # Digest of the output as the judge compares it: leading/trailing
+    # whitespace dropped and \r\n or a lone \r read as \n. The dropped
+    # leading newlines are counted in, since WA messages report lines from the
+    # file's start.
+    h = hashlib.sha256()
+    normalizer = _Normalizer(universal_newlines=True)
+    pending = b""
+    with open(path, 'rb') as file:
+        while True:
+            chunk = file.read(_CHUNK_SIZE)
+            data = normalizer.feed(chunk) if chunk else normalizer.flush()
+            if data:
+                data = pending + data
+                body = data.rstrip(WHITESPACE)
+                pending = data[len(body):]
+                h.update(body)
+            if not chunk:
+                break
+    h.update(b"\0%d" % normalizer.skipped_newlines)
+    return h.hexdigest()
+
+
+def _same_file(old: dict, info: dict) -> bool:
+    return old is not None and old["file"] == info["file"] and old["size"] == info["size"] and old["mtime_ns"] == info["mtime_ns"]
+
+
+def _describe(tc_path: str, info: dict, old: dict, expected_output: bool) -> dict:
+    if _same_file(old, info):
+        return old
+    info = dict(info)
+    path = os.path.join(tc_path, info["file"])
+    info["sha256"] = _sha256(path)
+    if expected_output:
+        info["normalized_sha256"] = normalized_digest(path)
+    return info
+
+
+def scan(tc_path: str, previous: dict = None) -> dict:
+    files = {entry.name: entry for entry in os.scandir(tc_path) if entry.is_file()}
+    old_cases = {case["name"]: case for case in (previous or {}).get("cases", [])}
+
+    cases = []
+    for name in files:
+        match = _TEST_NAME.fullmatch(name)
+        if match is None:
+            continue
+        stem = name[:-len(".in")]
+        old = old_cases.get(stem, {})
+        case = {
+            "name": stem,
+            "index": int(match.group(1)),
+            "in": _describe(tc_path, _file_info(files[name]), old.get("in"), False),
+            "out": None,
+        }
+        if stem + ".out" in files:
+            case["out"] = _describe(tc_path, _file_info(files[stem + ".out"]), old.get("out"), True)
+        cases.append(case)
+
+    cases.sort(key=lambda case: (case["index"], case["name"]))
+    return {"version": MANIFEST_VERSION, "cases": cases}
+
+
+def next_test_name(tc_path: str) -> str:
+    # First unused testN name, padded like the tests already in tc_path.
+    last, width = 0, 3
+    for name in os.listdir(tc_path):
+        match = _TEST_NAME.fullmatch(name)
+        if match is not None and int(match.group(1)) >= last:
+            last, width = int(match.group(1)), len(match.group(1))
+    return "test" + str(last + 1).zfill(width)
+
+
+def read_manifest(tc_path: str):
+    try:
+        with open(os.path.join(tc_path, MANIFEST_NAME), 'r') as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def write_manifest(tc_path: str, manifest: dict):
+    fd, tmp_path = tempfile.mkstemp(dir=tc_path, suffix=".tmp")
+    with os.fdopen(fd, 'w') as file:
+        json.dump(manifest, file, indent=1)
+    os.replace(tmp_path, os.path.join(tc_path, MANIFEST_NAME))
+
+
+def build_manifest(tc_path: str) -> dict:
+    manifest = scan(tc_path)
+    write_manifest(tc_path, manifest)
+    return manifest
+
+
+def load_manifest(tc_path: str) -> dict:
+    # Reuses the stored entries whose size and mtime still match, rehashes
+    # the rest, and writes the index back only when something changed.
+    if tc_path is None:
+        raise ValueError("tc_path cannot be None")
+    previous = read_manifest(tc_path)
+    manifest = scan(tc_path, previous)
+    if manifest != previous:
+        try:
+            write_manifest(tc_path, manifest)
+        except OSError:
+            pass  # read-only test directories still work, just unindexed
+    return manifest
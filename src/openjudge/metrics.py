@@ -0,0 +1,193 @@
+import os
+import bisect
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from .results import Verdict
+
+# Prometheus text exposition for long-lived judge processes. JudgeMetrics is a
+# hook (judge.add_hook); every thread that calls it (run() callers, and test
+# workers for test_start/test_finish) gets its own shard and updates it
+# without locking. Shards are only merged, under a lock, when the metrics are
+# rendered.
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+OVERHEAD_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+
+# Phases that are judge work rather than the child's own run time.
+OVERHEAD_PHASES = ("load", "spawn", "io_drain", "compare", "checker", "cache")
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other: "_Histogram"):
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.sum += other.sum
+        self.count += other.count
+
+
+class _Shard:
+    def __init__(self):
+        self.verdicts = {verdict: 0 for verdict in Verdict}
+        self.wall_time = _Histogram(TIME_BUCKETS)
+        self.cpu_time = _Histogram(TIME_BUCKETS)
+        self.overhead = _Histogram(OVERHEAD_BUCKETS)
+        self.checker_failures = 0
+        self.cache_hits = 0
+        self.runs = 0
+        self.run_seconds = 0.0
+        # Started minus finished tests. A test may finish on another thread
+        # than it started on (checker pool), so one shard can go negative;
+        # the sum over shards is exact.
+        self.in_flight = 0
+
+
+class JudgeMetrics:
+    def __init__(self, namespace: str = "openjudge"):
+        self.namespace = namespace
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+        self._server = None
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def __call__(self, event: dict):
+        kind = event["event"]
+        shard = self._shard()
+        if kind == "test":
+            result = event["result"]
+            status = Verdict(result["status"])
+            shard.verdicts[status] += 1
+            if status == Verdict.CKE:
+                shard.checker_failures += 1
+            if result["cached"]:
+                shard.cache_hits += 1
+            if status != Verdict.SKIPPED and not result["cached"]:
+                if result["wall_time"] is not None:
+                    shard.wall_time.observe(result["wall_time"])
+                if result["cpu_time_user"] is not None:
+                    shard.cpu_time.observe(result["cpu_time_user"] + result["cpu_time_sys"])
+                phases = event["phases"]
+                if phases:
+                    shard.overhead.observe(sum(phases.get(phase, 0.0) for phase in OVERHEAD_PHASES))
+        elif kind == "test_start":
+            shard.in_flight += 1
+        elif kind == "test_finish":
+            shard.in_flight -= 1
+        elif kind == "run_end":
+            shard.runs += 1
+            shard.run_seconds += event["duration"]
+
+    def _merged(self) -> _Shard:
+        total = _Shard()
+        with self._lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for verdict, count in shard.verdicts.items():
+                total.verdicts[verdict] += count
+            total.wall_time.merge(shard.wall_time)
+            total.cpu_time.merge(shard.cpu_time)
+            total.overhead.merge(shard.overhead)
+            total.checker_failures += shard.checker_failures
+            total.cache_hits += shard.cache_hits
+            total.runs += shard.runs
+            total.run_seconds += shard.run_seconds
+            total.in_flight += shard.in_flight
+        return total
+
+    def render(self) -> str:
+        # Prometheus text exposition format, version 0.0.4.
+        ns = self.namespace
+        total = self._merged()
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str):
+            lines.append(f"# HELP {ns}_{name} {help_text}")
+            lines.append(f"# TYPE {ns}_{name} {kind}")
+
+        def histogram(name: str, help_text: str, hist: _Histogram):
+            metric(name, "histogram", help_text)
+            cumulative = 0
+            for bound, count in zip(hist.buckets, hist.counts):
+                cumulative += count
+                lines.append(f'{ns}_{name}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f'{ns}_{name}_bucket{{le="+Inf"}} {hist.count}')
+            lines.append(f"{ns}_{name}_sum {hist.sum}")
+            lines.append(f"{ns}_{name}_count {hist.count}")
+
+        metric("tests_total", "counter", "Judged tests by verdict.")
+        for verdict, count in total.verdicts.items():
+            lines.append(f'{ns}_tests_total{{verdict="{verdict.value}"}} {count}')
+        metric("checker_failures_total", "counter", "Tests whose checker crashed, hung or returned garbage (CKE).")
+        lines.append(f"{ns}_checker_failures_total {total.checker_failures}")
+        metric("cache_hits_total", "counter", "Verdicts served from the verdict cache.")
+        lines.append(f"{ns}_cache_hits_total {total.cache_hits}")
+        metric("runs_total", "counter", "Completed judge runs.")
+        lines.append(f"{ns}_runs_total {total.runs}")
+        metric("run_seconds_total", "counter", "Wall time spent in judge runs.")
+        lines.append(f"{ns}_run_seconds_total {total.run_seconds}")
+        metric("tests_in_flight", "gauge", "Tests currently running.")
+        lines.append(f"{ns}_tests_in_flight {total.in_flight}")
+        histogram("test_wall_seconds", "Wall time per test.", total.wall_time)
+        histogram("test_cpu_seconds", "Child CPU time (user + sys) per test.", total.cpu_time)
+        histogram("judge_overhead_seconds", "Judge-side time per test: load, spawn, I/O, compare, checker.", total.overhead)
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str):
+        # Atomic, for node_exporter's textfile collector.
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, 'w') as file:
+            file.write(self.render())
+        os.replace(tmp_path, path)
+
+    def serve(self, port: int = 9464, host: str = "127.0.0.1"):
+        # Serves GET /metrics from a daemon thread; returns the bound port.
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = HTTPServer((host, port), Handler)
+        thread = threading.Thread(target=self._server.serve_forever, name="openjudge-metrics", daemon=True)
+        thread.start()
+        return self._server.server_address[1]
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
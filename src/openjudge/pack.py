@@ -0,0 +1,243 @@
+import os
+import mmap
+import zlib
+import struct
+import hashlib
+import tempfile
+from contextlib import contextmanager
+
+from .manifest import load_manifest
+from .testcase import TC_File, from_manifest, strip_newlines
+
+# Layout (little endian):
+#   header   magic, version, case count
+#   table    per case: name length, name, then an entry for .in and for .out
+#   payloads concatenated, each entry pointing at its own byte range
+# An entry is (offset, stored size, size, codec, sha256 of the raw payload).
+PACK_MAGIC = b"OJPACK\x00\x01"
+PACK_VERSION = 1
+
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+CODEC_ABSENT = 255  # the case has no .out (checker problems)
+
+_HEADER = struct.Struct("<8sII")
+_NAME = struct.Struct("<H")
+_ENTRY = struct.Struct("<QQQB32s")
+
+# Only keep the compressed form when it saves at least this much.
+COMPRESS_RATIO = 0.9
+
+_CHUNK_SIZE = 1 << 20
+
+
+def is_pack(path: str) -> bool:
+    if not os.path.isfile(path):
+        return False
+    with open(path, 'rb') as file:
+        return file.read(len(PACK_MAGIC)) == PACK_MAGIC
+
+
+class _PayloadReader:
+    # Binary file-like view of one payload, inflated on the fly if compressed.
+    def __init__(self, view: memoryview, codec: int):
+        self.view = view
+        self.pos = 0
+        self.decompressor = zlib.decompressobj() if codec == CODEC_ZLIB else None
+        self.pending = b""
+
+    def read(self, size: int = -1) -> bytes:
+        if self.decompressor is None:
+            end = len(self.view) if size < 0 else min(len(self.view), self.pos + size)
+            data = bytes(self.view[self.pos:end])
+            self.pos = end
+            return data
+
+        if size < 0:
+            data = self.pending + self.decompressor.decompress(self.decompressor.unconsumed_tail)
+            data += self.decompressor.decompress(self.view[self.pos:])
+            self.pending = b""
+            self.pos = len(self.view)
+            return data + self.decompressor.flush()
+        while len(self.pending) < size:
+            if self.decompressor.unconsumed_tail:
+                tail = self.decompressor.unconsumed_tail
+                self.pending += self.decompressor.decompress(tail, size)
+            elif self.pos < len(self.view):
+                chunk = self.view[self.pos:self.pos + _CHUNK_SIZE]
+                self.pos += len(chunk)
+                self.pending += self.decompressor.decompress(chunk, size)
+            else:
+                self.pending += self.decompressor.flush()
+                break
+        data, self.pending = self.pending[:size], self.pending[size:]
+        return data
+
+    def close(self):
+        self.view.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PackEntry(TC_File):
+    # One payload inside a TestPack; used wherever a TC_File is accepted.
+    def __init__(self, pack, name: str, offset: int, stored_size: int, size: int, codec: int, sha256: str):
+        self.pack = pack
+        self.path = f"{pack.path}#{name}"
+        self.name = name
+        self.offset = offset
+        self.stored_size = stored_size
+        self.size = size
+        self.codec = codec
+        self.sha256 = sha256
+        self.normalized_sha256 = None
+
+    def _view(self) -> memoryview:
+        return self.pack.view[self.offset:self.offset + self.stored_size]
+
+    def open(self):
+        return _PayloadReader(self._view(), self.codec)
+
+    def read_bytes(self) -> bytes:
+        with self.open() as reader:
+            return reader.read()
+
+    def read_text(self) -> str:
+        return self.read_bytes().decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+
+    @contextmanager
+    def stdin(self):
+        if self.codec == CODEC_NONE:
+            mapped = self.pack.mapped
+            start, end = self.offset, self.offset + self.stored_size
+            if mapped.find(b"\r", start, end) == -1:
+                # Sliced straight out of the pack's mmap; nothing is copied.
+                view = self.pack.view[start:strip_newlines(mapped, start, end)]
+                try:
+                    yield view
+                finally:
+                    view.release()
+                return
+        data = self.read_bytes().replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+        yield data.rstrip(b"\n")
+
+    def __repr__(self):
+        return f"PackEntry({self.path!r}, size={self.size})"
+
+
+class TestPack:
+    def __init__(self, path: str):
+        self.path = path
+        self.cases = []
+        self._file = open(path, 'rb')
+        try:
+            self.mapped = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{path} is not a test pack")
+        self.view = memoryview(self.mapped)
+        try:
+            self._read_table()
+        except struct.error:
+            self.close()
+            raise ValueError(f"{path} is not a test pack")
+        except ValueError:
+            self.close()
+            raise
+
+    def _read_table(self):
+        magic, version, count = _HEADER.unpack_from(self.mapped, 0)
+        if magic != PACK_MAGIC:
+            raise ValueError(f"{self.path} is not a test pack")
+        if version != PACK_VERSION:
+            raise ValueError(f"{self.path} has unsupported pack version {version}")
+
+        pos = _HEADER.size
+        for _ in range(count):
+            (name_len,) = _NAME.unpack_from(self.mapped, pos)
+            pos += _NAME.size
+            name = bytes(self.mapped[pos:pos + name_len]).decode('utf-8')
+            pos += name_len
+            entries = []
+            for _ in range(2):
+                offset, stored_size, size, codec, digest = _ENTRY.unpack_from(self.mapped, pos)
+                pos += _ENTRY.size
+                if codec == CODEC_ABSENT:
+                    entries.append(None)
+                    continue
+                if codec not in (CODEC_NONE, CODEC_ZLIB) or offset + stored_size > len(self.mapped):
+                    raise ValueError(f"{self.path}: bad entry for {name}")
+                entries.append(PackEntry(self, name, offset, stored_size, size, codec, digest.hex()))
+            self.cases.append((name, entries[0], entries[1]))
+
+    def close(self):
+        self.view.release()
+        self.mapped.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _encode(data, compress: bool):
+    if data is None:
+        return b"", 0, CODEC_ABSENT, bytes(32)
+    if isinstance(data, TC_File):
+        with data.open() as file:
+            data = file.read()
+    elif isinstance(data, str):
+        data = data.encode('utf-8')
+    digest = hashlib.sha256(data).digest()
+    if compress and data:
+        packed = zlib.compress(data)
+        if len(packed) < len(data) * COMPRESS_RATIO:
+            return packed, len(data), CODEC_ZLIB, digest
+    return data, len(data), CODEC_NONE, digest
+
+
+def write_pack(pack_path: str, cases, compress: bool = False):
+    # cases: iterable of (name, input, output). Payloads are str, bytes or
+    # TC_File (read one at a time); output may be None. The table goes in last.
+    cases = list(cases)
+    names = [name.encode('utf-8') for name, _, _ in cases]
+    table_size = _HEADER.size + sum(_NAME.size + len(name) + 2 * _ENTRY.size for name in names)
+
+    directory = os.path.dirname(os.path.abspath(pack_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.seek(table_size)
+            table = [_HEADER.pack(PACK_MAGIC, PACK_VERSION, len(cases))]
+            offset = table_size
+            for name, (_, input_data, output_data) in zip(names, cases):
+                table.append(_NAME.pack(len(name)) + name)
+                for data in (input_data, output_data):
+                    payload, size, codec, digest = _encode(data, compress)
+                    file.write(payload)
+                    table.append(_ENTRY.pack(offset if payload else 0, len(payload), size, codec, digest))
+                    offset += len(payload)
+            file.seek(0)
+            file.write(b"".join(table))
+        os.replace(tmp_path, pack_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def pack_directory(tc_path: str, pack_path: str, compress: bool = False):
+    # Packs every testN.in/.out pair that load_TC would discover in tc_path.
+    cases = []
+    for case in load_manifest(tc_path)["cases"]:
+        output_data = from_manifest(tc_path, case["out"]) if case["out"] is not None else None
+        cases.append((case["name"], from_manifest(tc_path, case["in"]), output_data))
+    write_pack(pack_path, cases, compress)
@@ -0,0 +1,46 @@
+PHASES = ("load", "spawn", "run", "io_drain", "compare", "checker", "cache")
+
+
+class PhaseProfiler:
+    # Hook for TC_Judge/Checker_Judge.add_hook() that totals per-test phase
+    # timings. run covers the child from spawn to reap; io_drain and compare
+    # are judge time spent inside it.
+    def __init__(self):
+        self.load_time = 0.0
+        self.run_time = 0.0
+        self.tests = 0
+        self.totals = {}
+        self.slowest = {}
+
+    def __call__(self, event: dict):
+        kind = event["event"]
+        if kind == "load":
+            self.load_time += event["duration"]
+        elif kind == "run_end":
+            self.run_time += event["duration"]
+        elif kind == "test":
+            self.tests += 1
+            for phase, duration in event["phases"].items():
+                self.totals[phase] = self.totals.get(phase, 0.0) + duration
+                if duration > self.slowest.get(phase, (0.0, None))[0]:
+                    self.slowest[phase] = (duration, event["index"])
+
+    def summary(self) -> dict:
+        phases = {}
+        for phase in sorted(self.totals, key=lambda name: PHASES.index(name) if name in PHASES else len(PHASES)):
+            total = self.totals[phase]
+            duration, index = self.slowest[phase]
+            phases[phase] = {
+                "total": total,
+                "mean": total / self.tests if self.tests else 0.0,
+                "max": duration,
+                "max_test": index,
+            }
+        return {"tests": self.tests, "load_TC": self.load_time, "run": self.run_time, "phases": phases}
+
+    def print_summary(self):
+        summary = self.summary()
+        print("\n===== Phases =====")
+        print(f"- load_TC: {summary['load_TC'] * 1000:.3f}ms, run: {summary['run'] * 1000:.3f}ms, tests: {summary['tests']}")
+        for phase, stats in summary["phases"].items():
+            print(f"- {phase}: total {stats['total'] * 1000:.3f}ms, mean {stats['mean'] * 1000:.3f}ms, max {stats['max'] * 1000:.3f}ms (TC {stats['max_test'] + 1})")
@@ -0,0 +1,166 @@
+import csv
+import json
+from enum import Enum
+
+
+class Verdict(str, Enum):
+    # A str subclass, so `result["status"] == "AC"` keeps working.
+    AC = "AC"
+    WA = "WA"
+    RE = "RE"
+    TLE = "TLE"
+    MLE = "MLE"
+    OLE = "OLE"
+    CKE = "CKE"
+    CE = "CE"
+    SKIPPED = "SKIPPED"
+
+    def __str__(self):
+        return self.value
+
+    def __format__(self, format_spec):
+        return self.value.__format__(format_spec)
+
+
+class ResultRecord:
+    # One test result. Slots keep a 100k-test run small; item access keeps the
+    # old dict interface (result["status"], result.get("score")).
+    __slots__ = (
+        "status", "message", "elapsed_time", "return_code", "wall_time",
+        "cpu_time_user", "cpu_time_sys", "peak_rss_kb", "cached", "score", "phases",
+    )
+
+    def __init__(self, status, message: str, elapsed_time: float, return_code: int, wall_time: float = None,
+                 cpu_time_user: float = None, cpu_time_sys: float = None, peak_rss_kb: int = None,
+                 cached: bool = False, score=None, phases: dict = None):
+        self.status = Verdict(status)
+        self.message = message
+        self.elapsed_time = elapsed_time
+        self.return_code = return_code
+        self.wall_time = wall_time
+        self.cpu_time_user = cpu_time_user
+        self.cpu_time_sys = cpu_time_sys
+        self.peak_rss_kb = peak_rss_kb
+        self.cached = cached
+        self.score = score
+        self.phases = phases
+
+    def __getitem__(self, key: str):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, Verdict(value) if key == "status" else value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+
+    def get(self, key: str, default=None):
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        return default if value is None else value
+
+    def keys(self):
+        return self.__slots__
+
+    def to_dict(self) -> dict:
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ResultRecord":
+        return cls(**{key: data[key] for key in cls.__slots__ if key in data})
+
+    def __repr__(self):
+        return f"ResultRecord({self.status}, {self.message!r}, elapsed_time={self.elapsed_time})"
+
+    def __eq__(self, other):
+        if isinstance(other, ResultRecord):
+            other = other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+
+class Summary:
+    # Verdict counts for a run; kept up to date as results come in.
+    def __init__(self):
+        self.total = 0
+        self.counts = {verdict: 0 for verdict in Verdict}
+
+    def add(self, result):
+        self.total += 1
+        self.counts[Verdict(result["status"])] += 1
+
+    @classmethod
+    def from_results(cls, results) -> "Summary":
+        summary = cls()
+        for result in results:
+            summary.add(result)
+        return summary
+
+    def __getitem__(self, verdict) -> int:
+        return self.counts[Verdict(verdict)]
+
+    @property
+    def passed(self) -> bool:
+        return self.total > 0 and self.counts[Verdict.AC] == self.total
+
+    def to_dict(self) -> dict:
+        counts = {verdict.value: count for verdict, count in self.counts.items()}
+        return {"total": self.total, "counts": counts, "passed": self.passed}
+
+    def __repr__(self):
+        counts = ", ".join(f"{verdict.value}={count}" for verdict, count in self.counts.items() if count)
+        return f"Summary(total={self.total}, {counts})"
+
+
+CSV_FIELDS = ("test",) + tuple(field for field in ResultRecord.__slots__ if field != "phases")
+
+
+class JSONLinesSink:
+    # Hook (judge.add_hook) writing one JSON object per finished test.
+    def __init__(self, path: str):
+        self.file = open(path, 'w')
+
+    def __call__(self, event: dict):
+        if event["event"] == "test":
+            row = {"test": event["index"] + 1}
+            row.update(event["result"].to_dict())
+            self.file.write(json.dumps(row) + "\n")
+        elif event["event"] in ("run_end", "run_failed"):
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CSVSink:
+    # Hook writing one CSV row per finished test; phases are left out.
+    def __init__(self, path: str):
+        self.file = open(path, 'w', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(CSV_FIELDS)
+
+    def __call__(self, event: dict):
+        if event["event"] == "test":
+            result = event["result"]
+            self.writer.writerow([event["index"] + 1] + ["" if result[field] is None else result[field] for field in CSV_FIELDS[1:]])
+        elif event["event"] in ("run_end", "run_failed"):
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
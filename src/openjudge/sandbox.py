@@ -0,0 +1,370 @@
+import os
+import sys
+import math
+import errno
+import time
+import signal
+import socket
+import selectors
+import threading
+import subprocess
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Upper bound for files the submission writes itself when no output limit is
+# given (stdout/stderr are pipes and are not affected by RLIMIT_FSIZE).
+FILE_SIZE_LIMIT = 64 * 1024 * 1024
+
+_CHUNK_SIZE = 32768
+
+# RLIMIT_AS is only a backstop, set with headroom: runtimes reserve more
+# address space than they touch, and MLE is decided on peak RSS.
+ADDRESS_SPACE_FACTOR = 2
+
+# stderr markers of a failed allocation, for Python programs (see
+# languages.Language.memory_errors).
+PYTHON_MEMORY_ERRORS = (b"MemoryError",)
+
+
+class OutputLimitExceeded(Exception):
+    pass
+
+
+def make_limits(time_limit: float, memory_limit: int, output_limit: int = None) -> dict:
+    limits = {"fsize": output_limit or FILE_SIZE_LIMIT}
+    if memory_limit:
+        limits["memory"] = int(memory_limit * ADDRESS_SPACE_FACTOR * 1024 * 1024)
+    if time_limit:
+        # Backstop only: the wall-clock timeout normally fires first.
+        limits["cpu"] = int(math.ceil(time_limit)) + 1
+    return limits
+
+
+def _set_limit(res: int, soft: int, hard: int):
+    _, current_hard = resource.getrlimit(res)
+    if current_hard != resource.RLIM_INFINITY:
+        soft = min(soft, current_hard)
+        hard = min(hard, current_hard)
+    resource.setrlimit(res, (soft, hard))
+
+
+def apply_limits(limits: dict):
+    if resource is None:
+        return
+    if "memory" in limits:
+        _set_limit(resource.RLIMIT_AS, limits["memory"], limits["memory"])
+    if "cpu" in limits:
+        _set_limit(resource.RLIMIT_CPU, limits["cpu"], limits["cpu"] + 1)
+    if "fsize" in limits:
+        _set_limit(resource.RLIMIT_FSIZE, limits["fsize"], limits["fsize"])
+    _set_limit(resource.RLIMIT_CORE, 0, 0)
+
+
+def returncode_from_status(status: int) -> int:
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def usage_from_rusage(ru) -> dict:
+    peak_rss_kb = ru.ru_maxrss
+    if sys.platform == "darwin":  # bytes on macOS, KiB elsewhere
+        peak_rss_kb //= 1024
+    return {
+        "cpu_time_user": ru.ru_utime,
+        "cpu_time_sys": ru.ru_stime,
+        "peak_rss_kb": peak_rss_kb,
+    }
+
+
+def spawn(program, limits: dict, zygote=None, args=()):
+    # program is a command list (see languages.Build.command) or the path of
+    # a Python script; only scripts can be started from a zygote. On POSIX
+    # everything else is forked by the launcher (see zygote.launcher), which
+    # applies the limits itself.
+    if zygote is not None:
+        return zygote.spawn(program, limits, args)
+    command = [*program, *args] if isinstance(program, (list, tuple)) else ["python", program, *args]
+    if _use_launcher():
+        from .zygote import launcher  # zygote imports this module
+        return launcher().spawn(command, limits)
+    return subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+def _use_launcher() -> bool:
+    return resource is not None and hasattr(os, "fork") and hasattr(socket, "AF_UNIX")
+
+
+def _input_chunks(input):
+    # input is bytes-like (e.g. a memoryview over an mmap) or an iterable of chunks.
+    if input is None:
+        return iter(())
+    if isinstance(input, (bytes, bytearray, memoryview)):
+        return iter([input])
+    return iter(input)
+
+
+def _next_view(chunks):
+    for chunk in chunks:
+        if len(chunk):
+            return memoryview(chunk)
+    return None
+
+
+def communicate(proc, input, timeout: float, stdout_sink=None, output_limit: int = None, timings: dict = None):
+    # timings, if given, accumulates "io" (time in pipe reads and writes) and
+    # "sink" (time spent inside stdout_sink).
+    if timings is None:
+        timings = {}
+    timings.setdefault("io", 0.0)
+    timings.setdefault("sink", 0.0)
+
+    if os.name != "posix":
+        input = b"".join(bytes(chunk) for chunk in _input_chunks(input))
+        io_start = time.perf_counter()
+        stdout, stderr = proc.communicate(input=input, timeout=timeout)
+        timings["io"] += time.perf_counter() - io_start
+        if output_limit is not None and max(len(stdout), len(stderr)) > output_limit:
+            raise OutputLimitExceeded()
+        if stdout_sink is not None:
+            sink_start = time.perf_counter()
+            stdout_sink(stdout)
+            timings["sink"] += time.perf_counter() - sink_start
+            stdout = b""
+        return stdout, stderr
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    stdout_chunks = []
+    stderr_chunks = []
+    chunks = _input_chunks(input)
+    view = _next_view(chunks)
+    offset = 0
+    received = {proc.stdout: 0, proc.stderr: 0}
+
+    try:
+        with selectors.DefaultSelector() as selector:
+            selector.register(proc.stdout, selectors.EVENT_READ, stdout_sink or stdout_chunks.append)
+            selector.register(proc.stderr, selectors.EVENT_READ, stderr_chunks.append)
+            if view is not None:
+                # A blocking write of a whole chunk into a nearly full pipe
+                # would stall while the child waits on its full stdout.
+                os.set_blocking(proc.stdin.fileno(), False)
+                selector.register(proc.stdin, selectors.EVENT_WRITE)
+            else:
+                proc.stdin.close()
+
+            while selector.get_map():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise subprocess.TimeoutExpired(proc.args, timeout)
+
+                for key, events in selector.select(remaining):
+                    io_start = time.perf_counter()
+                    if key.fileobj is proc.stdin:
+                        try:
+                            offset += os.write(key.fd, view[offset:offset + _CHUNK_SIZE])
+                        except BlockingIOError:
+                            continue
+                        except BrokenPipeError:
+                            view.release()
+                            view = None
+                        if view is not None and offset >= len(view):
+                            view.release()
+                            view = _next_view(chunks)
+                            offset = 0
+                        if view is None:
+                            selector.unregister(proc.stdin)
+                            proc.stdin.close()
+                        timings["io"] += time.perf_counter() - io_start
+                    else:
+                        data = os.read(key.fd, _CHUNK_SIZE)
+                        io_end = time.perf_counter()
+                        timings["io"] += io_end - io_start
+                        if data:
+                            received[key.fileobj] += len(data)
+                            if output_limit is not None and received[key.fileobj] > output_limit:
+                                raise OutputLimitExceeded()
+                            key.data(data)
+                            if key.data is stdout_sink:
+                                timings["sink"] += time.perf_counter() - io_end
+                        else:
+                            selector.unregister(key.fileobj)
+                            key.fileobj.close()
+    finally:
+        # Views may point into an mmap the caller closes afterwards.
+        if view is not None:
+            view.release()
+
+    return b"".join(stdout_chunks), b"".join(stderr_chunks)
+
+
+def reap(proc, timeout: float = None):
+    if hasattr(proc, "rusage"):
+        proc.wait(timeout)
+        return proc.returncode, proc.rusage
+    if not hasattr(os, "wait4"):
+        proc.wait(timeout)
+        return proc.returncode, None
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    delay = 0.0005
+    while True:
+        pid, status, ru = os.wait4(proc.pid, os.WNOHANG if deadline is not None else 0)
+        if pid:
+            break
+        if time.monotonic() >= deadline:
+            raise subprocess.TimeoutExpired(proc.args, timeout)
+        time.sleep(delay)
+        delay = min(delay * 2, 0.01)
+
+    proc.returncode = returncode_from_status(status)
+    return proc.returncode, usage_from_rusage(ru)
+
+
+def kill(proc):
+    if hasattr(proc, "rusage"):
+        # Forked by the launcher or a zygote; killed through its supervisor.
+        proc.kill()
+        return
+    # Popen.kill() may poll() and reap the child, losing its rusage.
+    if os.name != "posix":
+        proc.kill()
+        return
+    if proc.returncode is not None:
+        return  # reaped by reap(): the pid may belong to someone else now
+    try:
+        os.kill(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+class CancelScope:
+    # Tracks the children of one run so they can all be killed at once.
+    def __init__(self):
+        self.cancelled = False
+        self._procs = set()
+        self._killed = set()
+        self._lock = threading.Lock()
+
+    def register(self, proc) -> bool:
+        with self._lock:
+            if self.cancelled:
+                return False
+            self._procs.add(proc)
+            return True
+
+    def unregister(self, proc) -> bool:
+        with self._lock:
+            self._procs.discard(proc)
+            return id(proc) in self._killed
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            procs = list(self._procs)
+            self._killed.update(id(proc) for proc in procs)
+        for proc in procs:
+            kill(proc)
+
+
+def execute(code_path: str, input_data: bytes, time_limit: float, memory_limit: int, zygote=None, wall_time_limit: float = None, stdout_sink=None, scope: CancelScope = None, output_limit: int = None, args=()) -> dict:
+    limits = make_limits(time_limit, memory_limit, output_limit)
+    if wall_time_limit is None:
+        wall_time_limit = time_limit
+    start_time = time.perf_counter()
+    proc = spawn(code_path, limits, zygote, args)
+    spawned_time = time.perf_counter()
+    timings = {}
+    killed_on_spawn = scope is not None and not scope.register(proc)
+    if killed_on_spawn:
+        kill(proc)
+
+    timed_out = False
+    output_exceeded = False
+    stdout, stderr = b"", b""
+    try:
+        try:
+            stdout, stderr = communicate(proc, input_data, wall_time_limit, stdout_sink, output_limit, timings)
+            remaining = None
+            if wall_time_limit is not None:  # None: no time limit
+                remaining = max(0, wall_time_limit - (time.perf_counter() - start_time))
+            returncode, rusage = reap(proc, remaining)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            kill(proc)
+            returncode, rusage = reap(proc)
+        except OutputLimitExceeded:
+            output_exceeded = True
+            kill(proc)
+            returncode, rusage = reap(proc)
+    except BaseException:
+        # The stdout sink raised, or the judge was interrupted: don't leave
+        # the child behind.
+        if proc.returncode is None:
+            kill(proc)
+            reap(proc)
+        raise
+    finally:
+        for f in (proc.stdin, proc.stdout, proc.stderr):
+            if f is not None and not f.closed:
+                f.close()
+
+    elapsed_time = time.perf_counter() - start_time
+    cancelled = scope is not None and (scope.unregister(proc) or killed_on_spawn)
+    return execution_result(stdout, stderr, returncode, rusage, timed_out, output_exceeded, elapsed_time, spawned_time - start_time, timings, cancelled)
+
+
+def execution_result(stdout: bytes, stderr: bytes, returncode: int, rusage: dict, timed_out: bool, output_exceeded: bool, elapsed_time: float, spawn_time: float, timings: dict, cancelled: bool = False) -> dict:
+    # RLIMIT_CPU delivers SIGXCPU when the CPU backstop is hit. RLIMIT_FSIZE
+    # delivers SIGXFSZ, which Python ignores and turns into EFBIG errors.
+    if hasattr(signal, "SIGXCPU") and returncode == -signal.SIGXCPU:
+        timed_out = True
+    if hasattr(signal, "SIGXFSZ") and returncode == -signal.SIGXFSZ:
+        output_exceeded = True
+    if returncode != 0 and _last_line(stderr).startswith(f"OSError: [Errno {errno.EFBIG}]".encode()):
+        output_exceeded = True
+
+    return {
+        "stdout": stdout,
+        "stderr": stderr,
+        "returncode": returncode,
+        "timed_out": timed_out,
+        "output_exceeded": output_exceeded,
+        "elapsed_time": elapsed_time,
+        "rusage": rusage,
+        "cancelled": cancelled,
+        # run spans spawn to reap; io and sink are judge time inside it.
+        "timings": {
+            "spawn": spawn_time,
+            "run": elapsed_time - spawn_time,
+            "io": timings.get("io", 0.0),
+            "sink": timings.get("sink", 0.0),
+        },
+    }
+
+
+def _last_line(data: bytes) -> bytes:
+    lines = data.strip().splitlines()
+    return lines[-1] if lines else b""
+
+
+def memory_exceeded(execution: dict, memory_limit: int, memory_errors: tuple = PYTHON_MEMORY_ERRORS) -> bool:
+    if not memory_limit:
+        return False
+    rusage = execution["rusage"]
+    if rusage is not None and rusage["peak_rss_kb"] > memory_limit * 1024:
+        return True
+    returncode = execution["returncode"]
+    if returncode == 0:
+        return False
+    # A SIGKILL the judge did not send comes from the kernel's OOM killer.
+    if hasattr(signal, "SIGKILL") and returncode == -signal.SIGKILL:
+        if not (execution["timed_out"] or execution["output_exceeded"] or execution["cancelled"]):
+            return True
+    # Allocations refused by RLIMIT_AS surface as the runtime's
+    # out-of-memory error (MemoryError, std::bad_alloc, ...).
+    tail = execution["stderr"][-4096:]
+    return any(marker in tail for marker in memory_errors)
@@ -0,0 +1,377 @@
+import os
+import copy
+import json
+import queue
+import shutil
+import socket
+import argparse
+import tempfile
+import itertools
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+
+from .code_judge import TC_Judge, Checker_Judge, TimeMode
+from .languages import get_language
+from .results import Summary
+
+# Long-running judge service. Problems (test data, checker, limits) are loaded
+# once into a template judge; every submission is judged by a shallow copy of
+# it that shares the loaded test list. Submissions wait in a priority queue
+# (lower priority value runs first) for a bounded pool of worker threads.
+#
+#   POST /submissions           {"problem": "...", "code": "...", "language": "cpp", "priority": 0} -> {"id": ...}
+#   GET  /submissions/<id>      state, summary and results (?since=N skips the first N)
+#   GET  /submissions/<id>/stream   one JSON line per finished test, then the summary
+#   GET  /problems
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+ERROR = "error"
+
+
+class Problem:
+    def __init__(self, name: str, judge):
+        self.name = name
+        self.judge = judge
+
+    @property
+    def tests(self) -> int:
+        return len(self.judge.TC_in)
+
+    def make_judge(self, code_path: str, language: str):
+        judge = copy.copy(self.judge)
+        judge.load_code(code_path, language)
+        # Hooks added to the template (metrics, logging) see every
+        # submission; the submission's own hook only goes on the copy.
+        judge.hooks = list(self.judge.hooks)
+        judge.results = []
+        judge.summary = Summary()
+        return judge
+
+
+class Submission:
+    def __init__(self, submission_id: str, problem: str, code_path: str, language: str, priority: int):
+        self.id = submission_id
+        self.problem = problem
+        self.code_path = code_path
+        self.language = language
+        self.priority = priority
+        self.state = QUEUED
+        self.error = None
+        self.summary = None
+        # (index, result) in completion order, appended by the judging thread.
+        self.results = []
+        self.changed = threading.Condition()
+
+    def _on_event(self, event: dict):
+        if event["event"] == "test":
+            with self.changed:
+                self.results.append((event["index"], event["result"].to_dict()))
+                self.changed.notify_all()
+
+    def _set_state(self, state: str, summary: Summary = None, error: str = None):
+        with self.changed:
+            self.state = state
+            if summary is not None:
+                self.summary = summary.to_dict()
+            self.error = error
+            self.changed.notify_all()
+
+    @property
+    def finished(self) -> bool:
+        return self.state in (DONE, ERROR)
+
+    def to_dict(self, since: int = 0) -> dict:
+        with self.changed:
+            return {
+                "id": self.id,
+                "problem": self.problem,
+                "language": self.language,
+                "priority": self.priority,
+                "state": self.state,
+                "error": self.error,
+                "summary": self.summary,
+                "completed": len(self.results),
+                "results": [_result_row(i, result) for i, result in self.results[since:]],
+            }
+
+
+def _result_row(index: int, result: dict) -> dict:
+    row = {"test": index + 1}
+    row.update(result)
+    return row
+
+
+class JudgeServer:
+    def __init__(self, workers: int = None, test_workers: int = 1, work_dir: str = None, max_history: int = 1000):
+        # workers submissions are judged at once, each on test_workers threads.
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers <= 0:
+            raise ValueError("workers must be over 0")
+        if test_workers <= 0:
+            raise ValueError("test_workers must be over 0")
+        self.workers = workers
+        self.test_workers = test_workers
+        self.max_history = max_history
+        self.problems = {}
+        self.submissions = {}
+        self._owns_work_dir = work_dir is None
+        self.work_dir = work_dir if work_dir is not None else tempfile.mkdtemp(prefix="openjudge-server-")
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._httpds = []
+
+    def add_problem(self, name: str, tc_path: str, checker=None, tc_count: int = None, format: int = None,
+                    time_limit: float = None, memory_limit: int = None, time_mode: TimeMode = None,
+                    output_limit: int = None, batch_checker: bool = False, cache_dir: str = None):
+        if name is None:
+            raise ValueError("name cannot be None")
+        if checker is None:
+            judge = TC_Judge()
+        else:
+            judge = Checker_Judge()
+            judge.load_checker(checker)
+            judge.set_batch_checker(batch_checker)
+        judge.load_TC(tc_path, tc_count, format)
+        if time_limit is not None:
+            judge.set_time_limit(time_limit)
+        if memory_limit is not None:
+            judge.set_memory_limit(memory_limit)
+        if time_mode is not None:
+            judge.set_time_mode(time_mode)
+        if output_limit is not None:
+            judge.set_output_limit(output_limit)
+        if cache_dir is not None:
+            judge.set_cache(cache_dir)
+        judge.set_workers(self.test_workers)
+        self.problems[name] = Problem(name, judge)
+        return self.problems[name]
+
+    def submit(self, problem: str, code: str, priority: int = 0, language: str = "python") -> str:
+        if problem not in self.problems:
+            raise ValueError(f"unknown problem: {problem}")
+        if not isinstance(code, str):
+            raise ValueError("code must be a str")
+        extension = get_language(language).extensions[0]
+        sequence = next(self._sequence)
+        submission_id = f"{sequence:08d}"
+        code_dir = os.path.join(self.work_dir, submission_id)
+        os.makedirs(code_dir)
+        code_path = os.path.join(code_dir, "solution" + extension)
+        with open(code_path, 'w') as file:
+            file.write(code)
+        submission = Submission(submission_id, problem, code_path, language, priority)
+        with self._lock:
+            self.submissions[submission_id] = submission
+            self._evict()
+        self._queue.put((priority, sequence, submission))
+        return submission_id
+
+    def _evict(self):
+        # Drops the oldest finished submissions beyond max_history.
+        if len(self.submissions) <= self.max_history:
+            return
+        for submission_id in sorted(self.submissions):
+            if len(self.submissions) <= self.max_history:
+                break
+            if self.submissions[submission_id].finished:
+                del self.submissions[submission_id]
+
+    def get(self, submission_id: str) -> Submission:
+        with self._lock:
+            return self.submissions.get(submission_id)
+
+    def _worker(self):
+        while True:
+            _, _, submission = self._queue.get()
+            if submission is None:
+                break
+            self._judge(submission)
+
+    def _judge(self, submission: Submission):
+        submission._set_state(RUNNING)
+        try:
+            judge = self.problems[submission.problem].make_judge(submission.code_path, submission.language)
+            judge.set_keep_results(False)
+            judge.add_hook(submission._on_event)
+            judge.run()
+            submission._set_state(DONE, judge.summary)
+        except Exception as e:
+            submission._set_state(ERROR, error=f"{type(e).__name__}: {e}")
+        finally:
+            shutil.rmtree(os.path.dirname(submission.code_path), ignore_errors=True)
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"openjudge-server-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def serve(self, port: int = 8080, host: str = "127.0.0.1"):
+        # HTTP on a TCP port; returns the bound port.
+        httpd = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._serve_in_thread(httpd)
+        return httpd.server_address[1]
+
+    def serve_unix(self, path: str):
+        # HTTP on a Unix socket, e.g. curl --unix-socket <path> http://judge/problems
+        if os.path.exists(path):
+            os.unlink(path)
+        self._serve_in_thread(_UnixHTTPServer(path, _make_handler(self)))
+        return path
+
+    def _serve_in_thread(self, httpd):
+        self._httpds.append(httpd)
+        thread = threading.Thread(target=httpd.serve_forever, name="openjudge-server-http", daemon=True)
+        thread.start()
+
+    def stop(self):
+        for httpd in self._httpds:
+            httpd.shutdown()
+            httpd.server_close()
+            if isinstance(httpd, _UnixHTTPServer):
+                os.unlink(httpd.server_address)
+        self._httpds = []
+        for _ in self._threads:
+            self._queue.put((float("inf"), next(self._sequence), None))
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self._owns_work_dir:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _UnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        # BaseHTTPRequestHandler expects a (host, port) client address.
+        return request, ("local", 0)
+
+
+def _make_handler(server: JudgeServer):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send_json(self, status: int, body: dict):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            if self.path != "/submissions":
+                self._send_json(404, {"error": "not found"})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                submission_id = server.submit(request.get("problem"), request.get("code"), int(request.get("priority", 0)), request.get("language", "python"))
+            except (ValueError, TypeError, AttributeError) as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            self._send_json(202, {"id": submission_id})
+
+        def do_GET(self):
+            path, _, query = self.path.partition("?")
+            parts = [part for part in path.split("/") if part]
+            if parts == ["problems"]:
+                self._send_json(200, {name: {"tests": problem.tests} for name, problem in server.problems.items()})
+                return
+            if len(parts) in (2, 3) and parts[0] == "submissions":
+                submission = server.get(parts[1])
+                if submission is None:
+                    self._send_json(404, {"error": "unknown submission"})
+                elif len(parts) == 3 and parts[2] == "stream":
+                    self._stream(submission)
+                elif len(parts) == 2:
+                    since = 0
+                    for key, _, value in (item.partition("=") for item in query.split("&") if item):
+                        if key == "since" and value.isdigit():
+                            since = int(value)
+                    self._send_json(200, submission.to_dict(since))
+                else:
+                    self._send_json(404, {"error": "not found"})
+                return
+            self._send_json(404, {"error": "not found"})
+
+        def _stream(self, submission: Submission):
+            # Newline-delimited JSON until the submission finishes.
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            sent = 0
+            while True:
+                with submission.changed:
+                    while len(submission.results) == sent and not submission.finished:
+                        submission.changed.wait()
+                    rows = submission.results[sent:]
+                    finished = submission.finished
+                sent += len(rows)
+                try:
+                    for index, result in rows:
+                        self.wfile.write((json.dumps(_result_row(index, result)) + "\n").encode("utf-8"))
+                    if finished:
+                        final = {"state": submission.state, "summary": submission.summary, "error": submission.error}
+                        self.wfile.write((json.dumps(final) + "\n").encode("utf-8"))
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError, socket.timeout):
+                    return
+                if finished:
+                    return
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="openjudge judge server")
+    parser.add_argument("--problem", action="append", default=[], metavar="NAME=TC_PATH", help="problem to load (repeatable)")
+    parser.add_argument("--checker", action="append", default=[], metavar="NAME=CHECKER", help="checker for a problem (path or module:function)")
+    parser.add_argument("--time-limit", type=float, default=None)
+    parser.add_argument("--memory-limit", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None, help="submissions judged at once (default: CPU count)")
+    parser.add_argument("--test-workers", type=int, default=1, help="test threads per submission")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--unix", default=None, help="serve on this Unix socket instead of TCP")
+    args = parser.parse_args()
+
+    checkers = dict(item.split("=", 1) for item in args.checker)
+    server = JudgeServer(args.workers, args.test_workers)
+    for item in args.problem:
+        name, tc_path = item.split("=", 1)
+        server.add_problem(name, tc_path, checkers.get(name), time_limit=args.time_limit, memory_limit=args.memory_limit)
+    server.start()
+    if args.unix is not None:
+        print(f"[server] listening on {server.serve_unix(args.unix)}", flush=True)
+    else:
+        print(f"[server] listening on http://{args.host}:{server.serve(args.port, args.host)}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import os
+import sys
+import time
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from .code_judge import TC_Judge, format_usage
+from .manifest import next_test_name
+from .sandbox import CancelScope, execute
+from .tc_generator import execution_failure
+from .testcase import open_input
+from .zygote import Zygote
+
+REPORT_INTERVAL = 1.0
+
+def _write_atomic(path: str, data: str):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    with os.fdopen(fd, 'w') as file:
+        file.write(data)
+    os.replace(tmp_path, path)
+
+class Stress_Judge(TC_Judge):
+    # Differential testing: random inputs from a generator, expected output
+    # from a reference, and the candidate (load_code) judged by TC_Judge.
+    def __init__(self):
+        super().__init__()
+        self.generator_path = None
+        self.reference_path = None
+        self.TC_path = None
+        self.seed = 0
+        self.verbose = True
+        self.rounds = 0
+        self.elapsed_time = 0
+        self.failure = None
+
+    def set_generator(self, generator_path: str):
+        # Run as `python <generator> <round> <seed>`; stdout is the input.
+        if generator_path is None:
+            raise ValueError("generator_path cannot be None")
+        self.generator_path = generator_path
+
+    def set_reference(self, reference_path: str):
+        if reference_path is None:
+            raise ValueError("reference_path cannot be None")
+        self.reference_path = reference_path
+
+    def set_TC_path(self, TC_path: str):
+        # The failing input is saved here as the next testNNN.in/.out.
+        self.TC_path = TC_path
+
+    def set_seed(self, seed: int):
+        if seed is None:
+            raise ValueError("seed cannot be None")
+        self.seed = seed
+
+    def set_verbose(self, verbose: bool):
+        self.verbose = verbose
+
+    def run(self, rounds: int = None, workers: int = None):
+        # Runs rounds until the candidate fails one, or `rounds` have passed.
+        if workers is None:
+            workers = self.workers
+        if workers <= 0:
+            raise ValueError("workers must be over 0")
+        if rounds is not None and rounds <= 0:
+            raise ValueError("rounds must be over 0")
+        if self.generator_path is None or self.reference_path is None or self.code_path is None:
+            raise ValueError("generator, reference and code should be set before stress testing")
+
+        self.rounds = 0
+        self.failure = None
+        self.results = []
+        errors = []
+        failures = []
+        start_time = time.perf_counter()
+        last_report = start_time
+
+        if self.compile().error is not None:
+            raise RuntimeError(f"candidate: Compile Error: {self._build.error}")
+        self._zygote = Zygote().start() if self.use_zygote else None
+        self._scope = CancelScope()
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                pending = set()
+                next_round = 1
+                try:
+                    while True:
+                        # Keep the pool fed without queueing an unbounded backlog.
+                        while len(pending) < workers * 2 and not self._scope.cancelled and (rounds is None or next_round <= rounds):
+                            pending.add(executor.submit(self.__round, next_round))
+                            next_round += 1
+                        if not pending:
+                            break
+
+                        done, pending = wait(pending, timeout=REPORT_INTERVAL, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            round, seed, input_data, expected, result = future.result()
+                            if result["status"] == "SKIPPED":
+                                continue
+                            self.rounds += 1
+                            if input_data is None:
+                                errors.append((round, result))
+                            elif result["status"] != "AC":
+                                failures.append((round, seed, input_data, expected, result))
+                            else:
+                                continue
+                            self._scope.cancel()
+
+                        now = time.perf_counter()
+                        if self.verbose and now - last_report >= REPORT_INTERVAL:
+                            last_report = now
+                            print(f"\r[stress] {self.rounds} rounds, {self.rounds / (now - start_time):.1f} rounds/sec", end="", file=sys.stderr, flush=True)
+                except BaseException:
+                    # Ctrl-C on an endless run: don't wait out the rounds in flight.
+                    self._scope.cancel()
+                    for future in pending:
+                        future.cancel()
+                    raise
+        finally:
+            self._scope = None
+            if self._zygote is not None:
+                self._zygote.stop()
+                self._zygote = None
+            self.elapsed_time = time.perf_counter() - start_time
+            if self.verbose:
+                print(f"\r[stress] {self.rounds} rounds, {self.rounds / max(self.elapsed_time, 1e-9):.1f} rounds/sec", file=sys.stderr, flush=True)
+
+        if errors:
+            round, result = min(errors, key=lambda error: error[0])
+            raise RuntimeError(f"round {round}: {result['message']}")
+        if failures:
+            round, seed, input_data, expected, result = min(failures, key=lambda failure: failure[0])
+            self.failure = {"round": round, "seed": seed, "input": input_data, "expected": expected, "result": result, "saved_as": None}
+            self.results = [result]
+            if self.TC_path is not None:
+                self.failure["saved_as"] = self.__save(input_data, expected)
+        return self.failure
+
+    def __round(self, round: int):
+        seed = self.seed + round
+        execution = execute(
+            self.generator_path, b"", self.time_limit, self.memory_limit, self._zygote,
+            scope=self._scope, args=(str(round), str(seed))
+        )
+        failure = execution_failure("generator", execution, self.time_limit, self.memory_limit, False)
+        if failure is not None:
+            return round, seed, None, None, failure
+        input_data = execution["stdout"].decode('utf-8')
+
+        with open_input(input_data) as stdin_data:
+            execution = execute(
+                self.reference_path, stdin_data, self.time_limit, self.memory_limit, self._zygote,
+                scope=self._scope, output_limit=self._output_limit_bytes()
+            )
+        failure = execution_failure("reference", execution, self.time_limit, self.memory_limit, True)
+        if failure is not None:
+            return round, seed, None, None, failure
+        expected = execution["stdout"].decode('utf-8')
+
+        return round, seed, input_data, expected, self.run_cycle(input_data, expected)
+
+    def __save(self, input_data: str, expected: str) -> str:
+        name = next_test_name(self.TC_path)
+        _write_atomic(os.path.join(self.TC_path, name + ".out"), expected)
+        _write_atomic(os.path.join(self.TC_path, name + ".in"), input_data)
+        return name
+
+    def print_results(self):
+        rate = self.rounds / self.elapsed_time if self.elapsed_time else 0
+        print("\n===== Stress =====")
+        print(f"- rounds: {self.rounds} ({rate:.1f} rounds/sec)")
+        if self.failure is None:
+            print("- ✅ no disagreement found")
+            return
+        result = self.failure["result"]
+        print(f"- ❌ round {self.failure['round']} (seed {self.failure['seed']}): {result['status']} ({format_usage(result)})")
+        print(f"- {result['message']}")
+        if self.failure["saved_as"] is not None:
+            print(f"- saved as {self.failure['saved_as']}.in / {self.failure['saved_as']}.out")
@@ -1,34 +1,200 @@
 import os
+import shutil
+import tempfile
+from .code_judge import make_result, parse_checker_verdict, run_cases, run_checker, skipped_result
+from .pack import write_pack
+from .sandbox import CancelScope, execute, memory_exceeded
+from .testcase import TC_File, normalize_str, open_input
+from .zygote import Zygote
+
+def _discard(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def execution_failure(stage: str, execution: dict, time_limit: float, memory_limit: int, check_stderr: bool):
+    # Result for a generator or reference run that did not finish cleanly.
+    if execution["cancelled"]:
+        return skipped_result()
+    elapsed_time = execution["elapsed_time"]
+    return_code = execution["returncode"]
+    if execution["timed_out"]:
+        return make_result("TLE", f"{stage}: Time Limit Exceeded", time_limit, -1, execution)
+    if memory_exceeded(execution, memory_limit):
+        return make_result("MLE", f"{stage}: Memory Limit Exceeded", elapsed_time, -1, execution)
+    if execution["output_exceeded"]:
+        return make_result("OLE", f"{stage}: Output Limit Exceeded", elapsed_time, -1, execution)
+    if return_code != 0 or (check_stderr and execution["stderr"]):
+        stderr = execution["stderr"].decode('utf-8', errors='replace')
+        return make_result("RE", f"{stage}: Runtime Error: {stderr}", elapsed_time, return_code, execution)
+    return None
 
 class TC_Generator:
     def __init__(self):
         self.TC_path = None
         self.TC_checker_path = None
-        
+        self.TC_checker_func = None
+        self.TC_pack_path = None
+        self.compress = False
+        self.generator_path = None
+        self.reference_path = None
+        self.seed = 0
+        self.time_limit = 10
+        self.memory_limit = 1024
+        self.workers = os.cpu_count() or 1
+        self.use_zygote = False
+        self._zygote = None
+        self._scope = None
+        self.results = []
+
     def set_TC_path(self, TC_path):
         if TC_path is None:
             raise ValueError("TC_path cannot be None")
         self.TC_path = TC_path
 
-    def set_TC_checker(self, TC_checker_path):
-        self.TC_checker_path = TC_checker_path
+    def set_TC_pack(self, TC_pack_path, compress: bool = False):
+        # Write a single test pack file instead of testNNN.in/.out files.
+        self.TC_pack_path = TC_pack_path
+        self.compress = compress
+
+    def set_TC_checker(self, TC_checker):
+        # Path to a checker script, or a callable taking (input, output) str.
+        self.TC_checker_path = None
+        self.TC_checker_func = None
+        if callable(TC_checker):
+            self.TC_checker_func = TC_checker
+        else:
+            self.TC_checker_path = TC_checker
+
+    def set_generator(self, generator_path: str):
+        # Run as `python <generator> <index> <seed>`; stdout becomes the .in file.
+        if generator_path is None:
+            raise ValueError("generator_path cannot be None")
+        self.generator_path = generator_path
+
+    def set_reference(self, reference_path: str):
+        if reference_path is None:
+            raise ValueError("reference_path cannot be None")
+        self.reference_path = reference_path
+
+    def set_seed(self, seed: int):
+        if seed is None:
+            raise ValueError("seed cannot be None")
+        self.seed = seed
+
+    def set_time_limit(self, time_limit: int):
+        if time_limit is None:
+            raise ValueError("time_limit cannot be None")
+        if time_limit <= 0:
+            raise ValueError("time_limit must be over 0")
+        self.time_limit = time_limit
+
+    def set_memory_limit(self, memory_limit: int):
+        if memory_limit is None:
+            raise ValueError("memory_limit cannot be None")
+        if memory_limit <= 0:
+            raise ValueError("memory_limit must be over 0")
+        self.memory_limit = memory_limit
 
-    def generate(self, TC_count, format):
+    def set_workers(self, workers: int):
+        if workers is None or workers <= 0:
+            raise ValueError("workers must be over 0")
+        self.workers = workers
+
+    def set_zygote(self, use_zygote: bool):
+        self.use_zygote = use_zygote
+
+    def generate(self, TC_count, format=None):
         if TC_count is None:
             raise ValueError("TC_count cannot be None")
         if TC_count <= 0:
             raise ValueError("TC_count must be over zero")
-        
-        if self.TC_path == None:
-            raise ValueError("TC_path should be set before generating testcases")
-        
-        for i in range(1, TC_count + 1):
-            fname = str(i).zfill(format)
-            in_path = os.path.join(self.TC_path, "test" + fname + ".in")
-            out_path = os.path.join(self.TC_path, "test" + fname + ".out")
-
-            with open(in_path, "w") as file:
-                pass
-
-            with open(out_path, "w") as file:
-                pass
+        if format is None:
+            format = len(str(TC_count))
+
+        if self.TC_path == None and self.TC_pack_path == None:
+            raise ValueError("TC_path or TC_pack_path should be set before generating testcases")
+        if self.generator_path is None or self.reference_path is None:
+            raise ValueError("generator and reference should be set before generating testcases")
+
+        if self.TC_pack_path is not None:
+            directory = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(self.TC_pack_path)))
+        else:
+            directory = self.TC_path
+
+        names = ["test" + str(i).zfill(format) for i in range(1, TC_count + 1)]
+        if self.use_zygote:
+            self._zygote = Zygote().start()
+        self._scope = CancelScope()
+        try:
+            cases = [(i, name, directory) for i, name in enumerate(names, 1)]
+            self.results = run_cases(self.__generate_cycle, cases, self.workers, 1, self._scope)
+            for name, result in zip(names, self.results):
+                if result["status"] not in ("AC", "SKIPPED"):
+                    raise RuntimeError(f"{name}: {result['message']}")
+
+            if self.TC_pack_path is not None:
+                cases = []
+                for name in names:
+                    in_file = TC_File(os.path.join(directory, name + ".in"))
+                    out_file = TC_File(os.path.join(directory, name + ".out"))
+                    cases.append((name, in_file, out_file))
+                write_pack(self.TC_pack_path, cases, self.compress)
+        finally:
+            self._scope = None
+            if self._zygote is not None:
+                self._zygote.stop()
+                self._zygote = None
+            if self.TC_pack_path is not None:
+                shutil.rmtree(directory, ignore_errors=True)
+
+    def __generate_cycle(self, index: int, name: str, directory: str):
+        # Both files are written under temporary names and only renamed into
+        # place once the generator, the reference and the checker succeeded.
+        in_path = os.path.join(directory, name + ".in")
+        out_path = os.path.join(directory, name + ".out")
+        in_fd, in_tmp = tempfile.mkstemp(dir=directory, suffix=".in.tmp")
+        out_tmp = None
+        try:
+            with os.fdopen(in_fd, 'wb') as file:
+                execution = execute(
+                    self.generator_path, b"", self.time_limit, self.memory_limit, self._zygote,
+                    stdout_sink=file.write, scope=self._scope, args=(str(index), str(self.seed + index))
+                )
+            failure = execution_failure("generator", execution, self.time_limit, self.memory_limit, False)
+            if failure is not None:
+                return failure
+
+            # The reference sees exactly the stdin a judged program will.
+            input_file = TC_File(in_tmp)
+            out_fd, out_tmp = tempfile.mkstemp(dir=directory, suffix=".out.tmp")
+            with os.fdopen(out_fd, 'wb') as file, open_input(input_file) as stdin_data:
+                execution = execute(
+                    self.reference_path, stdin_data, self.time_limit, self.memory_limit, self._zygote,
+                    stdout_sink=file.write, scope=self._scope
+                )
+            failure = execution_failure("reference", execution, self.time_limit, self.memory_limit, True)
+            if failure is not None:
+                return failure
+
+            if self.TC_checker_func is not None or self.TC_checker_path is not None:
+                input_data = input_file.read_text()
+                output_data = TC_File(out_tmp).read_text()
+                try:
+                    if self.TC_checker_func is not None:
+                        accepted, _, _ = parse_checker_verdict(self.TC_checker_func(normalize_str(input_data.strip()), normalize_str(output_data.strip())))
+                    else:
+                        accepted = run_checker(self.TC_checker_path, input_data, output_data, self.time_limit)
+                except Exception as e:
+                    return make_result("CKE", f"checker: {type(e).__name__}: {e}", 0, None)
+                if not accepted:
+                    return make_result("WA", "checker rejected the reference output", 0, None)
+
+            os.replace(in_tmp, in_path)
+            os.replace(out_tmp, out_path)
+            return make_result("AC", "Generated", execution["elapsed_time"], 0, execution)
+        finally:
+            _discard(in_tmp)
+            if out_tmp is not None:
+                _discard(out_tmp)
@@ -0,0 +1,92 @@
+import os
+import mmap
+from contextlib import contextmanager
+
+CHUNK_SIZE = 65536
+
+
+def normalize_str(s: str) -> str:
+    return s.replace('\r\n', '\n').rstrip('\n').rstrip('\r')
+
+
+def strip_newlines(data, start: int, end: int) -> int:
+    # End offset of data[start:end] without its trailing \n characters.
+    while end > start and data[end - 1] == 0x0a:
+        end -= 1
+    return end
+
+
+class TC_File:
+    # A test case file on disk; the contents are only read when a test runs.
+    def __init__(self, path: str, size: int = None, sha256: str = None, normalized_sha256: str = None):
+        self.path = path
+        self.size = os.path.getsize(path) if size is None else size
+        self.sha256 = sha256
+        self.normalized_sha256 = normalized_sha256
+
+    def open(self):
+        return open(self.path, 'rb')
+
+    def read_text(self) -> str:
+        with open(self.path, 'r') as file:
+            return file.read()
+
+    @contextmanager
+    def stdin(self):
+        if self.size == 0:
+            yield b""
+            return
+
+        with self.open() as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if mapped.find(b"\r") != -1:
+                    yield _text_chunks(self.path)
+                    return
+
+                if hasattr(mapped, "madvise"):
+                    mapped.madvise(mmap.MADV_SEQUENTIAL)
+                view = memoryview(mapped)[:strip_newlines(mapped, 0, len(mapped))]
+                try:
+                    yield view
+                finally:
+                    view.release()
+
+    def __repr__(self):
+        return f"TC_File({self.path!r}, size={self.size})"
+
+
+def from_manifest(tc_path: str, entry: dict) -> TC_File:
+    return TC_File(os.path.join(tc_path, entry["file"]), entry["size"], entry["sha256"], entry.get("normalized_sha256"))
+
+
+def read_text(data) -> str:
+    if isinstance(data, TC_File):
+        return data.read_text()
+    return data
+
+
+def _text_chunks(path: str):
+    # Text mode applies the same universal newline translation the old
+    # in-memory loader did; trailing newlines are held back and dropped.
+    pending = ""
+    with open(path, 'r') as file:
+        while True:
+            chunk = file.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            chunk = pending + chunk
+            body = chunk.rstrip('\n')
+            pending = chunk[len(body):]
+            if body:
+                yield body.encode('utf-8')
+
+
+@contextmanager
+def open_input(data):
+    # Yields the child's stdin payload: bytes, a memoryview over an mmap of the
+    # .in file, or an iterator of chunks when newlines need translating.
+    if not isinstance(data, TC_File):
+        yield normalize_str(data).encode('utf-8')
+        return
+    with data.stdin() as payload:
+        yield payload
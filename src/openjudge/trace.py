@@ -0,0 +1,97 @@
+import os
+import sys
+import threading
+from enum import IntEnum
+
+from .testcase import TC_File
+
+# Judges keep `tracer = None` when tracing is off and guard every trace point
+# with `if self.tracer is not None`, so a disabled trace formats nothing and
+# makes no calls. Messages use %-style arguments that are only formatted when
+# the level is enabled.
+
+
+class TraceLevel(IntEnum):
+    OFF = 0
+    INFO = 1    # one line per test verdict, run summaries
+    DEBUG = 2   # limits, spawn/cache/checker details, phase timings
+    TRACE = 3   # payload dumps (truncated)
+
+
+def describe(data) -> str:
+    if isinstance(data, TC_File):
+        return os.path.basename(data.path)
+    return "<inline>"
+
+
+class Tracer:
+    def __init__(self, level: TraceLevel = TraceLevel.DEBUG, stream=None, max_payload: int = 256, sample: int = 1):
+        self.level = level
+        self.stream = stream if stream is not None else sys.stderr
+        # Payloads are cut to max_payload bytes; with sample=N only every Nth
+        # test gets its payloads dumped at all.
+        self.max_payload = max_payload
+        self.sample = sample
+        self._lock = threading.Lock()
+        self._dumps = 0
+
+    def enabled(self, level: TraceLevel) -> bool:
+        return self.level >= level
+
+    def log(self, level: TraceLevel, message: str, *args):
+        if self.level < level:
+            return
+        if args:
+            message = message % args
+        line = f"[{level.name}] [{threading.current_thread().name}] {message}\n"
+        with self._lock:
+            self.stream.write(line)
+            self.stream.flush()
+
+    def info(self, message: str, *args):
+        self.log(TraceLevel.INFO, message, *args)
+
+    def debug(self, message: str, *args):
+        self.log(TraceLevel.DEBUG, message, *args)
+
+    def sampled(self) -> bool:
+        # Whether the current test's payloads should be dumped.
+        if self.level < TraceLevel.TRACE:
+            return False
+        with self._lock:
+            self._dumps += 1
+            return (self._dumps - 1) % self.sample == 0
+
+    def head(self, data) -> tuple:
+        # First max_payload bytes of a payload and its total size, reading no
+        # more than that from test files.
+        if isinstance(data, TC_File):
+            with data.open() as file:
+                return file.read(self.max_payload), data.size
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        return bytes(data[:self.max_payload]), len(data)
+
+    def payload(self, label: str, data, size: int = None):
+        if self.level < TraceLevel.TRACE:
+            return
+        head, total = self.head(data)
+        if size is not None:
+            total = size
+        suffix = f" ... (+{total - len(head)} bytes)" if total > len(head) else ""
+        self.log(TraceLevel.TRACE, "%s (%d bytes): %r%s", label, total, head, suffix)
+
+
+class HeadCapture:
+    # stdout_sink wrapper that keeps the first `limit` bytes of the stream.
+    def __init__(self, sink, limit: int):
+        self.sink = sink
+        self.limit = limit
+        self.head = b""
+        self.size = 0
+
+    def __call__(self, chunk: bytes):
+        if len(self.head) < self.limit:
+            self.head += bytes(chunk[:self.limit - len(self.head)])
+        self.size += len(chunk)
+        self.sink(chunk)
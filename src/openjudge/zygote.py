@@ -0,0 +1,428 @@
+import io
+import os
+import sys
+import json
+import time
+import array
+import errno
+import atexit
+import select
+import shutil
+import signal
+import socket
+import tempfile
+import threading
+import subprocess
+
+if __package__:
+    from .sandbox import apply_limits, communicate, returncode_from_status, usage_from_rusage
+else:  # started as a script by Zygote.start
+    from sandbox import apply_limits, communicate, returncode_from_status, usage_from_rusage
+
+# Standard library modules imported once by the zygote so forked children
+# don't pay for them on every test case.
+PRELOAD_MODULES = [
+    "array", "bisect", "collections", "copy", "dataclasses", "decimal",
+    "fractions", "functools", "heapq", "io", "itertools", "json", "math",
+    "operator", "random", "re", "runpy", "statistics", "string", "traceback",
+    "typing",
+]
+
+_MAX_FDS = 3
+
+
+def _send_fds(sock: socket.socket, data: bytes, fds):
+    sock.sendmsg([data], [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", fds))])
+
+
+def _recv_fds(sock: socket.socket, msglen: int, maxfds: int):
+    fds = array.array("i")
+    msg, ancdata, flags, addr = sock.recvmsg(msglen, socket.CMSG_LEN(maxfds * fds.itemsize))
+    for cmsg_level, cmsg_type, cmsg_data in ancdata:
+        if cmsg_level == socket.SOL_SOCKET and cmsg_type == socket.SCM_RIGHTS:
+            fds.frombytes(cmsg_data[:len(cmsg_data) - (len(cmsg_data) % fds.itemsize)])
+    return msg, list(fds)
+
+
+def _exit_code(code) -> int:
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code & 0xff
+    print(code, file=sys.stderr)
+    return 1
+
+
+def _redirect(fds):
+    for target, fd in enumerate(fds):
+        os.dup2(fd, target)
+    for fd in fds:
+        if fd > 2:
+            os.close(fd)
+
+
+def _exec_command(request: dict, fds, error_w: int):
+    # Runs in the forked grandchild of the launcher: a small, single-threaded
+    # process, so nothing of the judge's memory or locks is inherited. exec
+    # failures are reported to the supervisor over error_w (close-on-exec).
+    try:
+        _redirect(fds)
+        os.chdir(request["cwd"])
+        apply_limits(request["limits"])
+        os.execvp(request["command"][0], request["command"])
+    except OSError as e:
+        os.write(error_w, f"{e.errno or errno.ENOEXEC}:{e.strerror or e}".encode("utf-8"))
+    except BaseException as e:
+        os.write(error_w, f"{errno.ENOEXEC}:{type(e).__name__}: {e}".encode("utf-8"))
+    os._exit(127)
+
+
+def _exec_submission(request: dict, fds):
+    # Runs in the forked grandchild: rebuild the interpreter state that a
+    # fresh `python <code_path>` would see, then run the submission.
+    import random
+    import runpy
+    import traceback
+
+    _redirect(fds)
+    os.chdir(request["cwd"])
+    apply_limits(request["limits"])
+    code_path = request["path"]
+    sys.argv = [code_path, *request["args"]]
+    sys.path[0] = os.path.dirname(os.path.abspath(code_path))
+    sys.stdin = sys.__stdin__ = open(0, "r", closefd=False)
+    if os.environ.get("PYTHONUNBUFFERED"):
+        sys.stdout = sys.__stdout__ = io.TextIOWrapper(open(1, "wb", buffering=0, closefd=False), write_through=True)
+    else:
+        sys.stdout = sys.__stdout__ = open(1, "w", closefd=False)
+    sys.stderr = sys.__stderr__ = open(2, "w", closefd=False, errors="backslashreplace")
+    random.seed()
+
+    code = 0
+    try:
+        runpy.run_path(code_path, run_name="__main__")
+    except SystemExit as e:
+        code = _exit_code(e.code)
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+
+    # What interpreter shutdown would do before exiting: wait for the
+    # non-daemon threads (e.g. main() run on a thread with a bigger stack)
+    # and run the atexit handlers.
+    try:
+        threading._shutdown()
+    except BaseException:
+        traceback.print_exc()
+        code = code or 1
+    try:
+        atexit._run_exitfuncs()
+    except BaseException:
+        code = code or 1
+
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    except Exception:
+        code = code or 120
+    os._exit(code)
+
+
+def _supervise(conn: socket.socket):
+    # One supervisor per request: it forks the submission, reports its pid,
+    # reaps it and reports the exit status back over the connection. It is
+    # also the only process that signals the submission: until it reaps the
+    # child the pid can't be reused, so a kill request (any byte from the
+    # judge, or the judge hanging up) never hits an unrelated process.
+    wakeup_r, wakeup_w = os.pipe()
+    os.set_blocking(wakeup_r, False)
+    os.set_blocking(wakeup_w, False)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+    signal.set_wakeup_fd(wakeup_w)
+    try:
+        msg, fds = _recv_fds(conn, 65536, _MAX_FDS)
+        request = json.loads(msg.decode("utf-8"))
+
+        command = "command" in request
+        if command:
+            error_r, error_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            signal.set_wakeup_fd(-1)
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            conn.close()
+            os.close(wakeup_r)
+            os.close(wakeup_w)
+            if command:
+                os.close(error_r)
+                _exec_command(request, fds, error_w)
+            _exec_submission(request, fds)
+
+        for fd in fds:
+            os.close(fd)
+        if command:
+            # EOF without data means the exec succeeded.
+            os.close(error_w)
+            with open(error_r, "rb") as error_pipe:
+                error = error_pipe.read()
+            if error:
+                os.waitpid(pid, 0)
+                code, message = error.decode("utf-8", errors="replace").split(":", 1)
+                conn.sendall((json.dumps({"error": message, "errno": int(code)}) + "\n").encode("utf-8"))
+                os._exit(0)
+        conn.sendall((json.dumps({"pid": pid}) + "\n").encode("utf-8"))
+
+        watched = [conn, wakeup_r]
+        while True:
+            # SIGCHLD writes to wakeup_r, so an exit between wait4 and
+            # select still wakes the select.
+            reaped, status, ru = os.wait4(pid, os.WNOHANG)
+            if reaped:
+                break
+            ready, _, _ = select.select(watched, [], [])
+            if wakeup_r in ready:
+                while True:
+                    try:
+                        if not os.read(wakeup_r, 512):
+                            break
+                    except BlockingIOError:
+                        break
+            if conn in ready:
+                if not conn.recv(64):
+                    watched.remove(conn)
+                os.kill(pid, signal.SIGKILL)
+        reply = {"returncode": returncode_from_status(status), "rusage": usage_from_rusage(ru)}
+        conn.sendall((json.dumps(reply) + "\n").encode("utf-8"))
+    except Exception as e:
+        try:
+            conn.sendall((json.dumps({"error": f"{type(e).__name__}: {e}"}) + "\n").encode("utf-8"))
+        except OSError:
+            pass
+    os._exit(0)
+
+
+def serve(sock_path: str, preload: bool = True):
+    if preload:
+        for name in PRELOAD_MODULES:
+            try:
+                __import__(name)
+            except ImportError:
+                pass
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(sock_path)
+    server.listen(128)
+
+    # Supervisors are reaped automatically; they reset this before forking.
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+    sys.stdout.write("ready\n")
+    sys.stdout.flush()
+
+    while True:
+        # The judge holds our stdin open; EOF means it has gone away.
+        ready, _, _ = select.select([server, sys.stdin], [], [])
+        if sys.stdin in ready:
+            os._exit(0)
+        conn, _ = server.accept()
+        pid = os.fork()
+        if pid == 0:
+            server.close()
+            _supervise(conn)
+        conn.close()
+
+
+class ZygoteProcess:
+    def __init__(self, sock_path: str, program, limits: dict, args=()):
+        # program is a command list (exec'd by the supervisor) or a Python
+        # script path (run in the forked interpreter).
+        if isinstance(program, (list, tuple)):
+            self.args = [*program, *args]
+            request = {"command": [str(arg) for arg in self.args]}
+        else:
+            self.args = ["python", program, *args]
+            request = {"path": program, "args": [str(arg) for arg in args]}
+        request["cwd"] = os.getcwd()
+        request["limits"] = limits
+        self.returncode = None
+        self.rusage = None
+        self._lock = threading.Lock()
+        self._buffer = b""
+
+        self._conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._conn.connect(sock_path)
+
+        stdin_r, stdin_w = os.pipe()
+        stdout_r, stdout_w = os.pipe()
+        stderr_r, stderr_w = os.pipe()
+        try:
+            _send_fds(self._conn, json.dumps(request).encode("utf-8"), [stdin_r, stdout_w, stderr_w])
+        finally:
+            os.close(stdin_r)
+            os.close(stdout_w)
+            os.close(stderr_w)
+
+        self.stdin = open(stdin_w, "wb", buffering=0)
+        self.stdout = open(stdout_r, "rb", buffering=0)
+        self.stderr = open(stderr_r, "rb", buffering=0)
+
+        reply = self._read_message(None)
+        if reply is None or "pid" not in reply:
+            self.close()
+            if reply is not None and "errno" in reply:
+                # Same exception Popen raises, e.g. FileNotFoundError.
+                raise OSError(reply["errno"], reply["error"], self.args[0])
+            error = reply.get("error") if reply else "zygote closed the connection"
+            raise OSError(f"zygote failed to start {self.args[0]}: {error}")
+        self.pid = reply["pid"]
+
+    def _read_message(self, timeout):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while b"\n" not in self._buffer:
+            remaining = None if deadline is None else max(0, deadline - time.monotonic())
+            ready, _, _ = select.select([self._conn], [], [], remaining)
+            if not ready:
+                return None
+            data = self._conn.recv(4096)
+            if not data:
+                return None
+            self._buffer += data
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return json.loads(line.decode("utf-8"))
+
+    def _wait_status(self, timeout):
+        with self._lock:
+            if self.returncode is not None:
+                return self.returncode
+            try:
+                # The status may already be buffered along with the pid.
+                ready = [self._conn] if b"\n" in self._buffer else select.select([self._conn], [], [], timeout)[0]
+            except (OSError, ValueError):
+                ready = [self._conn]
+            if not ready:
+                return None
+            message = self._read_message(timeout)
+            if message is not None and "returncode" in message:
+                self.returncode = message["returncode"]
+                self.rusage = message["rusage"]
+            elif message is None and not self._buffer:
+                # The supervisor went away without reporting a status.
+                self.returncode = -signal.SIGKILL
+            return self.returncode
+
+    def poll(self):
+        return self._wait_status(0)
+
+    def wait(self, timeout: float = None):
+        if self._wait_status(timeout) is None:
+            raise subprocess.TimeoutExpired(self.args, timeout)
+        return self.returncode
+
+    def communicate(self, input: bytes = None, timeout: float = None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        stdout, stderr = communicate(self, input, timeout)
+        self.wait(None if deadline is None else max(0, deadline - time.monotonic()))
+        return stdout, stderr
+
+    def fileno(self) -> int:
+        # Readable once the exit status is in (see aio.reap_async).
+        return self._conn.fileno()
+
+    def status_buffered(self) -> bool:
+        return self.returncode is not None or b"\n" in self._buffer
+
+    def kill(self):
+        # Asks the supervisor, which still owns the pid; signalling self.pid
+        # here could hit another process once the child has been reaped.
+        if self.returncode is not None:
+            return
+        try:
+            self._conn.send(b"k")
+        except OSError:
+            pass
+
+    def close(self):
+        for f in (self.stdin, self.stdout, self.stderr):
+            if f is not None and not f.closed:
+                f.close()
+        self._conn.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class Zygote:
+    # preload=False gives a launcher: a small process that only forks and
+    # execs commands (see launcher()).
+    def __init__(self, preload: bool = True):
+        self.preload = preload
+        self.proc = None
+        self.sock_dir = None
+        self.sock_path = None
+
+    def start(self):
+        if not hasattr(os, "fork") or not hasattr(socket, "AF_UNIX"):
+            raise OSError("zygote mode requires os.fork and AF_UNIX sockets")
+        self.sock_dir = tempfile.mkdtemp(prefix="openjudge-zygote-")
+        self.sock_path = os.path.join(self.sock_dir, "zygote.sock")
+        command = ["python", os.path.abspath(__file__), self.sock_path]
+        if not self.preload:
+            command.append("--launcher")
+        self.proc = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        if self.proc.stdout.readline().strip() != b"ready":
+            self.stop()
+            raise OSError("zygote failed to start")
+        return self
+
+    def spawn(self, program, limits: dict = None, args=()) -> ZygoteProcess:
+        if self.proc is None:
+            raise ValueError("zygote should be started before spawning")
+        return ZygoteProcess(self.sock_path, program, limits or {}, args)
+
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None
+
+    def stop(self):
+        if self.proc is not None:
+            self.proc.kill()
+            self.proc.wait()
+            self.proc.stdin.close()
+            self.proc.stdout.close()
+            self.proc = None
+        if self.sock_dir is not None:
+            shutil.rmtree(self.sock_dir, ignore_errors=True)
+            self.sock_dir = None
+            self.sock_path = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+_launcher = None
+_launcher_lock = threading.Lock()
+
+
+def launcher() -> Zygote:
+    # Process-wide launcher used by sandbox.spawn. Submissions are forked
+    # from it rather than from the judge: a child forked from the judge
+    # inherits the judge's peak RSS in ru_maxrss (on Linux, exec records the
+    # old address space's high-water mark), and forking from a threaded
+    # process with preexec_fn can deadlock. Restarted if it has died.
+    global _launcher
+    with _launcher_lock:
+        if _launcher is None or not _launcher.alive():
+            if _launcher is not None:
+                _launcher.stop()
+            _launcher = Zygote(preload=False).start()
+            atexit.register(_launcher.stop)
+        return _launcher
+
+
+if __name__ == "__main__":
+    serve(sys.argv[1], "--launcher" not in sys.argv[2:])
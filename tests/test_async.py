@@ -0,0 +1,106 @@
+import os
+import sys
+import time
+import asyncio
+
+import pytest
+
+from openjudge import Checker_Judge, TC_Judge
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="POSIX only")
+
+# Records its pid, then answers test 1 at once and hangs on the others.
+SOLUTION = """\
+import os, sys, time
+n = int(input())
+with open(os.path.join(sys.argv[0] + ".pids", str(os.getpid())), "w"):
+    pass
+if n > 1:
+    time.sleep(60)
+print(n * n)
+"""
+
+
+@pytest.fixture
+def judge(tmp_path):
+    tc_path = tmp_path / "testcase"
+    tc_path.mkdir()
+    for i in range(1, 7):
+        (tc_path / f"test{i}.in").write_text(f"{i}\n")
+        (tc_path / f"test{i}.out").write_text(f"{i * i}\n")
+    code_path = tmp_path / "solution.py"
+    code_path.write_text(SOLUTION)
+    (tmp_path / "solution.py.pids").mkdir()
+    judge = TC_Judge()
+    judge.load_TC(str(tc_path))
+    judge.load_code(str(code_path))
+    judge.set_time_limit(120)
+    return judge
+
+
+def started_pids(judge) -> list:
+    return [int(name) for name in os.listdir(judge.code_path + ".pids")]
+
+
+def assert_all_gone(pids: list, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    for pid in pids:
+        while True:
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                break
+            assert time.monotonic() < deadline, f"child {pid} is still running"
+            time.sleep(0.05)
+
+
+def test_results_as_they_finish(judge):
+    judge.set_time_limit(0.5)
+
+    async def collect():
+        return [(i, result["status"]) async for i, result in judge.iter_results_async(workers=6)]
+
+    results = asyncio.run(collect())
+    assert results[0] == (0, "AC")
+    assert sorted(results) == [(0, "AC")] + [(i, "TLE") for i in range(1, 6)]
+    assert [result["status"] for result in judge.results] == ["AC"] + ["TLE"] * 5
+
+
+def test_closing_early_kills_children(judge):
+    events = []
+    judge.add_hook(lambda event: events.append(event["event"]))
+
+    async def first_result():
+        results = judge.iter_results_async(workers=3)
+        async for i, result in results:
+            break
+        await results.aclose()
+        return i, result
+
+    i, result = asyncio.run(first_result())
+    assert (i, result["status"]) == (0, "AC")
+    assert events[-1] == "run_failed"
+    assert len(started_pids(judge)) >= 2
+    assert_all_gone(started_pids(judge))
+
+
+def test_cancelling_the_task_kills_children(judge):
+    async def cancel_soon():
+        task = asyncio.ensure_future(judge.run_async(workers=3))
+        while len(started_pids(judge)) < 3:
+            await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(asyncio.wait_for(cancel_soon(), 30))
+    assert_all_gone(started_pids(judge))
+
+
+def test_checker_judge(judge, tmp_path):
+    checker_judge = Checker_Judge()
+    checker_judge.load_TC(str(tmp_path / "testcase"), 1)
+    checker_judge.load_code(judge.code_path)
+    checker_judge.load_checker(lambda input_data, output_data: int(output_data) == int(input_data) ** 2)
+    asyncio.run(checker_judge.run_async())
+    assert [result["status"] for result in checker_judge.results] == ["AC"]
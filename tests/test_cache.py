@@ -0,0 +1,47 @@
+from openjudge.cache import callable_digest
+
+THRESHOLD = 1
+
+
+def make(word):
+    def check(input_data, output_data):
+        return output_data.strip() == word
+    return check
+
+
+def with_default(input_data, output_data, word="hi"):
+    return output_data.strip() == word
+
+
+def uses_global(input_data, output_data):
+    return len(output_data) > THRESHOLD
+
+
+def recursive(n):
+    return n if n < 2 else recursive(n - 1)
+
+
+def test_closures():
+    assert callable_digest(make("hi")) == callable_digest(make("hi"))
+    assert callable_digest(make("hi")) != callable_digest(make("nope"))
+
+
+def test_defaults():
+    before = callable_digest(with_default)
+    with_default.__defaults__ = ("nope",)
+    try:
+        assert callable_digest(with_default) != before
+    finally:
+        with_default.__defaults__ = ("hi",)
+    assert callable_digest(with_default) == before
+
+
+def test_globals(monkeypatch):
+    before = callable_digest(uses_global)
+    monkeypatch.setitem(globals(), "THRESHOLD", 2)
+    assert callable_digest(uses_global) != before
+
+
+def test_lambdas_and_recursion():
+    assert callable_digest(lambda a, b: a == b) != callable_digest(lambda a, b: a != b)
+    assert callable_digest(recursive) == callable_digest(recursive)
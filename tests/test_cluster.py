@@ -0,0 +1,161 @@
+import os
+import sys
+import signal
+import threading
+import subprocess
+
+import pytest
+
+import openjudge
+from openjudge import TC_Judge
+from openjudge import cluster
+from openjudge.cluster import Coordinator, Worker
+from openjudge.metrics import JudgeMetrics
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="POSIX only")
+
+# Test 1 is answered at once, the rest only after a while.
+SOLUTION = """\
+import time
+n = int(input())
+if n > 1:
+    time.sleep(0.5)
+print(n * n)
+"""
+
+
+@pytest.fixture
+def problem(tmp_path):
+    tc_path = tmp_path / "testcase"
+    tc_path.mkdir()
+    for i in range(1, 9):
+        (tc_path / f"test{i}.in").write_text(f"{i}\n")
+        (tc_path / f"test{i}.out").write_text(f"{i * i}\n")
+    code_path = tmp_path / "solution.py"
+    code_path.write_text(SOLUTION)
+    judge = TC_Judge()
+    judge.load_TC(str(tc_path))
+    judge.load_code(str(code_path))
+    judge.set_workers(1)
+    return judge
+
+
+@pytest.fixture
+def coordinator():
+    with Coordinator(worker_timeout=None) as coordinator:
+        yield coordinator
+
+
+@pytest.fixture
+def spawn_worker(tmp_path, coordinator):
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(openjudge.__file__)))
+    processes = []
+
+    def spawn():
+        process = subprocess.Popen(
+            [sys.executable, "-m", "openjudge.cluster", "worker", "--connect", f"127.0.0.1:{coordinator.port}",
+             "--slots", "1", "--once", "--cache-dir", str(tmp_path / f"worker{len(processes)}")],
+            env=env, start_new_session=True
+        )
+        processes.append(process)
+        return process
+
+    yield spawn
+    for process in processes:
+        # The whole session: a killed worker leaves its solution running.
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except OSError:
+            pass
+        process.wait()
+
+
+def judge_with_timeout(coordinator, judge, timeout: float = 30):
+    thread = threading.Thread(target=coordinator.judge, args=(judge,), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "judge() never returned"
+
+
+def statuses(judge) -> list:
+    return [result["status"] for result in judge.results]
+
+
+def test_worker_dropping_mid_job(problem, coordinator, spawn_worker):
+    workers = [spawn_worker(), spawn_worker()]
+    assert coordinator.wait_for_workers(2, timeout=10)
+
+    def kill_one(event):
+        if event["event"] == "test" and workers[0].poll() is None:
+            os.killpg(workers[0].pid, signal.SIGKILL)
+
+    metrics = JudgeMetrics()
+    problem.add_hook(metrics)
+    problem.add_hook(kill_one)
+    judge_with_timeout(coordinator, problem)
+    assert statuses(problem) == ["AC"] * 8
+    assert coordinator.workers == 1
+    # Requeued tests were counted out of flight and back in.
+    assert metrics._merged().in_flight == 0
+
+
+def test_workers_lost_after_cancel(problem, coordinator, spawn_worker):
+    # The first failure cancels the job while the other worker still holds a
+    # test; losing that worker must not leave judge() waiting on it.
+    workers = [spawn_worker(), spawn_worker()]
+    assert coordinator.wait_for_workers(2, timeout=10)
+    problem.TC_out[0] = "0\n"
+    problem.set_max_failures(1)
+
+    def kill_all(event):
+        if event["event"] == "test":
+            for worker in workers:
+                if worker.poll() is None:
+                    os.killpg(worker.pid, signal.SIGKILL)
+
+    problem.add_hook(kill_all)
+    judge_with_timeout(coordinator, problem)
+    assert statuses(problem) == ["WA"] + ["SKIPPED"] * 7
+
+
+def test_stuck_worker(problem, monkeypatch):
+    # Heartbeats keep coming, but one worker never finishes its first task.
+    monkeypatch.setattr(cluster, "HEARTBEAT_INTERVAL", 0.2)
+    release = threading.Event()
+
+    class StuckWorker(Worker):
+        def _run_task(self, sock, message):
+            release.wait()
+
+    problem.set_time_limit(1.5)
+    with Coordinator(worker_timeout=None, task_grace=1.0) as coordinator:
+        stuck = StuckWorker("127.0.0.1", coordinator.port, slots=1)
+        threading.Thread(target=stuck.run, daemon=True).start()
+        assert coordinator.wait_for_workers(1, timeout=10)
+        worker = Worker("127.0.0.1", coordinator.port, slots=1)
+        threading.Thread(target=worker.run, daemon=True).start()
+        assert coordinator.wait_for_workers(2, timeout=10)
+        try:
+            judge_with_timeout(coordinator, problem)
+        finally:
+            release.set()
+    assert statuses(problem) == ["AC"] * 8
+
+
+def test_shared_secret(problem):
+    with Coordinator(worker_timeout=None, secret="s3cret") as coordinator:
+        for secret in (None, "wrong"):
+            with pytest.raises((OSError, ValueError)):
+                Worker("127.0.0.1", coordinator.port, slots=1, secret=secret).run()
+        assert coordinator.workers == 0
+
+        worker = Worker("127.0.0.1", coordinator.port, slots=1, secret=b"s3cret")
+        threading.Thread(target=worker.run, daemon=True).start()
+        assert coordinator.wait_for_workers(1, timeout=10)
+        judge_with_timeout(coordinator, problem)
+        assert statuses(problem) == ["AC"] * 8
+
+    # A worker with a secret doesn't serve a coordinator that can't prove it.
+    with Coordinator(worker_timeout=None) as coordinator:
+        with pytest.raises(ValueError, match="coordinator failed to authenticate"):
+            Worker("127.0.0.1", coordinator.port, slots=1, secret="s3cret").run()
@@ -0,0 +1,102 @@
+import io
+import random
+
+import pytest
+
+from openjudge import compare
+from openjudge.compare import StreamComparator
+from openjudge.manifest import normalized_digest
+from openjudge.testcase import normalize_str
+
+CASES = [
+    ("1 2 3", "1 2 3"),
+    ("1 2 3\n", "1 2 3"),
+    ("1\n2\n", "1\r\n2\r\n"),
+    ("\n\n  1\n2", "1\n2\n\n\n"),
+    ("1\n2", "1\n2\n3"),
+    ("1\n2\n3", "1\n2"),
+    ("1\r2", "1\n2"),
+    ("1\r\r\n2", "1\r\n2"),
+    ("a b", "a  b"),
+    ("abc", "abd"),
+    ("", ""),
+    ("", " \n\t\r\n"),
+    ("", "0"),
+    ("x\r", "x"),
+    ("x\r\n\r\n", "x"),
+    ("1\r2\r", "1\n2\n"),
+    ("\r\r1", "1"),
+    ("1\r\r2", "1\n\n2"),
+]
+
+
+def expected_match(expected: str, actual: str, universal_newlines: bool = False) -> bool:
+    # What the judge compared before outputs were streamed: expected files
+    # were read in text mode, the program's output was only decoded.
+    if universal_newlines:
+        expected = expected.replace("\r\n", "\n").replace("\r", "\n")
+    return normalize_str(expected.strip()) == normalize_str(actual.strip())
+
+
+def stream_match(expected: str, actual: str, chunk_size: int, universal_newlines: bool = False) -> bool:
+    comparator = StreamComparator(io.BytesIO(expected.encode("utf-8")), universal_newlines)
+    data = actual.encode("utf-8")
+    for i in range(0, len(data), chunk_size):
+        comparator.feed(data[i:i + chunk_size])
+    return comparator.finish()
+
+
+@pytest.fixture(params=[1, 2, 3, 65536])
+def chunk_size(request, monkeypatch):
+    # Both sides are read in chunks of this size, so \r\n pairs and leading
+    # whitespace get split across chunk borders.
+    monkeypatch.setattr(compare, "CHUNK_SIZE", request.param)
+    return request.param
+
+
+@pytest.mark.parametrize("universal_newlines", [False, True])
+@pytest.mark.parametrize("expected, actual", CASES)
+def test_matches_normalize_str(expected, actual, chunk_size, universal_newlines):
+    assert stream_match(expected, actual, chunk_size, universal_newlines) == expected_match(expected, actual, universal_newlines)
+    assert stream_match(actual, expected, chunk_size, universal_newlines) == expected_match(actual, expected, universal_newlines)
+
+
+def test_lone_cr_in_expected_file(chunk_size):
+    assert stream_match("1\r2\r", "1\n2\n", chunk_size, universal_newlines=True)
+    # Only the expected side is translated.
+    assert not stream_match("1\n2\n", "1\r2\r", chunk_size, universal_newlines=True)
+
+
+@pytest.mark.parametrize("universal_newlines", [False, True])
+def test_random_outputs(chunk_size, universal_newlines):
+    rng = random.Random(1234)
+    alphabet = "ab \t\r\n"
+    for _ in range(2000):
+        expected = "".join(rng.choice(alphabet) for _ in range(rng.randrange(12)))
+        if rng.random() < 0.5:
+            actual = expected.replace("\n", "\r\n") + rng.choice(["", " ", "\n", "\r\n"])
+        else:
+            actual = "".join(rng.choice(alphabet) for _ in range(rng.randrange(12)))
+        matched = stream_match(expected, actual, chunk_size, universal_newlines)
+        assert matched == expected_match(expected, actual, universal_newlines), (expected, actual)
+
+
+def test_first_mismatch_position():
+    comparator = StreamComparator(io.BytesIO(b"\n1 2\n3 4\n"))
+    comparator.feed(b"1 2\r\n3 5\n")
+    assert not comparator.finish()
+    assert (comparator.line, comparator.column) == (3, 3)
+
+
+def test_normalized_digest(tmp_path):
+    # Files the judge compares the same share a digest (and cached verdicts).
+    digests = []
+    for i, data in enumerate([b"1\n2\n", b"1\r\n2", b"1\r2\r", b"1\n2 \t\n\n"]):
+        path = tmp_path / f"test{i}.out"
+        path.write_bytes(data)
+        digests.append(normalized_digest(str(path)))
+    assert len(set(digests)) == 1
+    for data in (b"1 2\n", b"\n1\n2\n", b"\r1\n2\n"):
+        path = tmp_path / "other.out"
+        path.write_bytes(data)
+        assert normalized_digest(str(path)) != digests[0]
@@ -0,0 +1,106 @@
+import pytest
+
+from openjudge import Checker_Judge, TC_Judge
+
+SQUARE = "n = int(input())\nprint(n * n)\n"
+
+
+def write_tests(tmp_path, count: int = 3):
+    tc_path = tmp_path / "testcase"
+    tc_path.mkdir()
+    for i in range(1, count + 1):
+        (tc_path / f"test{i}.in").write_text(f"{i}\n")
+        (tc_path / f"test{i}.out").write_text(f"{i * i}\n")
+    return str(tc_path)
+
+
+def write_code(tmp_path, source: str = SQUARE):
+    path = tmp_path / "solution.py"
+    path.write_text(source)
+    return str(path)
+
+
+def test_run_after_reset(tmp_path):
+    # reset() clears the time limit; the next run goes without one.
+    tc_path, code_path = write_tests(tmp_path), write_code(tmp_path)
+    judge = TC_Judge()
+    judge.load_TC(tc_path)
+    judge.load_code(code_path)
+    judge.run()
+    judge.reset()
+    assert judge.time_limit is None
+
+    judge.load_TC(tc_path)
+    judge.load_code(code_path)
+    judge.run()
+    assert [result["status"] for result in judge.results] == ["AC"] * 3
+
+
+@pytest.mark.parametrize("checker_workers", [0, 2])
+def test_checker_judge_cache(tmp_path, checker_workers):
+    tc_path, code_path = write_tests(tmp_path), write_code(tmp_path)
+    judge = Checker_Judge()
+    judge.load_TC(tc_path, 3)
+    judge.load_code(code_path)
+    judge.load_checker(lambda input_data, output_data: int(output_data) == int(input_data) ** 2)
+    judge.set_checker_workers(checker_workers)
+    judge.set_cache(str(tmp_path / "cache"))
+    for cached in (False, True):
+        judge.run()
+        assert [result["status"] for result in judge.results] == ["AC"] * 3
+        assert [result["cached"] for result in judge.results] == [cached] * 3
+
+
+def test_tc_judge_cache(tmp_path):
+    tc_path, code_path = write_tests(tmp_path), write_code(tmp_path)
+    judge = TC_Judge()
+    judge.load_TC(tc_path, 3)
+    judge.load_code(code_path)
+    judge.set_cache(str(tmp_path / "cache"))
+    for cached in (False, True):
+        judge.run()
+        assert [result["cached"] for result in judge.results] == [cached] * 3
+    (tmp_path / "testcase" / "test2.out").write_text("5\n")
+    judge.run()
+    assert [result["status"] for result in judge.results] == ["AC", "WA", "AC"]
+
+
+def test_expected_file_with_lone_cr(tmp_path):
+    # Read in text mode, these were always "1\n1\n" and "4\n2\n".
+    tc_path = write_tests(tmp_path, 2)
+    (tmp_path / "testcase" / "test1.out").write_bytes(b"1\r1\r")
+    (tmp_path / "testcase" / "test2.out").write_bytes(b"4\r\n2\r")
+    judge = TC_Judge()
+    judge.load_TC(tc_path)
+    judge.load_code(write_code(tmp_path, "n = int(input())\nprint(n * n)\nprint(n)\n"))
+    judge.run()
+    assert [result["status"] for result in judge.results] == ["AC", "AC"]
+
+
+def test_output_limit_is_opt_in(tmp_path):
+    # 80MB of output: over the old fixed limit, fine by default.
+    tc_path = write_tests(tmp_path, 1)
+    (tmp_path / "testcase" / "test1.out").write_text("x" * 1023 + "\n")
+    judge = TC_Judge()
+    judge.load_TC(tc_path)
+    judge.load_code(write_code(tmp_path, "import sys\nfor _ in range(80 * 1024):\n    sys.stdout.write('x' * 1023 + '\\n')\n"))
+    judge.set_time_limit(10)
+    judge.run()
+    assert judge.results[0]["status"] == "WA"
+    judge.set_output_limit(1)
+    judge.run()
+    assert judge.results[0]["status"] == "OLE"
+    judge.set_output_limit(None)
+    assert judge.output_limit is None
+
+
+def test_load_checker_path_keyword(tmp_path):
+    checker = tmp_path / "checker.py"
+    checker.write_text("print(1)\n")
+    judge = Checker_Judge()
+    judge.load_checker(checker_path=str(checker))
+    assert judge.checker_path == str(checker)
+    with pytest.raises(ValueError):
+        judge.load_checker(str(checker), checker_path=str(checker))
+    with pytest.raises(ValueError):
+        judge.load_checker()
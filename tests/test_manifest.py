@@ -0,0 +1,71 @@
+import json
+
+from openjudge import manifest
+from openjudge.manifest import MANIFEST_NAME, MANIFEST_VERSION, load_manifest
+
+
+def write_case(tc_path, name: str, input_data: str, output_data: str = None):
+    (tc_path / f"{name}.in").write_text(input_data)
+    if output_data is not None:
+        (tc_path / f"{name}.out").write_text(output_data)
+
+
+def count_hashes(monkeypatch) -> list:
+    hashed = []
+    sha256 = manifest._sha256
+
+    def counting(path):
+        hashed.append(path.rsplit("/", 1)[-1])
+        return sha256(path)
+
+    monkeypatch.setattr(manifest, "_sha256", counting)
+    return hashed
+
+
+def test_discovery(tmp_path):
+    for i in (1, 2, 10):
+        write_case(tmp_path, f"test{i}", f"{i}\n", f"{i * i}\n")
+    write_case(tmp_path, "test3", "3\n")
+    (tmp_path / "notes.txt").write_text("not a test")
+
+    cases = load_manifest(str(tmp_path))["cases"]
+    assert [case["name"] for case in cases] == ["test1", "test2", "test3", "test10"]
+    assert cases[2]["out"] is None
+    assert cases[0]["in"]["size"] == 2
+    # Only expected outputs get a normalized digest.
+    assert "normalized_sha256" in cases[0]["out"]
+    assert "normalized_sha256" not in cases[0]["in"]
+    stored = json.loads((tmp_path / MANIFEST_NAME).read_text())
+    assert stored["version"] == MANIFEST_VERSION
+
+
+def test_incremental_rescan(tmp_path, monkeypatch):
+    for i in range(1, 4):
+        write_case(tmp_path, f"test{i}", f"{i}\n", f"{i * i}\n")
+    hashed = count_hashes(monkeypatch)
+    first = load_manifest(str(tmp_path))
+    assert len(hashed) == 6
+
+    hashed.clear()
+    assert load_manifest(str(tmp_path)) == first
+    assert hashed == []
+
+    (tmp_path / "test2.out").write_text("five\n")
+    write_case(tmp_path, "test4", "4\n", "16\n")
+    second = load_manifest(str(tmp_path))
+    assert sorted(hashed) == ["test2.out", "test4.in", "test4.out"]
+    assert second["cases"][0] == first["cases"][0]
+    assert second["cases"][1]["out"]["sha256"] != first["cases"][1]["out"]["sha256"]
+
+
+def test_old_version_is_rebuilt(tmp_path, monkeypatch):
+    write_case(tmp_path, "test1", "1\n", "1\n")
+    load_manifest(str(tmp_path))
+    stored = json.loads((tmp_path / MANIFEST_NAME).read_text())
+    stored["version"] = MANIFEST_VERSION - 1
+    (tmp_path / MANIFEST_NAME).write_text(json.dumps(stored))
+
+    hashed = count_hashes(monkeypatch)
+    load_manifest(str(tmp_path))
+    assert sorted(hashed) == ["test1.in", "test1.out"]
+    assert json.loads((tmp_path / MANIFEST_NAME).read_text())["version"] == MANIFEST_VERSION
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from openjudge import Checker_Judge, TC_Judge
+from openjudge.metrics import JudgeMetrics
+
+SLOW_SQUARE = "import time\nn = int(input())\ntime.sleep(0.2)\nprint(n * n)\n"
+
+
+def make_judge(tmp_path, judge_class=TC_Judge, count: int = 6):
+    tc_path = tmp_path / "testcase"
+    tc_path.mkdir()
+    for i in range(1, count + 1):
+        (tc_path / f"test{i}.in").write_text(f"{i}\n")
+        (tc_path / f"test{i}.out").write_text(f"{i * i}\n")
+    code_path = tmp_path / "solution.py"
+    code_path.write_text(SLOW_SQUARE)
+    judge = judge_class()
+    judge.load_TC(str(tc_path), count)
+    judge.load_code(str(code_path))
+    if judge_class is Checker_Judge:
+        judge.load_checker(lambda input_data, output_data: int(output_data) == int(input_data) ** 2)
+    return judge
+
+
+def in_flight(metrics) -> int:
+    return metrics._merged().in_flight
+
+
+@pytest.mark.parametrize("judge_class", [TC_Judge, Checker_Judge])
+def test_in_flight_counts_running_tests(tmp_path, judge_class):
+    judge = make_judge(tmp_path, judge_class)
+    metrics = JudgeMetrics()
+    judge.add_hook(metrics)
+    seen = []
+    judge.add_hook(lambda event: seen.append(in_flight(metrics)) if event["event"] == "test_start" else None)
+    judge.run(workers=3)
+    assert len(seen) == 6
+    # Outputs waiting on the checker pool are still in flight.
+    assert 1 <= max(seen) <= 3 + getattr(judge, "checker_workers", 0)
+    assert in_flight(metrics) == 0
+    assert "openjudge_tests_in_flight 0\n" in metrics.render()
+
+
+def test_cached_tests_are_not_in_flight(tmp_path):
+    judge = make_judge(tmp_path)
+    judge.set_cache(str(tmp_path / "cache"))
+    judge.run(workers=2)
+    metrics = JudgeMetrics()
+    judge.add_hook(metrics)
+    events = []
+    judge.add_hook(lambda event: events.append(event["event"]))
+    judge.run(workers=2)
+    assert "test_start" not in events
+    assert in_flight(metrics) == 0
+
+
+def test_async_run_closed_early(tmp_path):
+    judge = make_judge(tmp_path)
+    metrics = JudgeMetrics()
+    judge.add_hook(metrics)
+    events = []
+    judge.add_hook(lambda event: events.append(event["event"]))
+
+    async def first_result():
+        results = judge.iter_results_async(workers=3)
+        async for _ in results:
+            assert in_flight(metrics) >= 1
+            break
+        await results.aclose()
+
+    asyncio.run(first_result())
+    assert in_flight(metrics) == 0
+    assert events.count("test_start") == events.count("test_finish")
+    assert events[-1] == "run_failed"
@@ -0,0 +1,145 @@
+import os
+import hashlib
+
+import pytest
+
+from openjudge import Checker_Judge, TC_Judge
+from openjudge import pack as ojpack
+from openjudge.pack import CODEC_NONE, CODEC_ZLIB, is_pack, pack_directory, write_pack
+from openjudge.testcase import TC_File
+
+# Compresses well, so it is stored zlib'd when compress=True.
+REPETITIVE = "1 2 3 4 5 6 7 8 9 10\n" * 2000
+
+
+def read_stdin(entry) -> bytes:
+    with entry.stdin() as data:
+        return bytes(data)
+
+
+def read_chunked(entry, size: int) -> bytes:
+    chunks = []
+    with entry.open() as reader:
+        while True:
+            chunk = reader.read(size)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_round_trip(tmp_path, compress):
+    source = tmp_path / "source.in"
+    source.write_bytes(b"from a file\n")
+    cases = [
+        ("test1", "3\n1 2 3\n", "6\n"),
+        ("test2", b"bytes input\n", REPETITIVE),
+        ("test3", TC_File(str(source)), ""),
+    ]
+    pack_path = str(tmp_path / "tests.ojpack")
+    write_pack(pack_path, cases, compress)
+
+    assert is_pack(pack_path)
+    with ojpack.TestPack(pack_path) as pack:
+        assert [name for name, _, _ in pack.cases] == ["test1", "test2", "test3"]
+        for (_, input_data, output_data), (_, input_entry, output_entry) in zip(cases, pack.cases):
+            for data, entry in ((input_data, input_entry), (output_data, output_entry)):
+                if isinstance(data, TC_File):
+                    data = source.read_bytes()
+                elif isinstance(data, str):
+                    data = data.encode("utf-8")
+                assert entry.read_bytes() == data
+                assert entry.size == len(data)
+                assert entry.sha256 == hashlib.sha256(data).hexdigest()
+                assert read_stdin(entry) == data.rstrip(b"\n")
+
+
+def test_compressed_entries(tmp_path):
+    noise = os.urandom(4096)
+    pack_path = str(tmp_path / "tests.ojpack")
+    write_pack(pack_path, [("test1", REPETITIVE, noise)], compress=True)
+
+    with ojpack.TestPack(pack_path) as pack:
+        _, input_entry, output_entry = pack.cases[0]
+        assert input_entry.codec == CODEC_ZLIB
+        assert input_entry.stored_size < input_entry.size
+        # Incompressible payloads are kept as they are.
+        assert output_entry.codec == CODEC_NONE
+        assert output_entry.read_bytes() == noise
+
+        expected = REPETITIVE.encode("utf-8")
+        for size in (1, 7, 4096, 1 << 20):
+            assert read_chunked(input_entry, size) == expected
+        assert input_entry.read_text() == REPETITIVE
+        assert read_stdin(input_entry) == expected.rstrip(b"\n")
+
+
+def test_missing_out(tmp_path):
+    pack_path = str(tmp_path / "tests.ojpack")
+    write_pack(pack_path, [("test1", "1\n", None), ("test2", "2\n", "2\n")])
+
+    with ojpack.TestPack(pack_path) as pack:
+        assert pack.cases[0][2] is None
+        assert pack.cases[1][2].read_bytes() == b"2\n"
+
+    tc_judge = TC_Judge()
+    with pytest.raises(ValueError, match="test1.out is missing"):
+        tc_judge.load_TC(pack_path)
+
+    checker_judge = Checker_Judge()
+    checker_judge.load_TC(pack_path)
+    assert [entry.read_text() for entry in checker_judge.TC_in] == ["1\n", "2\n"]
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_cr_translation(tmp_path, compress):
+    data = ("1 2\r\n3 4\r5\r\n" * 500).encode("utf-8")
+    pack_path = str(tmp_path / "tests.ojpack")
+    write_pack(pack_path, [("test1", data, data)], compress)
+
+    with ojpack.TestPack(pack_path) as pack:
+        _, input_entry, output_entry = pack.cases[0]
+        # Stored as written; only the text views translate line endings.
+        assert input_entry.read_bytes() == data
+        assert input_entry.read_text() == "1 2\n3 4\n5\n" * 500
+        assert read_stdin(input_entry) == ("1 2\n3 4\n5\n" * 500).rstrip("\n").encode("utf-8")
+        assert output_entry.read_bytes() == data
+
+
+def test_pack_directory(tmp_path):
+    tc_path = tmp_path / "testcase"
+    tc_path.mkdir()
+    for i in range(1, 4):
+        (tc_path / f"test{i}.in").write_text(f"{i}\n")
+        (tc_path / f"test{i}.out").write_text(f"{i * i}\n")
+    (tc_path / "test4.in").write_text("4\n")
+    pack_path = str(tmp_path / "tests.ojpack")
+    pack_directory(str(tc_path), pack_path, compress=True)
+
+    with ojpack.TestPack(pack_path) as pack:
+        cases = [(name, input_entry.read_text(), output_entry and output_entry.read_text()) for name, input_entry, output_entry in pack.cases]
+    assert cases == [("test1", "1\n", "1\n"), ("test2", "2\n", "4\n"), ("test3", "3\n", "9\n"), ("test4", "4\n", None)]
+
+
+def test_not_a_pack(tmp_path):
+    path = tmp_path / "test1.in"
+    path.write_text("1\n")
+    assert not is_pack(str(path))
+    assert not is_pack(str(tmp_path))
+    with pytest.raises(ValueError):
+        ojpack.TestPack(str(path))
+
+
+def test_cached_pack_run(tmp_path):
+    pack_path = str(tmp_path / "tests.ojpack")
+    write_pack(pack_path, [("test1", "3\n", "9\n"), ("test2", "4\n", "16\r\n")])
+    code_path = tmp_path / "solution.py"
+    code_path.write_text("print(int(input()) ** 2)\n")
+    judge = TC_Judge()
+    judge.load_TC(pack_path)
+    judge.load_code(str(code_path))
+    judge.set_cache(str(tmp_path / "cache"))
+    for cached in (False, True):
+        judge.run()
+        assert [(result["status"], result["cached"]) for result in judge.results] == [("AC", cached)] * 2
@@ -0,0 +1,117 @@
+import os
+import sys
+import time
+import signal
+
+import pytest
+
+from openjudge.sandbox import execute
+from openjudge.zygote import Zygote
+
+posix_only = pytest.mark.skipif(sys.platform == "win32", reason="POSIX only")
+
+ECHO4 = "import sys\nfor line in sys.stdin:\n    sys.stdout.write(line * 4)\n"
+LOOP = "while True:\n    pass\n"
+
+
+@pytest.fixture
+def program(tmp_path):
+    def write(source: str) -> str:
+        path = tmp_path / "program.py"
+        path.write_text(source)
+        return str(path)
+    return write
+
+
+@pytest.fixture(params=[False, True], ids=["launcher", "zygote"])
+def zygote(request):
+    if not request.param:
+        yield None
+        return
+    if sys.platform == "win32":
+        pytest.skip("zygote mode is POSIX only")
+    with Zygote() as zygote:
+        yield zygote
+
+
+def test_large_input_and_output(program, zygote):
+    # The child fills its stdout pipe while the judge still has input to
+    # write; the judge must keep draining instead of blocking on stdin.
+    data = (b"x" * 79 + b"\n") * 20000
+    start = time.perf_counter()
+    execution = execute(program(ECHO4), data, 2, 256, zygote)
+    assert time.perf_counter() - start < 2
+    assert not execution["timed_out"]
+    assert execution["returncode"] == 0
+    assert execution["stdout"] == b"".join(line * 4 for line in data.splitlines(True))
+
+
+def test_stdout_sink(program, zygote):
+    data = (b"y" * 99 + b"\n") * 5000
+    received = []
+    execution = execute(program(ECHO4), data, 2, 256, zygote, stdout_sink=received.append)
+    assert execution["stdout"] == b""
+    assert len(b"".join(received)) == len(data) * 4
+
+
+def test_time_limit(program, zygote):
+    start = time.perf_counter()
+    execution = execute(program(LOOP), b"", 0.5, 256, zygote)
+    assert execution["timed_out"]
+    assert time.perf_counter() - start < 5
+
+
+def test_output_limit(program, zygote):
+    execution = execute(program("while True:\n    print('x' * 1000)\n"), b"", 5, 256, zygote, output_limit=1 << 20)
+    assert execution["output_exceeded"]
+
+
+@posix_only
+def test_peak_memory_is_the_childs(program):
+    # Forked from the launcher, not the judge: the judge's own RSS must not
+    # show up in the child's ru_maxrss.
+    ballast = b"\1" * (150 * 1024 * 1024)
+    execution = execute(program("print(1)\n"), b"", 2, 256)
+    assert execution["rusage"]["peak_rss_kb"] < 75 * 1024
+    del ballast
+
+
+def test_missing_command():
+    with pytest.raises(FileNotFoundError):
+        execute(["openjudge-no-such-command"], b"", 1, 256)
+
+
+@posix_only
+def test_kill_goes_through_the_supervisor(program, zygote, monkeypatch):
+    from openjudge import sandbox
+
+    source = program(LOOP)
+    proc = sandbox.spawn(source, {}, zygote) if zygote is not None else sandbox.spawn(["python", source], {})
+    signals = []
+    monkeypatch.setattr(os, "kill", lambda pid, sig: signals.append(pid))
+    sandbox.kill(proc)
+    returncode, rusage = sandbox.reap(proc, 5)
+    assert returncode == -signal.SIGKILL
+    assert rusage is not None
+    # Already reaped: nothing is signalled, from here or the supervisor.
+    sandbox.kill(proc)
+    assert signals == []
+    proc.close()
+
+
+@posix_only
+def test_closing_kills_the_child(program):
+    from openjudge import sandbox
+
+    proc = sandbox.spawn(["python", program(LOOP)], {})
+    pid = proc.pid
+    proc.close()
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            break
+        time.sleep(0.05)
+    else:
+        pytest.fail("the child outlived its connection")
@@ -0,0 +1,54 @@
+import json
+import urllib.request
+
+from openjudge.server import DONE, JudgeServer
+
+SQUARE = "n = int(input())\nprint(n * n)\n"
+
+
+def write_tests(tmp_path, count: int = 3):
+    tc_path = tmp_path / "testcase"
+    tc_path.mkdir()
+    for i in range(1, count + 1):
+        (tc_path / f"test{i}.in").write_text(f"{i}\n")
+        (tc_path / f"test{i}.out").write_text(f"{i * i}\n")
+    return str(tc_path)
+
+
+def wait_done(server, submission_id: str, timeout: float = 30):
+    submission = server.get(submission_id)
+    with submission.changed:
+        assert submission.changed.wait_for(lambda: submission.finished, timeout)
+    return submission
+
+
+def test_template_hooks_see_submissions(tmp_path):
+    with JudgeServer(workers=1, work_dir=str(tmp_path / "work")) as server:
+        problem = server.add_problem("square", write_tests(tmp_path))
+        events = []
+        problem.judge.add_hook(events.append)
+        submission = wait_done(server, server.submit("square", SQUARE))
+    assert submission.state == DONE
+    assert submission.summary["counts"]["AC"] == 3
+    kinds = [event["event"] for event in events if event["event"] in ("run_start", "test", "run_end")]
+    assert kinds == ["run_start", "test", "test", "test", "run_end"]
+    # The submission's own hook stays off the template.
+    assert problem.judge.hooks == [events.append]
+
+
+def test_http(tmp_path):
+    with JudgeServer(workers=1, work_dir=str(tmp_path / "work")) as server:
+        server.add_problem("square", write_tests(tmp_path))
+        port = server.serve(0)
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{port}/submissions",
+            json.dumps({"problem": "square", "code": "print(0)\n", "language": "python"}).encode("utf-8"),
+            {"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request) as response:
+            submission_id = json.load(response)["id"]
+        wait_done(server, submission_id)
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/submissions/{submission_id}") as response:
+            body = json.load(response)
+    assert body["state"] == DONE
+    assert sorted(row["status"] for row in body["results"]) == ["WA"] * 3
@@ -0,0 +1,63 @@
+import sys
+
+import pytest
+
+from openjudge.sandbox import execute
+from openjudge.zygote import Zygote
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="zygote mode is POSIX only")
+
+THREADED_MAIN = """\
+import threading
+def main():
+    print(int(input()) * 2)
+threading.stack_size(64 * 1024 * 1024)
+threading.Thread(target=main).start()
+"""
+
+ATEXIT = """\
+import atexit
+atexit.register(lambda: print("bye"))
+print("hi")
+"""
+
+# Exits without flushing; the output only survives if stdout is unbuffered.
+NO_FLUSH = """\
+import os, sys
+sys.stdout.write("partial")
+os._exit(0)
+"""
+
+
+def run_both(tmp_path, source: str, input_data: bytes = b""):
+    path = tmp_path / "program.py"
+    path.write_text(source)
+    plain = execute(str(path), input_data, 2, 256)
+    with Zygote() as zygote:
+        forked = execute(str(path), input_data, 2, 256, zygote)
+    return plain, forked
+
+
+def test_non_daemon_threads_are_joined(tmp_path):
+    plain, forked = run_both(tmp_path, THREADED_MAIN, b"21\n")
+    assert plain["stdout"] == forked["stdout"] == b"42\n"
+    assert forked["returncode"] == 0
+
+
+def test_atexit_handlers_run(tmp_path):
+    plain, forked = run_both(tmp_path, ATEXIT)
+    assert plain["stdout"] == forked["stdout"] == b"hi\nbye\n"
+
+
+def test_pythonunbuffered(tmp_path, monkeypatch):
+    monkeypatch.setenv("PYTHONUNBUFFERED", "1")
+    plain, forked = run_both(tmp_path, NO_FLUSH)
+    assert plain["stdout"] == forked["stdout"] == b"partial"
+
+
+def test_exit_code_and_traceback(tmp_path):
+    plain, forked = run_both(tmp_path, "import sys\nprint('x')\nsys.exit(3)\n")
+    assert plain["returncode"] == forked["returncode"] == 3
+    plain, forked = run_both(tmp_path, "raise ValueError('boom')\n")
+    assert plain["returncode"] == forked["returncode"] == 1
+    assert b"ValueError: boom" in forked["stderr"]